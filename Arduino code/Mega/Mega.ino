@@ -25,9 +25,55 @@ String sprayPattern = "";
 volatile int currentBitIndex = 0;
 volatile bool isTransmitting = false;
 unsigned long lastCycleTime = 0;
-unsigned long lastSensorTime = 0;
 const int SENSOR_INTERVAL = 10;
 
+// Sensor scanning (SCAN and RATE commands)
+// SCAN,SEQ,<settle us>: all MUX1 channels, then all MUX2 channels (the boot default, 1000 us like delay(1))
+// SCAN,PAR,<settle us>: both multiplexers switch to channel i together and SIG_1 and SIG_2 are read
+// back to back, so a frame waits for 16 settle times instead of 32
+// RATE,<frames per second>: 0 scans as fast as the scan allows. At 115200 baud text frames top out
+// around 70 frames/s and binary frames around 150 frames/s; past that scans wait for the link.
+bool parallelScan = false;
+unsigned int settleMicros = 1000;
+unsigned long sensorIntervalMicros = SENSOR_INTERVAL * 1000UL;
+unsigned long lastSensorMicros = 0;
+
+// Binary frame mode (FORMAT,BIN): sync word, sequence, millis, 32 samples, CRC-16/CCITT
+// All multi-byte fields are little-endian; the CRC covers everything after the sync word
+const uint8_t FRAME_SYNC_1 = 0xA5;
+const uint8_t FRAME_SYNC_2 = 0x5A;
+const int BINARY_FRAME_SIZE = 2 + 2 + 4 + NUM_SENSORS * 2 + 2;
+bool binaryMode = false;
+
+// Protocol 2 (PROTOCOL,2) adds a 32-bit frame counter and the micros() at which the scan started and ended.
+// Text frames become $millis,counter,scanStart,scanEnd,S1..S32; binary frames use sync A5 5B:
+// sync, counter (4), millis (4), scanStart (4), scanEnd (4), 32 samples, CRC-16/CCITT
+const uint8_t FRAME_SYNC_2_V2 = 0x5B;
+const int BINARY_FRAME_SIZE_V2 = 2 + 4 + 4 + 4 + 4 + NUM_SENSORS * 2 + 2;
+int protocolVersion = 1;
+uint32_t frameCounter = 0;  // Never reset while running; protocol 1 binary frames carry its low 16 bits
+
+// Scanned frames wait here until the serial port has room. Queued bytes are also sent while the
+// multiplexers settle, and no scan starts while the queue is full, so no frame is ever dropped:
+// a link slower than the scan rate lowers the frame rate instead.
+struct SensorFrame {
+    uint32_t counter;
+    unsigned long timestamp;
+    unsigned long scanStart;
+    unsigned long scanEnd;
+    uint16_t samples[NUM_SENSORS];
+};
+const int FRAME_QUEUE_LENGTH = 8;
+SensorFrame frameQueue[FRAME_QUEUE_LENGTH];
+int queueHead = 0;  // Oldest queued frame
+int queueCount = 0;
+
+// The encoded frame being sent, handed to Serial only as fast as its TX buffer drains
+const int TX_BUFFER_SIZE = 224;  // Longest protocol 2 text frame is about 210 bytes
+uint8_t txBuffer[TX_BUFFER_SIZE];
+int txLength = 0;
+int txPosition = 0;
+
 String inputBuffer = "";
 Adafruit_PWMServoDriver fanController = Adafruit_PWMServoDriver(0x40);
 
@@ -61,10 +107,14 @@ void loop() {
         }
     }
 
-    if (currentTime - lastSensorTime >= SENSOR_INTERVAL) {
-        sendSensorData();
-        lastSensorTime = currentTime;
+    unsigned long currentMicros = micros();
+    if (currentMicros - lastSensorMicros >= sensorIntervalMicros && queueCount < FRAME_QUEUE_LENGTH) {
+        // Keep a steady rate, but do not try to catch up after falling behind
+        bool behind = currentMicros - lastSensorMicros >= 2 * sensorIntervalMicros;
+        lastSensorMicros = behind ? currentMicros : lastSensorMicros + sensorIntervalMicros;
+        scanSensors();
     }
+    transmitFrames();
 }
 
 void processCommand(String command) {
@@ -84,6 +134,36 @@ void processCommand(String command) {
             processNextCycle();
         }
     }
+    else if (command.startsWith("FORMAT")) {
+        // FORMAT,BIN switches to binary frames, FORMAT,TEXT back to '$' lines
+        binaryMode = command.endsWith("BIN");
+    }
+    else if (command.startsWith("SCAN")) {
+        // SCAN,PAR,<settle us> or SCAN,SEQ,<settle us>
+        int comma = command.indexOf(',');
+        int secondComma = command.indexOf(',', comma + 1);
+        if (comma != -1) {
+            parallelScan = command.substring(comma + 1).startsWith("PAR");
+            if (secondComma != -1) {
+                settleMicros = constrain(command.substring(secondComma + 1).toInt(), 0, 16000);
+            }
+        }
+    }
+    else if (command.startsWith("RATE")) {
+        // RATE,<frames per second>, 0 for as fast as possible
+        int comma = command.indexOf(',');
+        if (comma != -1) {
+            long rate = command.substring(comma + 1).toInt();
+            sensorIntervalMicros = rate > 0 ? 1000000UL / rate : 0;
+        }
+    }
+    else if (command.startsWith("PROTOCOL")) {
+        // PROTOCOL,2 adds the frame counter and scan times, PROTOCOL,1 goes back to millis only
+        int comma = command.indexOf(',');
+        if (comma != -1) {
+            protocolVersion = command.substring(comma + 1).toInt() == 2 ? 2 : 1;
+        }
+    }
     else if (command == "STOP") {
         stopSprayPattern();
     }
@@ -125,28 +205,146 @@ void stopSprayPattern() {
     digitalWrite(SPRAYER_PIN, LOW);
 }
 
-void sendSensorData() {
-    Serial.print("$");  // Start marker
-    Serial.print(millis());
-    Serial.print(",");
-    
-    // First read all MUX1 sensors
-    for(int i = 0; i < 16; i++) {
-        mux1.channel(i);
-        delay(1);
-        int value = analogRead(SIG_1);
-        Serial.print(value);
-        Serial.print(",");
-    }
-    
-    // Then read all MUX2 sensors
-    for(int i = 0; i < 16; i++) {
-        mux2.channel(i);
-        delay(1);
-        int value = analogRead(SIG_2);
-        Serial.print(value);
-        if(i < 15) Serial.print(",");  // Don't add comma after last value
-    }
-    
-    Serial.println();  // End of data marker
-}
\ No newline at end of file
+void scanSensors() {
+    SensorFrame &frame = frameQueue[(queueHead + queueCount) % FRAME_QUEUE_LENGTH];
+    frame.counter = frameCounter++;
+    frame.timestamp = millis();
+    frame.scanStart = micros();
+
+    if (parallelScan) {
+        // Both multiplexers settle at once; the two reads differ only in the ADC input
+        for(int i = 0; i < 16; i++) {
+            mux1.channel(i);
+            mux2.channel(i);
+            settle();
+            frame.samples[i] = analogRead(SIG_1);
+            frame.samples[16 + i] = analogRead(SIG_2);
+        }
+    } else {
+        // First read all MUX1 sensors
+        for(int i = 0; i < 16; i++) {
+            mux1.channel(i);
+            settle();
+            frame.samples[i] = analogRead(SIG_1);
+        }
+
+        // Then read all MUX2 sensors
+        for(int i = 0; i < 16; i++) {
+            mux2.channel(i);
+            settle();
+            frame.samples[16 + i] = analogRead(SIG_2);
+        }
+    }
+
+    frame.scanEnd = micros();
+    queueCount++;
+}
+
+void settle() {
+    // Wait for the multiplexer to settle, sending queued frames meanwhile
+    unsigned long start = micros();
+    do {
+        transmitFrames();
+    } while (micros() - start < settleMicros);
+}
+
+void transmitFrames() {
+    // Encode the next queued frame once the previous one is fully handed over
+    if (txPosition == txLength) {
+        if (queueCount == 0) {
+            return;
+        }
+        const SensorFrame &frame = frameQueue[queueHead];
+        if (binaryMode && protocolVersion == 2) {
+            txLength = encodeBinaryFrameV2(frame, txBuffer);
+        } else if (binaryMode) {
+            txLength = encodeBinaryFrame(frame, txBuffer);
+        } else {
+            txLength = encodeTextFrame(frame, txBuffer);
+        }
+        txPosition = 0;
+        queueHead = (queueHead + 1) % FRAME_QUEUE_LENGTH;
+        queueCount--;
+    }
+
+    // Only write what fits, so Serial.write never blocks the scan
+    int room = Serial.availableForWrite();
+    if (room > 0) {
+        int count = min(room, txLength - txPosition);
+        Serial.write(txBuffer + txPosition, count);
+        txPosition += count;
+    }
+}
+
+int appendNumber(uint8_t *buffer, int length, unsigned long value) {
+    char digits[11];
+    ultoa(value, digits, 10);
+    for(char *digit = digits; *digit; digit++) {
+        buffer[length++] = *digit;
+    }
+    return length;
+}
+
+int encodeTextFrame(const SensorFrame &frame, uint8_t *buffer) {
+    int length = 0;
+    buffer[length++] = '$';  // Start marker
+    length = appendNumber(buffer, length, frame.timestamp);
+    if (protocolVersion == 2) {
+        buffer[length++] = ',';
+        length = appendNumber(buffer, length, frame.counter);
+        buffer[length++] = ',';
+        length = appendNumber(buffer, length, frame.scanStart);
+        buffer[length++] = ',';
+        length = appendNumber(buffer, length, frame.scanEnd);
+    }
+
+    for(int i = 0; i < NUM_SENSORS; i++) {
+        buffer[length++] = ',';
+        length = appendNumber(buffer, length, frame.samples[i]);
+    }
+
+    // End of data marker, the same \r\n as Serial.println
+    buffer[length++] = '\r';
+    buffer[length++] = '\n';
+    return length;
+}
+
+int encodeBinaryFrame(const SensorFrame &frame, uint8_t *buffer) {
+    buffer[0] = FRAME_SYNC_1;
+    buffer[1] = FRAME_SYNC_2;
+    memcpy(&buffer[2], &frame.counter, 2);  // Low 16 bits (little-endian)
+    memcpy(&buffer[4], &frame.timestamp, 4);
+    memcpy(&buffer[8], frame.samples, NUM_SENSORS * 2);
+    appendCrc(buffer, BINARY_FRAME_SIZE);
+    return BINARY_FRAME_SIZE;
+}
+
+int encodeBinaryFrameV2(const SensorFrame &frame, uint8_t *buffer) {
+    buffer[0] = FRAME_SYNC_1;
+    buffer[1] = FRAME_SYNC_2_V2;
+    memcpy(&buffer[2], &frame.counter, 4);
+    memcpy(&buffer[6], &frame.timestamp, 4);
+    memcpy(&buffer[10], &frame.scanStart, 4);
+    memcpy(&buffer[14], &frame.scanEnd, 4);
+    memcpy(&buffer[18], frame.samples, NUM_SENSORS * 2);
+    appendCrc(buffer, BINARY_FRAME_SIZE_V2);
+    return BINARY_FRAME_SIZE_V2;
+}
+
+void appendCrc(uint8_t *buffer, int frameSize) {
+    // CRC over everything after the sync word, stored in the last two bytes
+    uint16_t crc = 0xFFFF;
+    for(int i = 2; i < frameSize - 2; i++) {
+        crc = crc16Update(crc, buffer[i]);
+    }
+    memcpy(&buffer[frameSize - 2], &crc, 2);
+}
+
+uint16_t crc16Update(uint16_t crc, uint8_t data) {
+    // CRC-16/CCITT, polynomial 0x1021 (matches Python's binascii.crc_hqx)
+    crc ^= (uint16_t)data << 8;
+    for(uint8_t bit = 0; bit < 8; bit++) {
+        crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+    return crc;
+}
@@ -12,9 +12,19 @@ from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QColor, QPalette
 import pyqtgraph as pg
 import random
-from scipy.signal import find_peaks
+from collections import deque
+from acquisition import SerialAcquisitionWorker
+from lod_history import LODSensorHistory, connect_gaps
+from smoothing import RunningMean
+from filters import FilterChain
+from baseline import create_baseline_tracker
+from recorder import create_recorder
+from replay import RecordingReplayWorker, REPLAY_SPEEDS
+from event_detection import StreamingEventDetector
+from channel_stats import ChannelStats
+from log_buffer import LogBuffer
+from stage_timing import PipelineTimers
 import os
-import csv
 from datetime import datetime
 import numpy as np
 
@@ -22,7 +32,8 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QGridLayout, QPushButton, QLabel,
                              QComboBox, QTextEdit, QFrame, QMessageBox,
                              QDialog, QLineEdit, QGroupBox, QSpinBox,
-                             QCheckBox, QProgressBar, QFileDialog)  # Added missing widgets
+                             QCheckBox, QProgressBar, QFileDialog, QDoubleSpinBox,
+                             QPlainTextEdit, QTableWidget, QTableWidgetItem)  # Added missing widgets
 
 TEST_MODE = False
 # Use simulator if TEST_MODE environment variable is set or if no real ports are available
@@ -54,6 +65,30 @@ FAN_COLORS = {
     'High': '#1B5E20'  # Dark Green
 }
 
+# Filters applied to every sensor frame between parsing and plotting/detection, in order.
+# Types: 'mean' (window), 'median' (window), 'savgol' (window, polyorder),
+# 'lowpass'/'highpass' (cutoff as a fraction of Nyquist, order), e.g.
+# [('median', {'window': 5}), ('lowpass', {'cutoff': 0.2, 'order': 2})]
+FILTER_CHAIN = [('mean', {'window': 10, 'min_samples': 3})]
+
+# 'grid': a PlotWidget per sensor; 'compact': each multiplexer tab is one GraphicsLayoutWidget whose 16
+# plots share a linked time axis, which starts and repaints faster (see Testing/plot_layout_benchmark.py)
+PLOT_LAYOUT = 'grid'
+
+LOG_FILE = 'logs/sensor_gui.log'  # Debug log mirror, rotated at 1 MB with 3 old files kept
+
+# Suggested scan settings for the connect dialog: parallel MUX scans need far less than the old 1 ms per channel
+DEFAULT_SETTLE_US = 100
+DEFAULT_SENSOR_RATE = 100  # frames/s; the firmware boots at 100 (SENSOR_INTERVAL = 10 ms)
+
+PROFILE_PIPELINE = False  # Start with the per-stage timers of the Pipeline Stats tab switched on
+
+# Drift baseline trackers (lengths in samples); the tracked baseline is subtracted after FILTER_CHAIN
+DRIFT_BASELINES = {
+    'ema': {'rise_half_life': 1000, 'fall_half_life': 20},  # Lower envelope: falls fast, rises slowly
+    'min': {'window': 2000},  # Minimum of the last window samples
+}
+
 
 class SprayPatternDialog(QDialog):
     def __init__(self, parent=None):
@@ -225,6 +260,70 @@ class PortSelectionDialog(QDialog):
         baud_group.setLayout(baud_layout)
         layout.addWidget(baud_group)
 
+        # Sensor frame format selection
+        format_group = QGroupBox("Sensor Frame Format")
+        format_layout = QHBoxLayout()
+        self.frame_format = QComboBox()
+        self.frame_format.addItem("Text ($ lines)", 'text')
+        self.frame_format.addItem("Binary (compact)", 'binary')
+        self.frame_format.setToolTip("Binary mode needs Mega firmware with FORMAT command support")
+        format_layout.addWidget(QLabel("Format:"))
+        format_layout.addWidget(self.frame_format)
+        self.protocol_version = QComboBox()
+        self.protocol_version.addItem("v1 (millis only)", 1)
+        self.protocol_version.addItem("v2 (frame counter + µs scan times)", 2)
+        self.protocol_version.setToolTip("v2 needs Mega firmware with PROTOCOL command support; "
+                                         "it gives exact frame loss, scan duration and clock drift")
+        format_layout.addWidget(QLabel("Protocol:"))
+        format_layout.addWidget(self.protocol_version)
+        format_group.setLayout(format_layout)
+        layout.addWidget(format_group)
+
+        # Scan settings; older firmware would take these commands for fan commands, so they are opt-in
+        self.scan_group = QGroupBox("Configure Sensor Scan (needs firmware with SCAN/RATE support)")
+        self.scan_group.setCheckable(True)
+        self.scan_group.setChecked(False)
+        scan_layout = QHBoxLayout()
+        self.scan_mode = QComboBox()
+        self.scan_mode.addItem("Parallel (both MUXes per channel)", 'PAR')
+        self.scan_mode.addItem("Sequential (MUX1 then MUX2)", 'SEQ')
+        scan_layout.addWidget(QLabel("Mode:"))
+        scan_layout.addWidget(self.scan_mode)
+        self.settle_time = QSpinBox()
+        self.settle_time.setRange(0, 16000)
+        self.settle_time.setValue(DEFAULT_SETTLE_US)
+        self.settle_time.setSuffix(" µs")
+        self.settle_time.setToolTip("Wait after switching the multiplexer channel before reading")
+        scan_layout.addWidget(QLabel("Settle:"))
+        scan_layout.addWidget(self.settle_time)
+        self.sensor_rate = QSpinBox()
+        self.sensor_rate.setRange(0, 1000)
+        self.sensor_rate.setValue(DEFAULT_SENSOR_RATE)
+        self.sensor_rate.setSuffix(" frames/s")
+        self.sensor_rate.setSpecialValueText("As fast as possible")
+        self.sensor_rate.setToolTip("At 115200 baud text frames top out around 70 frames/s, binary around 150")
+        scan_layout.addWidget(QLabel("Rate:"))
+        scan_layout.addWidget(self.sensor_rate)
+        self.scan_group.setLayout(scan_layout)
+        layout.addWidget(self.scan_group)
+
+        # Replay a recording instead of reading the sensor port
+        replay_group = QGroupBox("Replay Recording (instead of sensor port)")
+        replay_layout = QHBoxLayout()
+        self.replay_file = QLineEdit()
+        self.replay_file.setPlaceholderText("Recording from recorded_data/ or experiment_data/")
+        replay_layout.addWidget(self.replay_file)
+        browse_btn = QPushButton("Browse")
+        browse_btn.clicked.connect(self.browse_replay_file)
+        replay_layout.addWidget(browse_btn)
+        self.replay_speed = QComboBox()
+        for name, speed in REPLAY_SPEEDS.items():
+            self.replay_speed.addItem(name, speed)
+        replay_layout.addWidget(QLabel("Speed:"))
+        replay_layout.addWidget(self.replay_speed)
+        replay_group.setLayout(replay_layout)
+        layout.addWidget(replay_group)
+
         # Refresh button
         refresh_btn = QPushButton("Refresh Ports")
         refresh_btn.clicked.connect(self.refresh_ports)
@@ -295,6 +394,59 @@ class PortSelectionDialog(QDialog):
             QMessageBox.warning(self, "Port Selection Error", f"Error getting port selection: {str(e)}")
             return None, None, 9600, 115200
 
+    def get_frame_format(self):
+        """Return 'text' or 'binary' for the sensor stream"""
+        return self.frame_format.currentData()
+
+    def get_protocol_version(self):
+        """Return the firmware frame protocol, 1 or 2"""
+        return self.protocol_version.currentData()
+
+    def get_scan_settings(self):
+        """Return (scan mode 'PAR' or 'SEQ', settle time in us, frames/s), or None to keep the firmware's"""
+        if not self.scan_group.isChecked():
+            return None
+        return self.scan_mode.currentData(), self.settle_time.value(), self.sensor_rate.value()
+
+    def browse_replay_file(self):
+        """Pick a recording to replay"""
+        path, _ = QFileDialog.getOpenFileName(self, "Select Recording", "recorded_data",
+                                              "Recordings (*.csv *.bin);;All Files (*)")
+        if path:
+            self.replay_file.setText(path)
+
+    def get_replay_settings(self):
+        """Return (recording path or None, speed factor or None for max speed)"""
+        return self.replay_file.text() or None, self.replay_speed.currentData()
+
+
+class LogTerminal(QPlainTextEdit):
+    """Debug log view that keeps at most max_lines lines and is updated a few times per second.
+
+    append() only queues the message in a LogBuffer (which collapses repeats
+    and mirrors to the log file); a timer moves the queued lines into the
+    view in one go, so logging stays cheap however busy the run is.
+    """
+
+    def __init__(self, max_lines=2000, flush_interval_ms=200, log_path=LOG_FILE):
+        super().__init__()
+        self.setReadOnly(True)
+        self.setMaximumBlockCount(max_lines)  # Oldest lines are dropped from the document
+        self.buffer = LogBuffer(log_path=log_path)
+        self.flush_timer = QTimer()
+        self.flush_timer.timeout.connect(self.flush)
+        self.flush_timer.start(flush_interval_ms)
+
+    def append(self, message):
+        """Queue a message; it shows up at the next flush"""
+        self.buffer.append(str(message))
+
+    def flush(self):
+        """Show every queued message"""
+        lines = self.buffer.take()
+        if lines:
+            self.appendPlainText('\n'.join(lines))
+
 
 class SensorArrayGUI(QMainWindow):
     def __init__(self):
@@ -306,6 +458,10 @@ class SensorArrayGUI(QMainWindow):
         # Initialize variables first
         self.fan_serial = None
         self.sensor_serial = None
+        self.acquisition_worker = None  # Background reader that owns sensor_serial
+        self.recorder = None  # Background writer for the Record Data button
+        self.frame_subscribers = []  # Callables given every raw (frames, host_times) batch, e.g. recorders
+        self.filtered_subscribers = []  # Same, but with the readings after FILTER_CHAIN
         self.pattern_delay = 0.1
         self.start_time = time.time()
         self.sensor_plots = []
@@ -331,16 +487,42 @@ class SensorArrayGUI(QMainWindow):
         self.peak_distance_spin.setRange(1, 100)
         self.peak_distance_spin.setValue(20)
 
+        # Falling crossings of each sensor's threshold and peaks, found on each new batch only
+        self.event_detector = StreamingEventDetector(
+            num_channels=32,
+            peak_height=self.peak_height_spin.value(),
+            peak_distance=self.peak_distance_spin.value()
+        )
+        self.show_events = True  # Draw peak and crossing markers on the plots
+
+        # Running statistics of the smoothed values for auto-threshold
+        self.threshold_stats = 'window'  # 'window' (last 100 samples), 'decaying' or 'robust' (median/MAD)
+        self.channel_stats = ChannelStats(num_channels=32, window=100, half_life=500, kind=self.threshold_stats)
+        self.THRESHOLD_SIGMA = 1.0  # Auto threshold = center + THRESHOLD_SIGMA * spread
+
         # In __init__
         self.sensor_buffers = {i: [] for i in range(32)}  # Changed from 10 to 32
-        self.SMOOTHING_WINDOW = 10
+        # Plot histories: the newest 32768 samples plus min/max levels reaching back hours for zooming out
+        self.sensor_history = LODSensorHistory(num_channels=32, capacity=32768)  # Filtered plot history
+        self.raw_history = LODSensorHistory(num_channels=32, capacity=32768)  # Unfiltered readings, same times
+        self.plot_stream = 'filtered'  # Which history the plots show: 'filtered' or 'raw'
+        self.history_start_time = None  # Device time (s) of the first frame in sensor_history
+        self.filter_chain = FilterChain(FILTER_CHAIN, num_channels=32)
+        self.SMOOTHING_WINDOW = dict(FILTER_CHAIN).get('mean', {}).get('window', 10)  # Length of the 'mean' stage
+        self.BASELINE_WINDOW = 50  # Samples each BitDetector uses to establish its baseline
+        self.drift_tracker = None  # Baseline removed from the filtered readings, None when drift is not removed
         self.SMOOTHED_SENSORS = set(range(0, 32))  # Both multiplexer sensors are smoothed
-        self.bit_detectors = {}
-        self.sensor_timer = QTimer()
-        self.sensor_timer.timeout.connect(self.update_sensor_data)
-        self.sensor_timer.start(50)  # Poll every 50ms
+        self.PLOT_FPS = 30  # Redraw rate for the visible plots, independent of the serial rate
+        self.dirty_plots = set()  # Plots with new data that have not been redrawn yet
+        self.bit_detectors = None  # BitDetectorBank covering all 32 sensors
+        self.live_detection = False  # Run the bit detectors on every incoming frame
+        # Latency of every pipeline stage, shared with the acquisition and recorder threads
+        self.pipeline_timers = PipelineTimers(enabled=PROFILE_PIPELINE)
+        self.frames_ingested = 0  # Frames through ingest_frames, for the frames/s readout
         self.setup_bit_detectors()
         self.setup_ui()
+        # The Threshold Settings tab replaces the spinboxes, so take their values from there
+        self.event_detector.threshold[:] = [self.threshold_spins[i].value() for i in range(32)]
 
     def show_experiment_automation(self):
         dialog = ExperimentAutomationDialog(self)
@@ -378,8 +560,7 @@ class SensorArrayGUI(QMainWindow):
         left_layout.addWidget(sprayer_panel)
 
         # Create log terminal and layout
-        self.log_terminal = QTextEdit()
-        self.log_terminal.setReadOnly(True)
+        self.log_terminal = LogTerminal()
         self.log_terminal.setMaximumHeight(200)
 
         log_layout = QVBoxLayout()
@@ -404,6 +585,8 @@ class SensorArrayGUI(QMainWindow):
         self.tab_widget.addTab(self.create_mux_panel(0), "Multiplexer 1 (S1-S16)")
         self.tab_widget.addTab(self.create_mux_panel(1), "Multiplexer 2 (S17-S32)")
         self.tab_widget.addTab(detection_panel, "Threshold Settings")
+        self.tab_widget.addTab(self.create_stats_panel(), "Pipeline Stats")
+        self.tab_widget.currentChanged.connect(lambda _: self.render_plots())  # Catch up a page as soon as it is shown
         # Add panels to main layout
         main_layout.addWidget(left_panel, stretch=1)
         main_layout.addWidget(self.tab_widget, stretch=2)
@@ -411,7 +594,11 @@ class SensorArrayGUI(QMainWindow):
         # Setup timers
         self.sensor_timer = QTimer()
         self.sensor_timer.timeout.connect(self.update_sensor_data)
-        self.sensor_timer.start(200)
+        self.sensor_timer.start(50)  # Drain frames from the acquisition worker every 50ms
+
+        self.render_timer = QTimer()
+        self.render_timer.timeout.connect(self.render_plots)
+        self.render_timer.start(int(1000 / self.PLOT_FPS))
 
         self.pattern_timer = QTimer()
         self.pattern_timer.timeout.connect(self.update_fan_pattern)
@@ -429,8 +616,9 @@ class SensorArrayGUI(QMainWindow):
         try:
             plot = self.sensor_plots[sensor_index]
             plot['threshold_line'].setPos(value)
-            if hasattr(self, 'bit_detectors') and sensor_index in self.bit_detectors:
-                self.bit_detectors[sensor_index].threshold = value
+            if getattr(self, 'bit_detectors', None) is not None:
+                self.bit_detectors.threshold[sensor_index] = value
+            self.event_detector.threshold[sensor_index] = value
         except Exception as e:
             self.log_terminal.append(f"Error updating threshold for sensor {sensor_index + 1}: {str(e)}")
     def create_recording_panel(self):
@@ -448,6 +636,18 @@ class SensorArrayGUI(QMainWindow):
         duration_layout.addWidget(self.record_duration)
         layout.addLayout(duration_layout)
 
+        # Output format: CSV for spreadsheets, binary for long runs
+        self.record_format = QComboBox()
+        self.record_format.addItem("CSV", 'csv')
+        self.record_format.addItem("Binary", 'binary')
+        layout.addWidget(self.record_format)
+
+        # Raw ADC readings, or the readings after the filter chain
+        self.record_stream = QComboBox()
+        self.record_stream.addItem("Raw", 'raw')
+        self.record_stream.addItem("Filtered", 'filtered')
+        layout.addWidget(self.record_stream)
+
         # Record button
         self.record_btn = QPushButton("Record Data")
         self.record_btn.clicked.connect(self.toggle_recording)
@@ -455,36 +655,6 @@ class SensorArrayGUI(QMainWindow):
 
         return recording_panel
 
-    def calculate_auto_threshold_mux(self, mux_index):
-        """Calculate thresholds automatically for one multiplexer"""
-        start_idx = mux_index * 16
-        end_idx = start_idx + 16
-
-        for i in range(start_idx, end_idx):
-            plot = self.sensor_plots[i]
-            if plot['data']['y']:
-                # Calculate threshold based on data
-                values = plot['data']['y']
-                mean = np.mean(values)
-                std = np.std(values)
-                threshold = int(mean + 2 * std)  # 2 sigma threshold
-
-                # Update the spinbox and threshold line
-                self.threshold_spins[i].setValue(threshold)
-
-                # Log the adjustment
-                self.log_terminal.append(f"Auto threshold S{i + 1}: {threshold}")
-
-    def calculate_auto_threshold_all(self):
-        """Calculate thresholds automatically for all sensors"""
-        for i in range(32):
-            plot = self.sensor_plots[i]
-            if plot['data']['y']:
-                values = plot['data']['y']
-                mean = np.mean(values)
-                std = np.std(values)
-                threshold = int(mean + 2 * std)
-                self.threshold_spins[i].setValue(threshold)
     def toggle_recording(self):
         """Start or stop data recording"""
         if not hasattr(self, 'recording_active') or not self.recording_active:
@@ -499,13 +669,15 @@ class SensorArrayGUI(QMainWindow):
             if not os.path.exists('recorded_data'):
                 os.makedirs('recorded_data')
 
-            # Create new data file with timestamp
+            # Create new data file with timestamp; every raw frame is written from a background thread
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            self.data_file = open(f"recorded_data/sensor_data_{timestamp}.csv", "w", newline='')
-            self.csv_writer = csv.writer(self.data_file)
-
-            # Write header
-            self.csv_writer.writerow(['Timestamp', 'Elapsed_Time', 'Sensor_ID', 'Value'])
+            filtered = self.record_stream.currentData() == 'filtered'
+            self.recorder = create_recorder(self.record_format.currentData(), f"recorded_data/sensor_data_{timestamp}",
+                                            metadata=self.recording_metadata(), float_samples=filtered,
+                                            timers=self.pipeline_timers)
+            self.recorder.start()
+            self.recording_subscribers = self.filtered_subscribers if filtered else self.frame_subscribers
+            self.recording_subscribers.append(self.recorder.write)
 
             # Initialize recording variables
             self.recording_active = True
@@ -515,12 +687,14 @@ class SensorArrayGUI(QMainWindow):
             # Update UI
             self.record_btn.setText("Stop Recording")
             self.record_duration.setEnabled(False)
+            self.record_format.setEnabled(False)
+            self.record_stream.setEnabled(False)
             self.log_terminal.append(f"Started recording for {self.record_duration.value()} seconds")
 
-            # Start recording timer
+            # Progress timer; the frames themselves arrive through ingest_frames
             self.recording_timer = QTimer()
-            self.recording_timer.timeout.connect(self.record_data_point)
-            self.recording_timer.start(100)  # Record every 100ms
+            self.recording_timer.timeout.connect(self.update_recording_progress)
+            self.recording_timer.start(100)
 
             # Schedule recording stop
             QTimer.singleShot(self.record_duration.value() * 1000, self.stop_recording)
@@ -529,13 +703,32 @@ class SensorArrayGUI(QMainWindow):
             self.log_terminal.append(f"Error starting recording: {str(e)}")
             self.stop_recording()
 
-    def record_data_point(self):
-        """Record a single data point for all sensors"""
+    def recording_metadata(self):
+        """Setup details stored in the header of binary recordings"""
+        return {
+            'sensor_map': {f"S{i + 1}": {'mux': i // 16 + 1, 'channel': i % 16} for i in range(32)},
+            'thresholds': [self.threshold_spins[i].value() for i in range(32)],
+            'stream': self.record_stream.currentData(),
+            'filter_chain': self.filter_chain.config,
+            'fan_state': {
+                'mode': self.fan_mode.currentText(),
+                'levels': getattr(self, 'fan_states', None),
+            },
+            'spray_pattern': {
+                'pattern': self.pattern_input.text(),
+                'cycle_duration_ms': self.cycle_duration.value(),
+            },
+        }
+
+    def update_recording_progress(self):
+        """Update the progress bar and show any recorder errors"""
         try:
             if not hasattr(self, 'recording_active') or not self.recording_active:
                 return
 
-            current_time = datetime.now()
+            for message in self.recorder.get_messages():
+                self.log_terminal.append(message)
+
             elapsed_time = time.time() - self.recording_start_time
 
             # Check if we've reached the recording duration
@@ -543,27 +736,13 @@ class SensorArrayGUI(QMainWindow):
                 self.stop_recording()
                 return
 
-            # Record data from all sensors
-            for sensor_id, plot in enumerate(self.sensor_plots):
-                if plot['data']['y']:  # Check if we have any data for this sensor
-                    value = plot['data']['y'][-1]  # Get the most recent value
-                    self.csv_writer.writerow([
-                        current_time.strftime("%Y-%m-%d %H:%M:%S.%f"),
-                        f"{elapsed_time:.3f}",
-                        sensor_id + 1,
-                        value
-                    ])
-
-            # Ensure data is written to disk
-            self.data_file.flush()
-
             # Update progress bar if we have one
             if hasattr(self, 'progress_bar'):
                 progress = (elapsed_time / self.record_duration.value()) * 100
                 self.progress_bar.setValue(int(progress))
 
         except Exception as e:
-            self.log_terminal.append(f"Error recording data point: {str(e)}")
+            self.log_terminal.append(f"Error updating recording: {str(e)}")
             self.stop_recording()
 
     def stop_recording(self):
@@ -576,15 +755,22 @@ class SensorArrayGUI(QMainWindow):
                 if hasattr(self, 'recording_timer') and self.recording_timer.isActive():
                     self.recording_timer.stop()
 
-                # Close the data file
-                if hasattr(self, 'data_file') and self.data_file:
-                    self.data_file.close()
-                    self.data_file = None
+                # Write out queued frames and close the data file
+                frames_written = 0
+                if self.recorder:
+                    self.recording_subscribers.remove(self.recorder.write)
+                    self.recorder.stop()
+                    for message in self.recorder.get_messages():
+                        self.log_terminal.append(message)
+                    frames_written = self.recorder.frames_written
+                    self.recorder = None
 
                 # Update UI
                 self.record_btn.setText("Record Data")
                 self.record_duration.setEnabled(True)
-                self.log_terminal.append("Recording stopped")
+                self.record_format.setEnabled(True)
+                self.record_stream.setEnabled(True)
+                self.log_terminal.append(f"Recording stopped ({frames_written} frames written)")
 
                 # Reset progress bar if we have one
                 if hasattr(self, 'progress_bar'):
@@ -605,17 +791,34 @@ class SensorArrayGUI(QMainWindow):
 
         plot_grid = QGridLayout()
         base_sensor = mux_index * 16
+        compact = PLOT_LAYOUT == 'compact'
+        if compact:
+            # One view and scene for all 16 plots instead of one per plot
+            graphics_layout = pg.GraphicsLayoutWidget()
+            graphics_layout.setBackground('w')
+            graphics_layout.ci.setSpacing(2)
 
         for i in range(16):
             row = i // 4
             col = i % 4
             sensor_num = base_sensor + i
 
-            plot_widget = pg.PlotWidget()
-            plot_widget.setBackground('w')
-            plot_widget.setTitle(f'S{sensor_num + 1} (CH{i})')
-            plot_widget.setLabel('left', 'Value')
-            plot_widget.setLabel('bottom', 'Time (s)')
+            if compact:
+                plot_widget = graphics_layout.addPlot(row=row, col=col)
+                plot_widget.setTitle(f'S{sensor_num + 1} (CH{i})', size='8pt')
+                # The linked time axis is only labelled along the bottom row, values along the first column
+                if row < 3:
+                    plot_widget.getAxis('bottom').setStyle(showValues=False)
+                else:
+                    plot_widget.setLabel('bottom', 'Time (s)')
+                if col == 0:
+                    plot_widget.setLabel('left', 'Value')
+            else:
+                plot_widget = pg.PlotWidget()
+                plot_widget.setBackground('w')
+                plot_widget.setTitle(f'S{sensor_num + 1} (CH{i})')
+                plot_widget.setLabel('left', 'Value')
+                plot_widget.setLabel('bottom', 'Time (s)')
             plot_widget.showGrid(x=True, y=True)
 
             for ax in ['left', 'bottom']:
@@ -624,9 +827,19 @@ class SensorArrayGUI(QMainWindow):
 
             plot_widget.setYRange(0, 1023, padding=0.1)
             plot_widget.setXRange(0, 10, padding=0.1)
-
-            # Create main curve with appropriate width
-            curve = plot_widget.plot(pen=pg.mkPen('b', width=2))
+            if compact and i:
+                # Linked after its own range is set, so setting it does not ripple through the other plots
+                plot_widget.setXLink(self.sensor_plots[base_sensor]['widget'])
+            # Zooming or panning needs a redraw at the matching level of detail
+            plot_widget.getViewBox().sigXRangeChanged.connect(
+                lambda _, __, index=sensor_num: self.dirty_plots.add(index))
+
+            # Create main curve with appropriate width; a bare PlotCurveItem skips PlotDataItem's bookkeeping
+            if compact:
+                curve = pg.PlotCurveItem(pen=pg.mkPen('b', width=2))
+                plot_widget.addItem(curve)
+            else:
+                curve = plot_widget.plot(pen=pg.mkPen('b', width=2))
 
             # Create threshold line properly
             threshold_value = self.threshold_spins[sensor_num].value()
@@ -638,6 +851,12 @@ class SensorArrayGUI(QMainWindow):
             )
             plot_widget.addItem(threshold_line)
 
+            # Markers for detected peaks and threshold crossings
+            peaks_scatter = pg.ScatterPlotItem(size=8, pen=None, brush=pg.mkBrush('g'), symbol='t1')
+            crossings_scatter = pg.ScatterPlotItem(size=8, pen=None, brush=pg.mkBrush('r'), symbol='o')
+            plot_widget.addItem(peaks_scatter)
+            plot_widget.addItem(crossings_scatter)
+
             # Create a more direct connection for threshold updates
             def make_threshold_updater(line, spin):
                 def update_threshold():
@@ -649,18 +868,23 @@ class SensorArrayGUI(QMainWindow):
                 make_threshold_updater(threshold_line, self.threshold_spins[sensor_num])
             )
 
-            plot_grid.addWidget(plot_widget, row, col)
+            if not compact:
+                plot_grid.addWidget(plot_widget, row, col)
 
             self.sensor_plots.append({
                 'widget': plot_widget,
                 'curve': curve,
                 'threshold_line': threshold_line,
-                'data': {'x': [], 'y': []},
-                'start_time': None,
-                'value_buffer': []  # Add buffer for smoothing
+                'peaks_scatter': peaks_scatter,
+                'crossings_scatter': crossings_scatter,
+                'peak_events': deque(maxlen=1000),  # (time, value) of recent peaks
+                'crossing_events': deque(maxlen=1000)  # (time, threshold) of recent falling crossings
             })
 
-        layout.addLayout(plot_grid)
+        if compact:
+            layout.addWidget(graphics_layout)
+        else:
+            layout.addLayout(plot_grid)
 
         # Control buttons
         control_row = QHBoxLayout()
@@ -700,28 +924,31 @@ class SensorArrayGUI(QMainWindow):
         for i in range(16):
             plot = self.sensor_plots[start_idx + i]
             plot['window_size'] = duration  # Store the window size
-            if len(plot['data']['x']) > 0:
-                latest_time = plot['data']['x'][-1]
-                # Set fixed window size
-                plot['widget'].setXRange(0, duration, padding=0)
+            self.update_plot(start_idx + i)
     def quick_view_mux(self, mux_index, duration):
         """Set view to show last N seconds for all plots in a multiplexer"""
         start_idx = mux_index * 16
         for i in range(16):
             plot = self.sensor_plots[start_idx + i]
-            if len(plot['data']['x']) > 0:
-                latest_time = plot['data']['x'][-1]
+            if len(self.sensor_history):
+                latest_time = self.sensor_history.latest_time()
                 plot['widget'].setXRange(max(0, latest_time - duration), latest_time)
 
     def auto_scale_mux(self, mux_index):
-        """Auto-scale each plot individually based on its own data"""
+        """Auto-scale each plot individually based on the data in its current time window"""
         start_idx = mux_index * 16
+        history = self.plotted_history()
         for i in range(16):
             plot = self.sensor_plots[start_idx + i]
-            if plot['data']['y']:
+            if plot.get('window_size'):
+                extremes = history.value_range(history.count_since(plot['window_size']), start_idx + i)
+            else:
+                # Only what is visible on the time axis, not the whole history
+                start_time, end_time = plot['widget'].getViewBox().viewRange()[0]
+                extremes = history.value_range_between(start_time, end_time, start_idx + i)
+            if extremes is not None:
                 # Get the min and max values for this sensor
-                min_val = min(plot['data']['y'])
-                max_val = max(plot['data']['y'])
+                min_val, max_val = float(extremes[0]), float(extremes[1])
 
                 # Calculate range and add 10% padding to the top
                 value_range = max_val - min_val
@@ -740,13 +967,6 @@ class SensorArrayGUI(QMainWindow):
                     f"Auto-scaled S{sensor_num} - Range: {min_val:.1f} to {max_val:.1f}"
                 )
 
-    def setup_bit_detectors(self):
-        """Initialize bit detectors with individual thresholds"""
-        for i in range(32):
-            threshold = (self.threshold_spins[i].value()
-                         if hasattr(self, 'threshold_spins') and i in self.threshold_spins
-                         else 250)  # Default value
-            self.bit_detectors[i] = BitDetector(threshold=threshold)
     def reset_mux_view(self, mux_index):
         """Reset view and remove fixed window size"""
         start_idx = mux_index * 16
@@ -757,106 +977,159 @@ class SensorArrayGUI(QMainWindow):
                 del plot['window_size']
             # Reset view
             plot['widget'].setYRange(0, 1023, padding=0.1)
-            if len(plot['data']['x']) > 0:
-                latest_time = plot['data']['x'][-1]
+            if len(self.sensor_history):
+                latest_time = self.sensor_history.latest_time()
                 plot['widget'].setXRange(max(0, latest_time - 10), latest_time)
 
     def update_sensor_data(self):
-        """Update sensor data with improved data format handling"""
-        if not self.sensor_serial:
+        """Drain every frame the acquisition worker has read and update the plots"""
+        if not self.acquisition_worker:
             if not hasattr(self, '_no_serial_logged'):
                 self.log_terminal.append("No sensor serial connection available")
                 self._no_serial_logged = True
             return
 
-        try:
-            if self.sensor_serial.in_waiting:
-                line = self.sensor_serial.readline().decode(errors='ignore').strip()
-
-                # Log raw data occasionally for debugging
-                if random.random() < 0.01:  # Log ~1% of data for debugging
-                    self.log_terminal.append(f"Raw data: {line}")
-
-                # Check if it's a valid data line (starts with $)
-                if line.startswith('$'):
-                    try:
-                        # Split the data
-                        data_parts = line[1:].split(',')  # Remove $ and split
-
-                        if len(data_parts) < 33:  # timestamp + 32 sensors
-                            self.log_terminal.append(f"Invalid data format (too few parts): {line}")
-                            return
-
-                        # Get timestamp
-                        timestamp = float(data_parts[0]) / 1000.0  # Convert to seconds
-
-                        # Process sensors in order (first 16 are MUX1, next 16 are MUX2)
-                        for i in range(32):
-                            try:
-                                value = float(data_parts[i + 1])  # +1 to skip timestamp
-                                self.update_plot(i, timestamp, value)
-                            except ValueError:
-                                self.log_terminal.append(f"Error parsing sensor {i + 1} value: {data_parts[i + 1]}")
-                            except IndexError:
-                                self.log_terminal.append(f"Missing data for sensor {i + 1}")
-
-                    except Exception as e:
-                        self.log_terminal.append(f"Error processing data line: {str(e)}")
-
-        except Exception as e:
-            if not hasattr(self, '_serial_errors'):
-                self._serial_errors = set()
-            error_key = str(e)
-            if error_key not in self._serial_errors:
-                self.log_terminal.append(f"Serial read error: {str(e)}")
-                self._serial_errors.add(error_key)
-
-    def process_plot_data(self, plot_index):
-        """Process plot data with peak detection"""
-        try:
-            from scipy.signal import find_peaks
-
-            plot = self.sensor_plots[plot_index]
-            if len(plot['data']['y']) > 1:
-                y_data = np.array(plot['data']['y'])
-                x_data = np.array(plot['data']['x'])
-                threshold = self.threshold_spin.value()
-
-                # Find peaks if enough data points
-                if len(y_data) > self.peak_distance_spin.value():
-                    peaks, _ = find_peaks(y_data,
-                                          height=self.peak_height_spin.value(),
-                                          distance=self.peak_distance_spin.value())
-
-                    # Update peaks scatter plot
-                    if len(peaks) > 0:
-                        plot['peaks_scatter'].setData(
-                            x=x_data[peaks],
-                            y=y_data[peaks]
-                        )
-                    else:
-                        plot['peaks_scatter'].clear()
-
-                    # Find threshold crossings (falling edges)
-                    crossings = []
-                    for i in range(1, len(y_data)):
-                        if y_data[i - 1] >= threshold and y_data[i] < threshold:
-                            crossings.append(i)
-
-                    # Update crossings scatter plot
-                    if len(crossings) > 0:
-                        plot['crossings_scatter'].setData(
-                            x=x_data[crossings],
-                            y=[threshold] * len(crossings)
-                        )
-                    else:
-                        plot['crossings_scatter'].clear()
+        for message in self.acquisition_worker.get_messages():
+            self.log_terminal.append(message)
+
+        frames, host_times = self.acquisition_worker.get_batches()
+        if len(frames):
+            started = self.pipeline_timers.start()
+            self.ingest_frames(frames, host_times)
+            self.pipeline_timers.stop('ingest', started)
+
+    def ingest_frames(self, frames, host_times=None):
+        """Filter a batch of [millis, S1..S32] frames into the plot history and hand raw and filtered frames on"""
+        timestamps = frames[:, 0] / 1000.0  # Convert to seconds
+
+        # A reset in the middle of the batch: ingest up to it, then the rest into a fresh history
+        restarts = np.flatnonzero(np.diff(timestamps) < 0)
+        if len(restarts):
+            split = restarts[0] + 1
+            for part in (slice(None, split), slice(split, None)):
+                self.ingest_frames(frames[part], None if host_times is None else host_times[part])
+            return
 
-        except Exception as e:
-            # Only log peak detection errors once
-            if not hasattr(self, '_peak_error_logged'):
-                self.log_terminal.append(f"Peak detection disabled: {str(e)}")
-                self._peak_error_logged = True
+        # millis() restarts when the Mega resets, so start a fresh history if time goes backwards
+        if (self.history_start_time is None or
+                timestamps[0] - self.history_start_time < (self.sensor_history.latest_time() or 0)):
+            self.reset_history()
+            self.history_start_time = timestamps[0]
+        relative_times = timestamps - self.history_start_time
+
+        timers = self.pipeline_timers
+        self.frames_ingested += len(frames)
+
+        # First 16 sensors are MUX1, next 16 are MUX2; the whole batch goes through the filter chain at once
+        started = timers.start()
+        smoothed = self.filter_chain.update_batch(frames[:, 1:])
+        baselines = None
+        if self.drift_tracker is not None:
+            # Plots, statistics and detectors see the readings with the sensor drift taken out
+            baselines = self.drift_tracker.update_batch(smoothed)
+            smoothed = smoothed - baselines
+        timers.stop('filter', started)
+
+        started = timers.start()
+        self.sensor_history.extend(relative_times, smoothed)
+        self.raw_history.extend(relative_times, frames[:, 1:])
+        timers.stop('history', started)
+
+        # Only the new samples are examined; events are kept per plot for drawing
+        started = timers.start()
+        crossings, peaks = self.event_detector.update(relative_times, smoothed)
+        self.store_events(crossings, peaks)
+        timers.stop('detect', started)
+        started = timers.start()
+        self.channel_stats.update_batch(smoothed)
+        timers.stop('stats', started)
+
+        for subscriber in self.frame_subscribers:
+            subscriber(frames, host_times)  # Recorders only queue the batch for their own thread
+        if self.filtered_subscribers:
+            filtered_frames = np.column_stack((frames[:, 0], smoothed))
+            for subscriber in self.filtered_subscribers:
+                subscriber(filtered_frames, host_times)
+
+        if self.live_detection:
+            # Detectors do their own smoothing, so they get the raw values, and the drift baseline if tracked
+            started = timers.start()
+            detections = self.bit_detectors.update(frames[:, 1:], relative_times, baselines)
+            timers.stop('bits', started)
+            detected = np.flatnonzero(detections.any(axis=0))
+            if len(detected):  # One line per batch keeps a busy array from flooding the log
+                sensors = ', '.join(f"S{i + 1}" for i in detected)
+                self.log_terminal.append(f"Bits detected at {relative_times[-1]:.2f}s: {sensors}")
+
+        # Drawing happens in render_plots at PLOT_FPS, not once per batch
+        self.dirty_plots.update(range(32))
+
+    def reset_history(self):
+        """Drop the plot history and everything detected in it"""
+        self.sensor_history.clear()
+        self.raw_history.clear()
+        self.history_start_time = None
+        self.event_detector.reset()
+        self.channel_stats.reset()
+        if self.drift_tracker is not None:
+            self.drift_tracker.reset()
+        for plot in self.sensor_plots:
+            plot['peak_events'].clear()
+            plot['crossing_events'].clear()
+
+    def store_events(self, crossings, peaks):
+        """Keep detected (channel, time[, value]) events with their plots"""
+        for channel, timestamp in crossings:
+            self.sensor_plots[channel]['crossing_events'].append((timestamp, self.event_detector.threshold[channel]))
+        for channel, timestamp, value in peaks:
+            self.sensor_plots[channel]['peak_events'].append((timestamp, value))
+
+    def visible_plot_range(self):
+        """Indices of the plots on the current tab, or an empty range when no plot page is shown"""
+        mux_index = self.tab_widget.currentIndex()
+        if mux_index not in (0, 1):
+            return range(0)
+        return range(mux_index * 16, mux_index * 16 + 16)
+
+    def render_plots(self):
+        """Redraw the dirty plots of the visible multiplexer tab; hidden ones stay dirty until shown"""
+        timers = self.pipeline_timers
+        render_started = timers.start()
+        for plot_index in self.visible_plot_range():
+            if plot_index in self.dirty_plots:
+                self.dirty_plots.discard(plot_index)
+                started = timers.start()
+                self.update_plot(plot_index)
+                timers.stop('plot', started)
+        timers.stop('render', render_started)
+
+    def set_plot_fps(self, fps):
+        """Change how often the visible plots are redrawn"""
+        self.PLOT_FPS = max(1, fps)
+        self.render_timer.start(int(1000 / self.PLOT_FPS))
+
+    def start_acquisition(self, frame_format='text', protocol_version=1):
+        """Start the background reader for the sensor serial connection"""
+        self.stop_acquisition()
+        if self.sensor_serial:
+            self.acquisition_worker = SerialAcquisitionWorker(self.sensor_serial, frame_format,
+                                                              timers=self.pipeline_timers,
+                                                              protocol_version=protocol_version)
+            self.acquisition_worker.start()
+            self.log_terminal.append(f"Sensor acquisition started ({frame_format} frames)")
+
+    def start_replay(self, path, speed=1.0):
+        """Feed a recording through the live pipeline in place of the sensor port"""
+        self.stop_acquisition()
+        self.reset_history()  # Start the plots at the recording's first frame
+        self.acquisition_worker = RecordingReplayWorker(path, speed)
+        self.acquisition_worker.start()
+
+    def stop_acquisition(self):
+        """Stop the background reader if it is running"""
+        if self.acquisition_worker:
+            self.acquisition_worker.stop()
+            self.acquisition_worker = None
 
     def create_fan_panel(self):
         """Create fan control panel"""
@@ -966,8 +1239,8 @@ class SensorArrayGUI(QMainWindow):
                 spin = QSpinBox()
                 spin.setRange(0, 1023)
                 # Initialize with a value close to the current sensor reading if available
-                if sensor_num in self.sensor_plots and self.sensor_plots[sensor_num]['data']['y']:
-                    current_val = self.sensor_plots[sensor_num]['data']['y'][-1]
+                if len(self.sensor_history):
+                    current_val = self.sensor_history.latest()[sensor_num]
                     spin.setValue(int(current_val * 0.9))  # Set to 90% of current value
                 else:
                     spin.setValue(500)  # Default value
@@ -999,47 +1272,243 @@ class SensorArrayGUI(QMainWindow):
         auto_all_btn.setToolTip("Set thresholds for all sensors based on their readings")
         auto_threshold_layout.addWidget(auto_all_btn)
 
+        # Statistics the auto threshold is based on
+        auto_threshold_layout.addWidget(QLabel("k:"))
+        sigma_spin = QDoubleSpinBox()
+        sigma_spin.setRange(0.0, 10.0)
+        sigma_spin.setSingleStep(0.5)
+        sigma_spin.setValue(self.THRESHOLD_SIGMA)
+        sigma_spin.setToolTip("Threshold = center + k × spread")
+        sigma_spin.valueChanged.connect(self.set_threshold_sigma)
+        auto_threshold_layout.addWidget(sigma_spin)
+
+        self.threshold_stats_combo = QComboBox()
+        self.threshold_stats_combo.addItem("Mean + k·σ (last 100 samples)", 'window')
+        self.threshold_stats_combo.addItem("Mean + k·σ (decaying, half-life 500)", 'decaying')
+        self.threshold_stats_combo.addItem("Median + k·MAD (robust to bursts)", 'robust')
+        self.threshold_stats_combo.currentIndexChanged.connect(self.set_threshold_stats)
+        auto_threshold_layout.addWidget(self.threshold_stats_combo)
+
         detection_layout.addLayout(auto_threshold_layout)
 
+        # Smoothing controls
+        smoothing_layout = QHBoxLayout()
+        smoothing_layout.addWidget(QLabel("Smoothing Window:"))
+        smoothing_spin = QSpinBox()
+        smoothing_spin.setRange(1, 200)
+        smoothing_spin.setValue(self.SMOOTHING_WINDOW)
+        smoothing_spin.setSuffix(" samples")
+        smoothing_spin.valueChanged.connect(self.set_smoothing_window)
+        smoothing_spin.setToolTip(f"Moving average length in the filter chain: {self.filter_chain.describe()}")
+        smoothing_layout.addWidget(smoothing_spin)
+
+        smoothing_layout.addWidget(QLabel("Plot:"))
+        self.plot_stream_combo = QComboBox()
+        self.plot_stream_combo.addItem("Filtered", 'filtered')
+        self.plot_stream_combo.addItem("Raw", 'raw')
+        self.plot_stream_combo.currentIndexChanged.connect(self.set_plot_stream)
+        smoothing_layout.addWidget(self.plot_stream_combo)
+
+        smoothing_layout.addWidget(QLabel("Redraw:"))
+        plot_fps_spin = QSpinBox()
+        plot_fps_spin.setRange(1, 60)
+        plot_fps_spin.setValue(self.PLOT_FPS)
+        plot_fps_spin.setSuffix(" fps")
+        plot_fps_spin.setToolTip("How often the visible plots are redrawn; lower it if the GUI falls behind")
+        plot_fps_spin.valueChanged.connect(self.set_plot_fps)
+        smoothing_layout.addWidget(plot_fps_spin)
+
+        smoothing_layout.addWidget(QLabel("Drift:"))
+        self.drift_combo = QComboBox()
+        self.drift_combo.addItem("Off", None)
+        self.drift_combo.addItem("Remove lower envelope (EMA)", 'ema')
+        self.drift_combo.addItem("Remove rolling minimum", 'min')
+        self.drift_combo.setToolTip("Subtract a slowly tracked baseline so MQ3/MICS5524 drift does not move thresholds")
+        self.drift_combo.currentIndexChanged.connect(self.set_drift_compensation)
+        smoothing_layout.addWidget(self.drift_combo)
+
+        smoothing_layout.addWidget(QLabel("Baseline Window:"))
+        baseline_spin = QSpinBox()
+        baseline_spin.setRange(1, 5000)
+        baseline_spin.setValue(self.BASELINE_WINDOW)
+        baseline_spin.setSuffix(" samples")
+        baseline_spin.valueChanged.connect(self.set_baseline_window)
+        smoothing_layout.addWidget(baseline_spin)
+
+        detection_layout.addLayout(smoothing_layout)
+
+        # Peak and crossing markers
+        peak_layout = QHBoxLayout()
+        peak_layout.addWidget(QLabel("Peak Height:"))
+        peak_layout.addWidget(self.peak_height_spin)
+        peak_layout.addWidget(QLabel("Peak Distance:"))
+        self.peak_distance_spin.setSuffix(" samples")
+        peak_layout.addWidget(self.peak_distance_spin)
+        self.peak_height_spin.valueChanged.connect(self.update_detection_settings)
+        self.peak_distance_spin.valueChanged.connect(self.update_detection_settings)
+        show_events_check = QCheckBox("Mark Peaks/Crossings")
+        show_events_check.setChecked(self.show_events)
+        show_events_check.toggled.connect(self.set_show_events)
+        peak_layout.addWidget(show_events_check)
+        detection_layout.addLayout(peak_layout)
+
+        live_detection_check = QCheckBox("Live Bit Detection")
+        live_detection_check.setChecked(self.live_detection)
+        live_detection_check.toggled.connect(self.set_live_detection)
+        detection_layout.addWidget(live_detection_check)
+
         return detection_panel
 
+    def create_stats_panel(self):
+        """Create the panel showing throughput, queue depths and per-stage latency of the data pipeline"""
+        stats_panel = self.stats_panel = QFrame()
+        stats_panel.setFrameStyle(QFrame.Panel | QFrame.Raised)
+        stats_layout = QVBoxLayout(stats_panel)
+
+        controls_layout = QHBoxLayout()
+        profile_check = QCheckBox("Time Pipeline Stages")
+        profile_check.setChecked(self.pipeline_timers.enabled)
+        profile_check.setToolTip("Costs a clock read per stage while on; off, the timers do nothing")
+        profile_check.toggled.connect(self.set_pipeline_profiling)
+        controls_layout.addWidget(profile_check)
+        controls_layout.addStretch()
+        stats_layout.addLayout(controls_layout)
+
+        self.throughput_label = QLabel("Frames/s: -")
+        self.queue_label = QLabel("Queued batches: -")
+        self.loop_lag_label = QLabel("Event loop lag: -")
+        self.link_label = QLabel("Serial link: -")
+        self.link_label.setToolTip("Loss is estimated from gaps in the device's millis() timestamps; "
+                                   "binary frames also count it exactly from their sequence numbers")
+        for label in (self.throughput_label, self.queue_label, self.loop_lag_label, self.link_label):
+            stats_layout.addWidget(label)
+
+        # One row per stage timed during the last refresh interval
+        self.stage_table = QTableWidget(0, 5)
+        self.stage_table.setHorizontalHeaderLabels(["Stage", "Calls", "p50 (µs)", "p99 (µs)", "Max (µs)"])
+        self.stage_table.verticalHeader().setVisible(False)
+        self.stage_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        stats_layout.addWidget(self.stage_table)
+
+        # Event loop lag: how much later than asked a short timer fires, measured only while timing
+        self.LOOP_LAG_INTERVAL_MS = 20
+        self.loop_lag_timer = QTimer()
+        self.loop_lag_timer.setTimerType(Qt.PreciseTimer)  # Coarse timers may fire up to 5% early
+        self.loop_lag_timer.timeout.connect(self.measure_loop_lag)
+        self._loop_lag_last = None
+        if self.pipeline_timers.enabled:
+            self.loop_lag_timer.start(self.LOOP_LAG_INTERVAL_MS)
+
+        self.stats_timer = QTimer()
+        self.stats_timer.timeout.connect(self.update_pipeline_stats)
+        self.stats_timer.start(1000)
+        self._stats_last = (time.monotonic(), 0)
+        return stats_panel
+
+    def set_pipeline_profiling(self, enabled):
+        """Switch the per-stage timers and the event loop lag timer on or off"""
+        self.pipeline_timers.reset()
+        self.pipeline_timers.enabled = enabled
+        self._loop_lag_last = None
+        if enabled:
+            self.loop_lag_timer.start(self.LOOP_LAG_INTERVAL_MS)
+        else:
+            self.loop_lag_timer.stop()
+        self.log_terminal.append(f"Pipeline timing {'enabled' if enabled else 'disabled'}")
+
+    def measure_loop_lag(self):
+        """Record how late this timer fired compared with its interval"""
+        now = time.perf_counter_ns()
+        if self._loop_lag_last is not None:
+            lag = now - self._loop_lag_last - self.LOOP_LAG_INTERVAL_MS * 1000000
+            self.pipeline_timers.record('loop_lag', max(lag, 0))
+        self._loop_lag_last = now
+
+    def update_pipeline_stats(self):
+        """Refresh the Pipeline Stats tab with the last interval's numbers and start a new interval"""
+        now = time.monotonic()
+        last_time, last_frames = self._stats_last
+        self._stats_last = (now, self.frames_ingested)
+        if self.tab_widget.currentWidget() is not self.stats_panel:
+            self.pipeline_timers.reset()  # Nobody is looking; start the next interval fresh
+            return
+
+        self.throughput_label.setText(f"Frames/s: {(self.frames_ingested - last_frames) / (now - last_time):.0f}")
+        acquisition_depth = self.acquisition_worker.frame_queue.qsize() if self.acquisition_worker else '-'
+        recorder_depth = self.recorder.frame_queue.qsize() if self.recorder else '-'
+        self.queue_label.setText(f"Queued batches: acquisition {acquisition_depth}, recorder {recorder_depth}")
+        self.link_label.setText(self.link_summary())
+
+        rows = self.pipeline_timers.summary(reset=True)
+        lag = [row for row in rows if row[0] == 'loop_lag']
+        if lag:
+            self.loop_lag_label.setText(f"Event loop lag: p50 {lag[0][2] / 1000:.1f} ms, "
+                                        f"p99 {lag[0][3] / 1000:.1f} ms, max {lag[0][4] / 1000:.1f} ms")
+        else:
+            self.loop_lag_label.setText("Event loop lag: -")
+
+        self.stage_table.setRowCount(len(rows))
+        for row, (stage, count, p50, p99, longest) in enumerate(rows):
+            for column, text in enumerate((stage, str(count), f"{p50:.1f}", f"{p99:.1f}", f"{longest:.1f}")):
+                self.stage_table.setItem(row, column, QTableWidgetItem(text))
+
+    def link_summary(self):
+        """One line of frame loss, corrupt frame and backlog counters for the sensor connection"""
+        link_monitor = getattr(self.acquisition_worker, 'link_monitor', None)  # Replays have no serial link
+        if link_monitor is None:
+            return "Serial link: -"
+        link = link_monitor.snapshot()
+        worker = self.acquisition_worker
+        has_sequence = worker.frame_format == 'binary' or worker.protocol_version == 2
+        sequence = f" ({link['sequence_lost']} by sequence number)" if has_sequence else ""
+        summary = (f"Serial link: {link['frame_rate']:.1f} frames/s received, device sends {link['device_rate']:.1f}/s; "
+                   f"{link['lost_frames']} lost in {link['gaps']} gaps{sequence}, longest {link['longest_gap_ms']:.0f} ms; "
+                   f"{link['corrupt_frames']} corrupt; backlog {link['backlog_bytes']} B (max {link['max_backlog_bytes']} B)")
+        if link['scan_us_mean'] is not None:
+            drift = link['clock_drift_ppm']
+            summary += (f"\nScan time: {link['scan_us_last'] / 1000:.2f} ms (mean {link['scan_us_mean'] / 1000:.2f}, "
+                        f"max {link['scan_us_max'] / 1000:.2f}); device clock drift: "
+                        + ("measuring..." if drift is None else f"{drift:+.0f} ppm"))
+        return summary
+
     def calculate_auto_threshold_mux(self, mux_index):
         """Calculate appropriate thresholds for one multiplexer automatically"""
-        start_idx = mux_index * 16
-        end_idx = start_idx + 16
+        self.auto_threshold_sensors(range(mux_index * 16, mux_index * 16 + 16))
+
+    def calculate_auto_threshold_all(self):
+        """Calculate appropriate thresholds for all sensors automatically"""
+        self.auto_threshold_sensors(range(32))
 
-        for i in range(start_idx, end_idx):
-            plot = self.sensor_plots[i]
-            if plot['data']['y']:
-                # Get recent values
-                recent_values = plot['data']['y'][-100:]  # Last 100 readings
-                if recent_values:
-                    mean = np.mean(recent_values)
-                    std = np.std(recent_values)
+    def auto_threshold_sensors(self, sensor_indices):
+        """Set each sensor's threshold to center + THRESHOLD_SIGMA * spread from the running statistics"""
+        stats = self.channel_stats.get(self.threshold_stats)
+        if not stats.count:
+            self.log_terminal.append("No data available for auto threshold")
+            return
 
-                    # Set threshold to mean + 1 standard deviation
-                    threshold = int(mean + std)
+        # Mean and std, or median and scaled MAD for the robust statistics
+        center, spread = stats.center, stats.spread
+        thresholds = center + self.THRESHOLD_SIGMA * spread
+        for i in sensor_indices:
+            threshold = int(np.clip(thresholds[i], 0, 1023))
 
-                    # Update spinbox and threshold line
-                    self.threshold_spins[i].setValue(threshold)
-                    plot['threshold_line'].setPos(threshold)
+            # Update spinbox; the threshold line follows it
+            self.threshold_spins[i].setValue(threshold)
 
-                    # Log the adjustment
-                    self.log_terminal.append(f"Auto threshold S{i + 1}: {threshold} (mean: {mean:.1f}, std: {std:.1f})")
+            # Log the adjustment
+            self.log_terminal.append(
+                f"Auto threshold S{i + 1}: {threshold} (center: {center[i]:.1f}, spread: {spread[i]:.1f})")
+
+    def set_threshold_sigma(self, sigma):
+        """Change the sigma multiplier used by auto threshold"""
+        self.THRESHOLD_SIGMA = sigma
+
+    def set_threshold_stats(self, index):
+        """Choose the statistics auto threshold uses; they restart from the recent plot history"""
+        self.threshold_stats = self.threshold_stats_combo.itemData(index)
+        warm_up = self.channel_stats.warm_up_samples[self.threshold_stats]
+        self.channel_stats.select(self.threshold_stats, self.sensor_history.values(warm_up).T)
 
-    def calculate_auto_threshold_all(self):
-        """Calculate appropriate thresholds for all sensors automatically"""
-        for i in range(32):
-            plot = self.sensor_plots[i]
-            if plot['data']['y']:
-                recent_values = plot['data']['y'][-100:]
-                if recent_values:
-                    mean = np.mean(recent_values)
-                    std = np.std(recent_values)
-                    threshold = int(mean + std)
-                    self.threshold_spins[i].setValue(threshold)
-                    plot['threshold_line'].setPos(threshold)
-                    self.log_terminal.append(f"Auto threshold S{i + 1}: {threshold}")
     def update_pattern_delay(self):
         try:
             new_delay = float(self.pattern_delay_input.text())
@@ -1054,14 +1523,27 @@ class SensorArrayGUI(QMainWindow):
             dialog = PortSelectionDialog(self)
             if dialog.exec_():
                 fan_port, sensor_port, fan_baud, sensor_baud = dialog.get_selected_ports()
-                if fan_port or sensor_port:  # Connect if at least one port is selected
-                    self.connect_devices(fan_port, sensor_port, fan_baud, sensor_baud)
+                replay_file, replay_speed = dialog.get_replay_settings()
+                if fan_port or sensor_port or replay_file:  # Connect if at least one port is selected
+                    self.connect_devices(fan_port, sensor_port, fan_baud, sensor_baud,
+                                         frame_format=dialog.get_frame_format(),
+                                         protocol_version=dialog.get_protocol_version(),
+                                         scan_settings=dialog.get_scan_settings(),
+                                         replay_file=replay_file, replay_speed=replay_speed)
         except Exception as e:
             self.log_terminal.append(f"Port selection error: {str(e)}")
             QMessageBox.warning(self, "Error", f"Port selection failed: {str(e)}")
 
-    def connect_devices(self, fan_port, sensor_port, fan_baud=115200, sensor_baud=115200):
-        """Connect to single Arduino handling both fans and sensors"""
+    def connect_devices(self, fan_port, sensor_port, fan_baud=115200, sensor_baud=115200, frame_format='text',
+                        replay_file=None, replay_speed=1.0, protocol_version=1, scan_settings=None):
+        """Connect to single Arduino handling both fans and sensors, or replay a recording instead"""
+        # Stop reading before the port goes away
+        self.stop_acquisition()
+
+        if replay_file:
+            self.start_replay(replay_file, replay_speed)
+            return
+
         # Close existing connection if any
         if self.fan_serial:
             try:
@@ -1096,12 +1578,37 @@ class SensorArrayGUI(QMainWindow):
                 if not data_received:
                     self.log_terminal.append("Warning: No initial data received")
 
+                # The Mega always boots in protocol 1 text mode; ask for what was selected
+                if protocol_version == 2:
+                    self.fan_serial.write(b"PROTOCOL,2\n")
+                    self.log_terminal.append("Requested protocol 2 frames (frame counter and scan times)")
+                if frame_format == 'binary':
+                    self.fan_serial.write(b"FORMAT,BIN\n")
+                    self.log_terminal.append("Requested binary sensor frames")
+                if scan_settings:
+                    self.configure_sensor_scan(*scan_settings)
+
+                self.start_acquisition(frame_format, protocol_version)
+
             except Exception as e:
                 self.log_terminal.append(f"Controller connection error: {str(e)}")
                 self.fan_serial = None
                 self.sensor_serial = None
                 QMessageBox.warning(self, "Connection Error",
                                     f"Failed to connect to controller: {str(e)}")
+    def configure_sensor_scan(self, mode, settle_us, rate):
+        """Set the Mega's multiplexer scan mode ('PAR' or 'SEQ'), settle time and frame rate (0 = maximum)"""
+        if not self.fan_serial:
+            self.log_terminal.append("Cannot configure sensor scan: controller not connected")
+            return
+        try:
+            self.fan_serial.write(f"SCAN,{mode},{settle_us}\n".encode())
+            self.fan_serial.write(f"RATE,{rate}\n".encode())
+            self.log_terminal.append(f"Sensor scan: {'parallel' if mode == 'PAR' else 'sequential'}, "
+                                     f"{settle_us} us settle, {rate or 'maximum'} frames/s")
+        except Exception as e:
+            self.log_terminal.append(f"Error configuring sensor scan: {str(e)}")
+
     def create_fan_button(self, i, j, fan_num):
         """Create a fan button with proper event handling"""
         btn = QPushButton()
@@ -1216,73 +1723,91 @@ class SensorArrayGUI(QMainWindow):
 
     def setup_bit_detectors(self):
         """Initialize bit detectors for each sensor"""
-        for i in range(32):  # Changed from 10 to 32
-            self.bit_detectors[i] = BitDetector(threshold=250)
-
-    def update_plot(self, plot_index, timestamp, value):
-        """Update plot with fixed window size support and proper smoothing"""
+        self.bit_detectors = BitDetectorBank(num_channels=32, threshold=250, baseline_window=self.BASELINE_WINDOW)
+
+    def set_smoothing_window(self, window):
+        """Change the length of the moving average stages; filtering restarts from the next frame"""
+        self.SMOOTHING_WINDOW = window
+        config = [(name, dict(settings, window=window) if name == 'mean' else settings)
+                  for name, settings in self.filter_chain.config]
+        self.filter_chain = FilterChain(config, num_channels=32)
+
+    def set_drift_compensation(self, index):
+        """Start removing sensor drift with the chosen baseline tracker, or stop"""
+        method = self.drift_combo.itemData(index)
+        if method:
+            self.drift_tracker = create_baseline_tracker(method, num_channels=32, **DRIFT_BASELINES[method])
+        else:
+            self.drift_tracker = None
+        # Statistics and detector baselines from before no longer match the values
+        self.channel_stats.reset()
+        self.bit_detectors.reset()
+        self.log_terminal.append(f"Drift compensation: {self.drift_combo.currentText()}")
+
+    def plotted_history(self):
+        """The ring buffer the plots show: filtered or raw"""
+        return self.raw_history if self.plot_stream == 'raw' else self.sensor_history
+
+    def set_plot_stream(self, index):
+        """Plot the filtered or the raw readings"""
+        self.plot_stream = self.plot_stream_combo.itemData(index)
+        self.dirty_plots.update(range(32))
+
+    def set_baseline_window(self, window):
+        """Change how many samples every bit detector averages for its baseline"""
+        self.BASELINE_WINDOW = window
+        self.bit_detectors.set_baseline_window(window)
+
+    def set_show_events(self, enabled):
+        """Show or hide the peak and crossing markers"""
+        self.show_events = enabled
+        self.dirty_plots.update(range(32))
+
+    def set_live_detection(self, enabled):
+        """Turn bit detection on the incoming frames on or off"""
+        self.live_detection = enabled
+        self.bit_detectors.reset()
+        self.log_terminal.append(f"Live bit detection {'enabled' if enabled else 'disabled'}")
+
+    def update_plot(self, plot_index):
+        """Redraw one plot from the shared history with fixed window size support"""
         try:
             plot = self.sensor_plots[plot_index]
+            window = plot.get('window_size')
+            view_box = plot['widget'].getViewBox()
+            history = self.plotted_history()
+            if not len(history):
+                return
 
-            # Initialize start_time if not set
-            if plot['start_time'] is None:
-                plot['start_time'] = timestamp
-
-            # Calculate relative time from start
-            relative_time = timestamp - plot['start_time']
-
-            # Apply smoothing using the buffer
-            if not hasattr(plot, 'value_buffer'):
-                plot['value_buffer'] = []
-
-            plot['value_buffer'].append(value)
-            if len(plot['value_buffer']) > self.SMOOTHING_WINDOW:
-                plot['value_buffer'].pop(0)
-
-            # Calculate smoothed value
-            if len(plot['value_buffer']) >= 3:  # Only smooth if we have enough data points
-                smoothed_value = sum(plot['value_buffer']) / len(plot['value_buffer'])
+            # Time span to draw: the fixed window, everything when X auto-ranges, else what is in view
+            latest_time = history.latest_time()
+            if window:
+                start_time, end_time = latest_time - window, latest_time
+            elif view_box.state['autoRange'][0]:
+                start_time, end_time = history.start_time(), latest_time
             else:
-                smoothed_value = value
-
-            # Store new data point
-            plot['data']['x'].append(relative_time)
-            plot['data']['y'].append(smoothed_value)
-
-            # If we have a fixed window size, adjust the data storage
-            if 'window_size' in plot and plot['window_size']:
-                window = plot['window_size']
-
-                # Keep only data within the window
-                while len(plot['data']['x']) > 0 and plot['data']['x'][-1] - plot['data']['x'][0] > window:
-                    plot['data']['x'].pop(0)
-                    plot['data']['y'].pop(0)
-
-                # Shift all times to keep the window starting at 0
-                if len(plot['data']['x']) > 0:
-                    time_shift = plot['data']['x'][-1] - window
-                    if time_shift > 0:
-                        plot['data']['x'] = [t - time_shift for t in plot['data']['x']]
-                        plot['start_time'] += time_shift
+                start_time, end_time = view_box.viewRange()[0]
 
-            # Update main data curve
-            plot['curve'].setData(plot['data']['x'], plot['data']['y'])
+            # About one point per pixel: raw samples when zoomed in, min/max envelopes when zoomed out
+            max_points = max(int(view_box.width()), 200)
+            times, values = history.lod_window(start_time, end_time, plot_index, max_points)
+            if not len(times):
+                return
 
-            # Update threshold line with the correct sensor's threshold value
-            plot['threshold_line'].setPos(self.threshold_spins[plot_index].value())
+            # Update main data curve; the threshold line follows its spinbox on its own
+            plot['curve'].setData(times, values, connect=connect_gaps(times))
+            self.process_plot_data(plot_index, times[0])
 
-            # If we have a fixed window size, maintain it
-            if 'window_size' in plot and plot['window_size']:
-                plot['widget'].setXRange(0, plot['window_size'], padding=0)
+            # If we have a fixed window size, scroll it along with the newest data; linked compact plots follow the first
+            if window and (PLOT_LAYOUT != 'compact' or plot_index % 16 == 0):
+                plot['widget'].setXRange(max(0, latest_time - window), max(window, latest_time), padding=0)
 
             # Auto-scale Y axis if enabled
-            if plot['widget'].getViewBox().state['autoRange'][1]:
-                if plot['data']['y']:
-                    min_val = min(plot['data']['y'])
-                    max_val = max(plot['data']['y'])
-                    value_range = max_val - min_val
-                    top_padding = value_range * 0.1
-                    plot['widget'].setYRange(min_val, max_val + top_padding, padding=0)
+            if view_box.state['autoRange'][1]:
+                min_val, max_val = float(values.min()), float(values.max())
+                value_range = max_val - min_val
+                top_padding = value_range * 0.1
+                plot['widget'].setYRange(min_val, max_val + top_padding, padding=0)
 
         except Exception as e:
             if not hasattr(self, '_plot_errors'):
@@ -1294,67 +1819,46 @@ class SensorArrayGUI(QMainWindow):
 
     def get_recent_bits(self, sensor_index, time_window=5.0):
         """Get bits detected in the last time_window seconds for a sensor"""
-        detector = self.bit_detectors.get(sensor_index)
-        if not detector:
+        detector = self.bit_detectors
+        if detector is None or not 0 <= sensor_index < detector.num_channels:
             return []
 
-        current_time = time.time() - self.start_time
+        current_time = self.sensor_history.latest_time() or 0  # Detections use plot time
         recent_bits = [
-            bit for bit, t in zip(detector.bits, detector.timestamps)
+            bit for bit, t in zip(detector.bits[sensor_index], detector.timestamps[sensor_index])
             if current_time - t <= time_window
         ]
         return recent_bits
 
     def get_detection_stats(self, sensor_index):
         """Get detection statistics for a sensor"""
-        detector = self.bit_detectors.get(sensor_index)
-        if not detector:
+        detector = self.bit_detectors
+        if detector is None or not 0 <= sensor_index < detector.num_channels:
             return {}
 
         return {
-            'total_detections': detector.detection_count,
-            'last_detection_time': detector.last_detection,
+            'total_detections': int(detector.detection_count[sensor_index]),
+            'last_detection_time': float(detector.last_detection[sensor_index]),
             'recent_bits': self.get_recent_bits(sensor_index)
         }
 
-    def process_plot_data(self, plot_index):
-        """Process current data for peaks and threshold crossings for a single plot"""
+    def process_plot_data(self, plot_index, start_time=0.0):
+        """Draw the peaks and threshold crossings detected since start_time for a single plot"""
         try:
             plot = self.sensor_plots[plot_index]
-            if len(plot['data']['y']) > 1:
-                y_data = np.array(plot['data']['y'])
-                x_data = np.array(plot['data']['x'])
-                threshold = self.threshold_spin.value()
-
-                # Find peaks if enough data points
-                if len(y_data) > self.peak_distance_spin.value():
-                    peaks, _ = find_peaks(y_data,
-                                          height=self.peak_height_spin.value(),
-                                          distance=self.peak_distance_spin.value())
-
-                    # Update peaks scatter plot
-                    if len(peaks) > 0:
-                        plot['peaks_scatter'].setData(
-                            x=x_data[peaks],
-                            y=y_data[peaks]
-                        )
-                    else:
-                        plot['peaks_scatter'].clear()
-
-                    # Find threshold crossings (falling edges)
-                    crossings = []
-                    for i in range(1, len(y_data)):
-                        if y_data[i - 1] >= threshold and y_data[i] < threshold:
-                            crossings.append(i)
-
-                    # Update crossings scatter plot
-                    if len(crossings) > 0:
-                        plot['crossings_scatter'].setData(
-                            x=x_data[crossings],
-                            y=[threshold] * len(crossings)
-                        )
-                    else:
-                        plot['crossings_scatter'].clear()
+            if not self.show_events:
+                plot['peaks_scatter'].clear()
+                plot['crossings_scatter'].clear()
+                return
+
+            for events_key, scatter_key in (('peak_events', 'peaks_scatter'),
+                                            ('crossing_events', 'crossings_scatter')):
+                events = [event for event in plot[events_key] if event[0] >= start_time]
+                if events:
+                    x_data, y_data = zip(*events)
+                    plot[scatter_key].setData(x=x_data, y=y_data)
+                else:
+                    plot[scatter_key].clear()
 
         except Exception as e:
             self.log_terminal.append(f"Data processing error: {str(e)}")
@@ -1507,66 +2011,43 @@ class SensorArrayGUI(QMainWindow):
                 self.log_terminal.append(f"Error stopping pattern: {str(e)}")
 
     def update_detection_settings(self):
-        """Update threshold lines and reprocess data"""
-        threshold = self.threshold_spin.value()
-        # Update all threshold lines
-        for plot in self.sensor_plots:
-            plot['threshold_line'].setValue(threshold)
+        """Apply the peak settings and reprocess data"""
+        self.event_detector.peak_height = self.peak_height_spin.value()
+        self.event_detector.peak_distance = self.peak_distance_spin.value()
         # Reprocess current data
         self.process_current_data()
 
     def calculate_auto_threshold(self):
         """Calculate threshold automatically based on current data"""
-        all_values = []
-        for plot in self.sensor_plots:
-            if plot['data']['y']:
-                all_values.extend(plot['data']['y'])
+        stats = self.channel_stats.get(self.threshold_stats)
 
-        if all_values:
-            mean = np.mean(all_values)
-            std = np.std(all_values)
-            threshold = int(mean + 2 * std)  # 2 sigma threshold
+        if stats.count:
+            # Pool the per-sensor statistics into one distribution for all sensors
+            center = stats.center.mean()
+            spread = np.sqrt(np.mean(stats.spread ** 2 + stats.center ** 2) - center ** 2)
+            threshold = int(center + self.THRESHOLD_SIGMA * spread)
             self.threshold_spin.setValue(threshold)
             self.log_terminal.append(f"Auto threshold set to: {threshold}")
         else:
             self.log_terminal.append("No data available for auto threshold")
 
     def process_current_data(self):
-        """Process current data for peaks and threshold crossings"""
-
+        """Run peak and crossing detection again over the whole history, e.g. after a settings change"""
         for plot in self.sensor_plots:
-            if len(plot['data']['y']) > 0:
-                y_data = np.array(plot['data']['y'])
-                x_data = np.array(plot['data']['x'])
-
-                # Find peaks
-                peaks, _ = find_peaks(y_data,
-                                      height=self.peak_height_spin.value(),
-                                      distance=self.peak_distance_spin.value())
-
-                # Find threshold crossings (falling edges)
-                threshold = self.threshold_spin.value()
-                crossings = []
-                for i in range(1, len(y_data)):
-                    if y_data[i - 1] >= threshold and y_data[i] < threshold:
-                        crossings.append(i)
-
-                # Update scatter plots
-                if len(peaks) > 0:
-                    plot['peaks_scatter'].setData(x=x_data[peaks],
-                                                  y=y_data[peaks])
-                else:
-                    plot['peaks_scatter'].clear()
+            plot['peak_events'].clear()
+            plot['crossing_events'].clear()
 
-                if len(crossings) > 0:
-                    plot['crossings_scatter'].setData(
-                        x=x_data[crossings],
-                        y=[threshold] * len(crossings))
-                else:
-                    plot['crossings_scatter'].clear()
+        self.event_detector.reset()
+        if len(self.sensor_history):
+            times, values = self.sensor_history.window()
+            crossings, peaks = self.event_detector.update(times, values.T)
+            self.store_events(crossings, peaks)
+        self.dirty_plots.update(range(32))
 
     def closeEvent(self, event):
         self.stop_spray_pattern()  # Stop any running pattern
+        self.stop_acquisition()
+        self.stop_recording()  # Write out any frames still queued
         if self.fan_serial:
             try:
                 # Turn all fans off before closing
@@ -1582,11 +2063,12 @@ class SensorArrayGUI(QMainWindow):
             except:
                 pass
 
+        self.log_terminal.flush()  # Get the last messages into the log file
         event.accept()
 
 
 class BitDetector:
-    def __init__(self, threshold=500, min_gap=10, window_size=5):
+    def __init__(self, threshold=500, min_gap=10, window_size=5, baseline_window=50):
         self.threshold = threshold
         self.min_gap = min_gap
         self.window_size = window_size
@@ -1596,10 +2078,10 @@ class BitDetector:
         self.timestamps = []
         self.samples_since_last = 0
         self.detection_count = 0
-        self.buffer = []  # Buffer for moving average
+        self.smoother = RunningMean(num_channels=1, window=window_size)  # Moving average
         self.baseline = None
-        self.baseline_samples = []
-        self.baseline_window = 50  # Samples to establish baseline
+        self.baseline_window = baseline_window  # Samples to establish baseline
+        self.baseline_mean = RunningMean(num_channels=1, window=baseline_window)
         self.trigger_threshold = 0.15  # 15% change from baseline triggers detection
 
     def reset(self):
@@ -1610,28 +2092,28 @@ class BitDetector:
         self.timestamps = []
         self.samples_since_last = 0
         self.detection_count = 0
-        self.buffer = []
+        self.smoother.reset()
+        self.baseline = None
+        self.baseline_mean.reset()
+
+    def set_baseline_window(self, window):
+        """Change the baseline length; the baseline is re-established from scratch"""
+        self.baseline_window = window
+        self.baseline_mean.resize(window)
         self.baseline = None
-        self.baseline_samples = []
 
     def calculate_baseline(self, value):
         """Establish or update the baseline"""
-        self.baseline_samples.append(value)
-        if len(self.baseline_samples) > self.baseline_window:
-            self.baseline_samples.pop(0)
-        self.baseline = sum(self.baseline_samples) / len(self.baseline_samples)
+        self.baseline = float(self.baseline_mean.update((value,))[0])
 
     def smooth_value(self, value):
         """Apply moving average smoothing"""
-        self.buffer.append(value)
-        if len(self.buffer) > self.window_size:
-            self.buffer.pop(0)
-        return sum(self.buffer) / len(self.buffer)
+        return float(self.smoother.update((value,))[0])
 
     def update(self, raw_value, timestamp):
         """Process new sensor value with improved detection"""
         # Initialize or update baseline
-        if self.baseline is None or len(self.baseline_samples) < self.baseline_window:
+        if self.baseline is None or self.baseline_mean.count < self.baseline_window:
             self.calculate_baseline(raw_value)
             return False, None
 
@@ -1668,6 +2150,136 @@ class BitDetector:
         return result
 
 
+class BitDetectorBank:
+    """BitDetector for many channels at once, holding all per-channel state as arrays.
+
+    Frames are processed in order, but each step covers every channel with a
+    handful of array operations. The detections are the same as running one
+    BitDetector per channel on the same values.
+    """
+
+    def __init__(self, num_channels=32, threshold=500, min_gap=10, window_size=5, baseline_window=50):
+        self.num_channels = num_channels
+        self.threshold = np.full(num_channels, threshold)
+        self.min_gap = min_gap
+        self.window_size = window_size
+        self.baseline_window = baseline_window
+        self.trigger_threshold = 0.15  # 15% change from baseline triggers detection
+        self.reset()
+
+    def reset(self):
+        """Reset the state of every channel"""
+        n = self.num_channels
+        self.last_detection = np.zeros(n)
+        self.last_state = np.zeros(n, dtype=bool)
+        self.samples_since_last = np.zeros(n, dtype=np.int64)
+        self.detection_count = np.zeros(n, dtype=np.int64)
+        self.bits = [[] for _ in range(n)]
+        self.timestamps = [[] for _ in range(n)]
+
+        # Moving average and baseline rings, one column per channel
+        self._smooth = self._new_mean(self.window_size)
+        self._baseline = self._new_mean(self.baseline_window)
+
+    def set_baseline_window(self, window):
+        """Change the baseline length; every baseline is re-established from scratch"""
+        self.baseline_window = window
+        self._baseline = self._new_mean(window)
+
+    @property
+    def baseline(self):
+        """Current baseline of every channel, NaN where none has been seen yet"""
+        mean = self._baseline
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return mean['sum'] / mean['count']
+
+    def _new_mean(self, window):
+        n = self.num_channels
+        return {
+            'window': window,
+            'ring': np.zeros((window, n)),
+            'sum': np.zeros(n),
+            'pos': np.zeros(n, dtype=np.int64),
+            'count': np.zeros(n, dtype=np.int64),
+        }
+
+    def _update_mean(self, mean, channels, values):
+        """Push values into the moving average of the given channels and return their new means"""
+        ring, total, pos, count = mean['ring'], mean['sum'], mean['pos'], mean['count']
+        slots = pos[channels]
+        full = channels[count[channels] == mean['window']]
+        total[full] -= ring[pos[full], full]
+        ring[slots, channels] = values
+        total[channels] += values
+        count[channels] = np.minimum(count[channels] + 1, mean['window'])
+        pos[channels] += 1
+
+        # Same once-per-lap re-sum as RunningMean, so results match the scalar detector
+        wrapped = channels[pos[channels] == mean['window']]
+        if len(wrapped):
+            pos[wrapped] = 0
+            for channel in wrapped:
+                total[channel] = ring[:, channel:channel + 1].sum(axis=0)[0]
+        return total[channels] / count[channels]
+
+    def update(self, frame_batch, timestamps, baselines=None):
+        """Process (N, num_channels) raw values; returns an (N, num_channels) array marking detections.
+
+        baselines, if given, is an (N, num_channels) drift baseline (e.g. from a
+        baseline tracker) used instead of the detectors' own moving-mean baseline.
+        """
+        frame_batch = np.asarray(frame_batch, dtype=float)
+        detections = np.zeros(frame_batch.shape, dtype=bool)
+        all_channels = np.arange(self.num_channels)
+        trigger = self.trigger_threshold
+
+        for row, (values, timestamp) in enumerate(zip(frame_batch, timestamps)):
+            # Channels still establishing their baseline only feed it
+            warming = self._baseline['count'] < self.baseline_window
+            if baselines is not None:
+                active = all_channels
+            elif warming.any():
+                channels = all_channels[warming]
+                self._update_mean(self._baseline, channels, values[channels])
+                active = all_channels[~warming]
+                if not len(active):
+                    continue
+            else:
+                active = all_channels
+
+            smoothed = self._update_mean(self._smooth, active, values[active])
+            if baselines is not None:
+                baseline = baselines[row]
+            else:
+                baseline = self._baseline['sum'][active] / self._baseline['count'][active]
+            percent_change = np.zeros(len(active))
+            positive = baseline > 0
+            percent_change[positive] = np.abs(smoothed[positive] - baseline[positive]) / baseline[positive]
+
+            # Update baseline during non-detection periods
+            quiet = percent_change < trigger
+            if quiet.any() and baselines is None:
+                self._update_mean(self._baseline, active[quiet], values[active[quiet]])
+
+            self.samples_since_last[active] += 1
+            current_state = ~quiet
+
+            # Detect falling edge (spray detection)
+            hits = active[self.last_state[active] & quiet & (self.samples_since_last[active] >= self.min_gap)]
+            if len(hits):
+                self.samples_since_last[hits] = 0
+                self.detection_count[hits] += 1
+                self.last_detection[hits] = timestamp
+                detections[row, hits] = True
+                for channel in hits:
+                    self.bits[channel].append(1)
+                    self.timestamps[channel].append(timestamp)
+
+            self.last_state[active] = current_state
+
+        return detections
+
+
 class ExperimentAutomationDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -1722,6 +2334,11 @@ class ExperimentAutomationDialog(QDialog):
         self.record_data.setChecked(True)
         data_layout.addWidget(self.record_data, 0, 0)
 
+        self.record_format = QComboBox()
+        self.record_format.addItem("CSV", 'csv')
+        self.record_format.addItem("Binary", 'binary')
+        data_layout.addWidget(self.record_format, 0, 1)
+
         # Save location
         data_layout.addWidget(QLabel("Save Location:"), 1, 0)
         save_layout = QHBoxLayout()
@@ -1787,15 +2404,27 @@ class ExperimentAutomationDialog(QDialog):
 
             # Setup data file in experiment directory
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            self.data_filename = f"{save_dir}/experiment_{timestamp}.csv"
-            self.data_file = open(self.data_filename, 'w', newline='')
-            self.csv_writer = csv.writer(self.data_file)
-            self.csv_writer.writerow(['Timestamp', 'Repetition', 'Sensor_ID', 'Value'])
+            self.data_filename = f"{save_dir}/experiment_{timestamp}"
 
             # Initialize experiment state
             self.experiment_running = True
             self.current_repetition = 0
 
+            # Record every raw frame, tagged with the repetition it belongs to
+            if self.record_data.isChecked():
+                metadata = self.parent.recording_metadata()
+                metadata['spray_pattern'] = {
+                    'pattern': pattern,
+                    'cycle_duration_ms': self.cycle_duration.value(),
+                    'delay_between_s': self.delay_between.value(),
+                    'repetitions': self.repetitions.value(),
+                }
+                self.recorder = create_recorder(self.record_format.currentData(), self.data_filename,
+                                                extra_columns=['Repetition'], metadata=metadata,
+                                                timers=self.parent.pipeline_timers)
+                self.recorder.start()
+                self.parent.frame_subscribers.append(self.record_sensor_data)
+
             # Update UI
             self.start_btn.setEnabled(False)
             self.stop_btn.setEnabled(True)
@@ -1843,12 +2472,6 @@ class ExperimentAutomationDialog(QDialog):
                 delay_time = self.delay_between.value() * 1000  # Convert to ms
                 total_time = pattern_duration + delay_time
 
-                # Start recording if enabled
-                if self.record_data.isChecked():
-                    self.record_timer = QTimer()
-                    self.record_timer.timeout.connect(self.record_sensor_data)
-                    self.record_timer.start(100)  # Record every 100ms
-
                 # Schedule pattern stop and next repetition
                 QTimer.singleShot(pattern_duration, self.stop_current_pattern)
                 QTimer.singleShot(total_time, self.run_next_repetition)
@@ -1857,32 +2480,20 @@ class ExperimentAutomationDialog(QDialog):
             self.parent.log_terminal.append(f"Error in repetition: {str(e)}")
             self.stop_experiment()
 
-    def record_sensor_data(self):
-        """Record current sensor data"""
-        try:
-            if not hasattr(self, 'data_file') or self.data_file is None:
-                return
-
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
-
-            # Record data from all sensors
-            for sensor_id in range(32):
-                if sensor_id < len(self.parent.sensor_plots):
-                    plot = self.parent.sensor_plots[sensor_id]
-                    if plot['data']['y']:
-                        value = plot['data']['y'][-1]
-                        self.csv_writer.writerow([
-                            current_time,
-                            self.current_repetition,
-                            sensor_id + 1,
-                            value
-                        ])
-
-            # Ensure data is written to disk
-            self.data_file.flush()
+    def record_sensor_data(self, frames, host_times):
+        """Queue raw frames from the main window for the experiment recorder"""
+        self.recorder.write(frames, host_times, extra=(self.current_repetition,))
 
-        except Exception as e:
-            self.parent.log_terminal.append(f"Error recording data: {str(e)}")
+    def stop_recording(self):
+        """Stop taking frames and write out the experiment file"""
+        if getattr(self, 'recorder', None) is not None:
+            if self.record_sensor_data in self.parent.frame_subscribers:
+                self.parent.frame_subscribers.remove(self.record_sensor_data)
+            self.recorder.stop()
+            for message in self.recorder.get_messages():
+                self.parent.log_terminal.append(message)
+            self.parent.log_terminal.append(f"Experiment data saved: {self.recorder.frames_written} frames")
+            self.recorder = None
 
     def browse_save_location(self):
         """Open file dialog to choose save location"""
@@ -1903,14 +2514,8 @@ class ExperimentAutomationDialog(QDialog):
         if self.parent.fan_serial:
             self.parent.fan_serial.write(b"STOP\n")
 
-        # Stop recording
-        if hasattr(self, 'record_timer') and self.record_timer.isActive():
-            self.record_timer.stop()
-
-        # Close data file
-        if hasattr(self, 'data_file') and self.data_file is not None:
-            self.data_file.close()
-            self.data_file = None
+        # Stop recording and close the data file
+        self.stop_recording()
 
         # Update UI
         self.start_btn.setEnabled(True)
@@ -1921,14 +2526,8 @@ class ExperimentAutomationDialog(QDialog):
         """Complete the experiment"""
         self.experiment_running = False
 
-        # Stop recording
-        if hasattr(self, 'record_timer') and self.record_timer.isActive():
-            self.record_timer.stop()
-
-        # Close data file
-        if hasattr(self, 'data_file') and self.data_file is not None:
-            self.data_file.close()
-            self.data_file = None
+        # Stop recording and close the data file
+        self.stop_recording()
 
         # Update UI
         self.start_btn.setEnabled(True)
@@ -0,0 +1,111 @@
+import queue
+import threading
+import time
+
+import numpy as np
+
+from frame_parser import create_parser, FRAME_FIELDS
+from link_monitor import LinkMonitor
+from stage_timing import PipelineTimers
+
+
+class SerialAcquisitionWorker(threading.Thread):
+    """Background thread that owns the sensor serial port and drains every buffered frame"""
+
+    RAW_LOG_INTERVAL = 100  # Log the raw text of every this-many-th frame for debugging
+
+    def __init__(self, serial_port, frame_format='text', timers=None, protocol_version=1):
+        super().__init__(daemon=True)
+        self.serial_port = serial_port
+        self.frame_format = frame_format
+        self.protocol_version = protocol_version  # 2: frames carry a frame counter and micros() scan times
+        self.parser = create_parser(frame_format, protocol_version)
+        self.frame_queue = queue.Queue()  # (host time, (N, 33) array of [millis, S1..S32]) for the GUI
+        self.message_queue = queue.Queue()  # Log messages for the GUI thread
+        self._stop_event = threading.Event()
+        self._reported_errors = set()
+        self.frames_read = 0
+        self.link_monitor = LinkMonitor()  # Frame loss, corrupt frames, backlog and rate of this connection
+        self.timers = timers or PipelineTimers()  # Times the 'read' and 'parse' stages when enabled
+
+    def stop(self, timeout=1.0):
+        """Ask the thread to finish and wait for it"""
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    def log(self, message):
+        """Queue a message for the GUI log terminal"""
+        self.message_queue.put(message)
+
+    def log_once(self, message):
+        """Queue a message only the first time it is seen"""
+        if message not in self._reported_errors:
+            self._reported_errors.add(message)
+            self.log(message)
+
+    def get_batches(self):
+        """Return every frame that is waiting as one (N, 33) array plus the host time each was read, without blocking"""
+        batches = []
+        host_times = []
+        while True:
+            try:
+                host_time, batch = self.frame_queue.get_nowait()
+            except queue.Empty:
+                break
+            batches.append(batch)
+            host_times.append(np.full(len(batch), host_time))
+
+        if not batches:
+            return np.empty((0, FRAME_FIELDS)), np.empty(0)
+        if len(batches) == 1:
+            return batches[0], host_times[0]
+        return np.vstack(batches), np.concatenate(host_times)
+
+    def get_messages(self):
+        """Return every queued log message without blocking"""
+        messages = []
+        while True:
+            try:
+                messages.append(self.message_queue.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                batch = self.read_batch()
+                if len(batch):
+                    self.frame_queue.put((time.monotonic(), batch))
+            except Exception as e:
+                self.log_once(f"Serial read error: {str(e)}")
+                time.sleep(0.1)  # Avoid spinning on a broken port
+
+    def read_batch(self):
+        """Read everything waiting on the port and parse it into a frame array"""
+        timers = self.timers
+        waiting = self.serial_port.in_waiting
+        started = timers.start() if waiting else 0  # An idle read is mostly waiting for the timeout
+        data = self.serial_port.read(waiting or 1)  # Blocks for at most the port timeout when idle
+        timers.stop('read', started)
+
+        parser = self.parser
+        corrupt_before = parser.corrupt_frames
+        dropped_before = getattr(parser, 'dropped_frames', None)  # Only binary frames have sequence numbers
+        started = timers.start()
+        frames = parser.feed(data)
+        timers.stop('parse', started)
+
+        # Gaps, corrupt frames and backlog are counted every read but only reported now and then
+        sequence_lost = None if dropped_before is None else parser.dropped_frames - dropped_before
+        for warning in self.link_monitor.update(frames[:, 0], waiting, parser.corrupt_frames - corrupt_before,
+                                                sequence_lost, parser.frame_info if len(frames) else None):
+            self.log(warning)
+
+        # Log raw data of one frame in every RAW_LOG_INTERVAL for debugging
+        frames_before = self.frames_read
+        self.frames_read += len(frames)
+        if self.frames_read // self.RAW_LOG_INTERVAL > frames_before // self.RAW_LOG_INTERVAL:
+            self.log(f"Raw data: {parser.last_frame.decode(errors='ignore')}")
+
+        return frames
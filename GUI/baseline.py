@@ -0,0 +1,103 @@
+import numpy as np
+
+
+class AsymmetricEMABaseline:
+    """Lower-envelope baseline that follows slow drift but not gas responses.
+
+    An exponential moving average that falls quickly towards values below it
+    and rises only slowly towards values above it, so a burst of alcohol
+    barely lifts the baseline while the sensor's own drift is tracked within
+    a few rise half-lives. Half-lives are in samples. Each frame costs a few
+    array operations over all channels.
+    """
+
+    def __init__(self, num_channels=32, rise_half_life=2000, fall_half_life=20):
+        self.num_channels = num_channels
+        self.rise_alpha = 1 - 0.5 ** (1.0 / rise_half_life)
+        self.fall_alpha = 1 - 0.5 ** (1.0 / fall_half_life)
+        self.reset()
+
+    def reset(self):
+        """Forget the baseline; it restarts at the next sample"""
+        self.baseline = None
+
+    def update_batch(self, frames):
+        """Add (N, num_channels) samples and return the (N, num_channels) baseline at each one"""
+        frames = np.asarray(frames, dtype=float)
+        baselines = np.empty_like(frames)
+        if not len(frames):
+            return baselines
+        baseline = frames[0].copy() if self.baseline is None else self.baseline
+        rise, fall = self.rise_alpha, self.fall_alpha
+        for row, values in enumerate(frames):
+            delta = values - baseline
+            baseline += np.where(delta > 0, rise, fall) * delta
+            baselines[row] = baseline
+        self.baseline = baseline
+        return baselines
+
+
+class RollingMinBaseline:
+    """Baseline equal to the minimum of the last `window` samples of every channel.
+
+    Uses the van Herk/Gil-Werman split: the stream is cut into blocks of
+    `window` samples, and the minimum of any window is the minimum of a
+    suffix of the previous block and a prefix of the current one. Suffix
+    minima are computed once per finished block and the prefix minimum is
+    carried along, so every sample costs O(1) per channel however long the
+    window, and a whole batch is handled with array operations.
+    """
+
+    def __init__(self, num_channels=32, window=1000):
+        self.num_channels = num_channels
+        self.window = max(1, int(window))
+        self.reset()
+
+    def reset(self):
+        """Forget all samples"""
+        n = self.num_channels
+        self._block = np.empty((self.window, n))  # Samples of the current block
+        self._fill = 0  # Samples in the current block
+        self._prefix = np.full(n, np.inf)  # Minimum of the current block so far
+        # Minimum of the previous block from each position to its end, with +inf past the end
+        self._suffix = np.full((self.window + 1, n), np.inf)
+        self.baseline = None
+
+    def update_batch(self, frames):
+        """Add (N, num_channels) samples and return the (N, num_channels) baseline at each one"""
+        frames = np.asarray(frames, dtype=float)
+        baselines = np.empty_like(frames)
+        start = 0
+        while start < len(frames):
+            count = min(len(frames) - start, self.window - self._fill)
+            segment = frames[start:start + count]
+            fill = self._fill
+
+            # Window ending at block position p: previous block from p + 1 on, current block up to p
+            prefix = np.minimum.accumulate(np.vstack((self._prefix, segment)), axis=0)[1:]
+            baselines[start:start + count] = np.minimum(prefix, self._suffix[fill + 1:fill + 1 + count])
+
+            self._block[fill:fill + count] = segment
+            self._prefix = prefix[-1]
+            self._fill += count
+            start += count
+            if self._fill == self.window:
+                # Block finished: its suffix minima serve the next block
+                self._suffix[:self.window] = np.minimum.accumulate(self._block[::-1], axis=0)[::-1]
+                self._fill = 0
+                self._prefix = np.full(self.num_channels, np.inf)
+
+        if len(frames):
+            self.baseline = baselines[-1].copy()
+        return baselines
+
+
+BASELINE_TRACKERS = {
+    'ema': AsymmetricEMABaseline,
+    'min': RollingMinBaseline,
+}
+
+
+def create_baseline_tracker(method, num_channels=32, **settings):
+    """Create the 'ema' (asymmetric EMA) or 'min' (rolling minimum) baseline tracker"""
+    return BASELINE_TRACKERS[method](num_channels, **settings)
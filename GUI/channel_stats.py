@@ -0,0 +1,326 @@
+import numpy as np
+from scipy.signal import lfilter
+
+_MARKERS = np.arange(5)  # P-square marker numbers
+
+
+class WindowStats:
+    """Mean, variance, min and max of the last `window` samples of every channel.
+
+    Mean and variance use Welford's update with the oldest sample removed as
+    each new one arrives, so a sample costs O(1) per channel, plus one re-sum
+    per lap to shed rounding error. Big batches are summarised straight from
+    their newest `window` rows instead. Min and max are only needed when a
+    threshold is calculated, so they are taken from the stored window then.
+    """
+
+    def __init__(self, num_channels=32, window=100):
+        self.num_channels = num_channels
+        self.window = window
+        self._ring = np.zeros((window, num_channels))
+        self.reset()
+
+    def reset(self):
+        """Forget all samples"""
+        self._pos = 0  # Next slot to overwrite
+        self.count = 0
+        self.mean = np.zeros(self.num_channels)
+        self._m2 = np.zeros(self.num_channels)  # Sum of squared deviations from the mean
+
+    @property
+    def variance(self):
+        return self._m2 / self.count if self.count else np.zeros(self.num_channels)
+
+    @property
+    def std(self):
+        return np.sqrt(np.maximum(self.variance, 0))
+
+    # Location and scale used for thresholds
+    center = property(lambda self: self.mean)
+    spread = property(lambda self: self.std)
+
+    @property
+    def min(self):
+        return self._ring[:self.count].min(axis=0) if self.count else None
+
+    @property
+    def max(self):
+        return self._ring[:self.count].max(axis=0) if self.count else None
+
+    def update(self, values):
+        """Add one sample per channel"""
+        values = np.asarray(values, dtype=float)
+        if self.count < self.window:
+            self.count += 1
+            delta = values - self.mean
+            self.mean += delta / self.count
+            self._m2 += delta * (values - self.mean)
+        else:
+            # Swap the oldest sample for the new one
+            oldest = self._ring[self._pos]
+            old_mean = self.mean
+            self.mean = old_mean + (values - oldest) / self.window
+            self._m2 += (values - oldest) * (values - self.mean + oldest - old_mean)
+        self._ring[self._pos] = values
+        self._pos = (self._pos + 1) % self.window
+        if self._pos == 0 and self.count == self.window:
+            # Once per lap, start again from the stored samples so rounding error cannot build up
+            self.mean = self._ring.mean(axis=0)
+            self._m2 = ((self._ring - self.mean) ** 2).sum(axis=0)
+
+    def update_batch(self, frames):
+        """Add (N, num_channels) samples"""
+        frames = np.asarray(frames, dtype=float)
+        if len(frames) < self.window // 4:
+            for values in frames:
+                self.update(values)
+            return
+
+        # The batch replaces most of the window: recompute from the newest rows
+        history = np.roll(self._ring, -self._pos, axis=0)[self.window - self.count:]
+        tail = np.concatenate((history, frames))[-self.window:]
+        self.count = len(tail)
+        self._ring[:self.count] = tail
+        self._pos = self.count % self.window
+        self.mean = tail.mean(axis=0)
+        self._m2 = ((tail - self.mean) ** 2).sum(axis=0)
+
+
+class DecayingStats:
+    """Exponentially weighted mean and variance of every channel, plus min and max since reset.
+
+    Each sample has weight alpha and older ones fade by (1 - alpha), so the
+    statistics follow slow drift without keeping any samples. half_life is
+    the number of samples after which a sample's weight has halved. Both
+    recursions are first-order IIR filters, so a batch runs through lfilter
+    with the state carried over, like the filters in filters.py.
+    """
+
+    def __init__(self, num_channels=32, half_life=500):
+        self.num_channels = num_channels
+        self.alpha = 1 - 0.5 ** (1.0 / half_life)
+        self.reset()
+
+    def reset(self):
+        """Forget all samples"""
+        self.count = 0
+        self.mean = np.zeros(self.num_channels)
+        self.variance = np.zeros(self.num_channels)
+        self.min = None
+        self.max = None
+
+    @property
+    def std(self):
+        return np.sqrt(np.maximum(self.variance, 0))
+
+    # Location and scale used for thresholds
+    center = property(lambda self: self.mean)
+    spread = property(lambda self: self.std)
+
+    def update(self, values):
+        """Add one sample per channel"""
+        values = np.asarray(values, dtype=float)
+        if not self.count:
+            self.mean = values.copy()
+            self.min = values.copy()
+            self.max = values.copy()
+        else:
+            delta = values - self.mean
+            increment = self.alpha * delta
+            self.mean += increment
+            self.variance = (1 - self.alpha) * (self.variance + delta * increment)
+            np.minimum(self.min, values, out=self.min)
+            np.maximum(self.max, values, out=self.max)
+        self.count += 1
+
+    def update_batch(self, frames):
+        """Add (N, num_channels) samples"""
+        frames = np.asarray(frames, dtype=float)
+        if not len(frames):
+            return
+        if not self.count:
+            self.update(frames[0])  # The first sample sets the mean
+            frames = frames[1:]
+            if not len(frames):
+                return
+
+        # mean[n] = (1 - alpha) * mean[n-1] + alpha * x[n]
+        alpha, keep = self.alpha, 1 - self.alpha
+        means, _ = lfilter([alpha], [1, -keep], frames, axis=0, zi=(keep * self.mean)[None, :])
+        # variance[n] = (1 - alpha) * (variance[n-1] + alpha * (x[n] - mean[n-1])**2)
+        previous_means = np.vstack((self.mean[None, :], means[:-1]))
+        squared = (frames - previous_means) ** 2
+        variances, _ = lfilter([keep * alpha], [1, -keep], squared, axis=0, zi=(keep * self.variance)[None, :])
+
+        self.mean = means[-1].copy()
+        self.variance = variances[-1].copy()
+        np.minimum(self.min, frames.min(axis=0), out=self.min)
+        np.maximum(self.max, frames.max(axis=0), out=self.max)
+        self.count += len(frames)
+
+
+class P2Quantile:
+    """P-square streaming estimate of one quantile for every channel (Jain & Chlamtac, 1985).
+
+    Five markers per channel track the minimum, the p/2, p and (1+p)/2
+    quantiles and the maximum. Each sample nudges the markers with a
+    parabolic fit, so memory stays at five values per channel however long
+    the run. Each frame updates all channels' markers with array operations,
+    but the markers depend on every earlier sample, so frames are still
+    taken one at a time: about 0.1 ms per 32-channel frame.
+    """
+
+    def __init__(self, num_channels=32, p=0.5):
+        self.num_channels = num_channels
+        self.p = p
+        self._increments = np.array([0.0, p / 2, p, (1 + p) / 2, 1.0])
+        self.reset()
+
+    def reset(self):
+        """Forget all samples"""
+        self.count = 0
+        self._heights = np.zeros((self.num_channels, 5))  # Marker values
+        self._positions = np.tile(np.arange(1.0, 6.0), (self.num_channels, 1))  # Actual marker positions
+        self._desired = np.tile(1 + 4 * self._increments, (self.num_channels, 1))  # Ideal marker positions
+
+    @property
+    def value(self):
+        """Current quantile estimate per channel, or None before the first sample"""
+        if not self.count:
+            return None
+        if self.count < 5:
+            # Exact quantile of the few samples seen so far
+            first = np.sort(self._heights[:, :self.count], axis=1)
+            return first[:, int(round(self.p * (self.count - 1)))]
+        return self._heights[:, 2].copy()
+
+    def update(self, values):
+        """Add one sample per channel"""
+        values = np.asarray(values, dtype=float)
+        if self.count < 5:
+            self._heights[:, self.count] = values
+            self.count += 1
+            if self.count == 5:
+                self._heights.sort(axis=1)
+            return
+        self.count += 1
+        heights = self._heights
+
+        # Extend the extreme markers, then find the cell each value falls into
+        np.minimum(heights[:, 0], values, out=heights[:, 0])
+        np.maximum(heights[:, 4], values, out=heights[:, 4])
+        cell = (values[:, None] >= heights[:, 1:4]).sum(axis=1)
+
+        # Markers above the cell move up one position
+        self._positions += _MARKERS > cell[:, None]
+        self._desired += self._increments
+
+        # Pull the middle markers towards their desired positions. Markers are always at least one
+        # position apart, so nothing here divides by zero, and a marker with d == 0 stays where it is.
+        positions = self._positions
+        for i in (1, 2, 3):
+            n = positions[:, i]
+            below = n - positions[:, i - 1]
+            above = positions[:, i + 1] - n
+            offset = self._desired[:, i] - n
+            d = ((offset >= 1) & (above > 1)).astype(float) - ((offset <= -1) & (below > 1))
+            if not d.any():
+                continue
+            q_prev, q, q_next = heights[:, i - 1], heights[:, i], heights[:, i + 1]
+            slope_above = (q_next - q) / above
+            slope_below = (q - q_prev) / below
+
+            # Piecewise-parabolic prediction, falling back to linear when it leaves the neighbours
+            parabolic = q + d / (above + below) * ((below + d) * slope_above + (above - d) * slope_below)
+            linear = q + d * np.where(d > 0, slope_above, slope_below)
+            heights[:, i] = np.where((q_prev < parabolic) & (parabolic < q_next), parabolic, linear)
+            n += d
+
+    def update_batch(self, frames):
+        """Add (N, num_channels) samples"""
+        for values in np.asarray(frames, dtype=float):
+            self.update(values)
+
+
+class RobustStats:
+    """Streaming median and median absolute deviation per channel, unmoved by short bursts.
+
+    The MAD is the median of |x - median| using the median estimate at the
+    time each sample arrives; it is scaled by 1.4826 so spread matches the
+    standard deviation for Gaussian noise and the same k can be used.
+    Two P-square estimates make it about 0.2 ms per 32-channel frame, over
+    ten times the window statistics, which is why 'window' stays the default.
+    """
+
+    MAD_SCALE = 1.4826
+
+    def __init__(self, num_channels=32):
+        self.median = P2Quantile(num_channels, 0.5)
+        self.deviation = P2Quantile(num_channels, 0.5)
+
+    def reset(self):
+        self.median.reset()
+        self.deviation.reset()
+
+    @property
+    def count(self):
+        return self.median.count
+
+    @property
+    def center(self):
+        return self.median.value
+
+    @property
+    def spread(self):
+        mad = self.deviation.value
+        return None if mad is None else self.MAD_SCALE * mad
+
+    def update(self, values):
+        """Add one sample per channel"""
+        values = np.asarray(values, dtype=float)
+        self.median.update(values)
+        self.deviation.update(np.abs(values - self.median.value))
+
+    def update_batch(self, frames):
+        """Add (N, num_channels) samples"""
+        for values in np.asarray(frames, dtype=float):
+            self.update(values)
+
+
+class ChannelStats:
+    """All kinds of running statistics for all channels; only the selected kind is kept up to date.
+
+    The robust statistics cost a Python loop per frame, so updating every
+    kind on every batch would stall the GUI on fast replays. select() warms
+    a newly chosen kind up from recent history instead.
+    """
+
+    def __init__(self, num_channels=32, window=100, half_life=500, kind='window'):
+        self.window = WindowStats(num_channels, window)
+        self.decaying = DecayingStats(num_channels, half_life)
+        self.robust = RobustStats(num_channels)
+        # Samples of recent history a newly selected kind is fed
+        self.warm_up_samples = {'window': window, 'decaying': 5 * half_life, 'robust': 1000}
+        self.kind = kind
+
+    def reset(self):
+        self.window.reset()
+        self.decaying.reset()
+        self.robust.reset()
+
+    def update_batch(self, frames):
+        self.get(self.kind).update_batch(frames)
+
+    def select(self, kind, history=None):
+        """Keep `kind` up to date from now on, restarting it from (N, num_channels) recent history"""
+        if kind == self.kind:
+            return
+        self.kind = kind
+        stats = self.get(kind)
+        stats.reset()
+        if history is not None and len(history):
+            stats.update_batch(history[-self.warm_up_samples[kind]:])
+
+    def get(self, kind):
+        """The 'window', 'decaying' or 'robust' statistics"""
+        return {'window': self.window, 'decaying': self.decaying, 'robust': self.robust}[kind]
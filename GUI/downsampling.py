@@ -0,0 +1,104 @@
+import numpy as np
+
+
+def lttb_indices(x, y, n_out, preselect=4):
+    """Indices of n_out points chosen by Largest-Triangle-Three-Buckets (Steinarsson, 2013).
+
+    The first and last points are always kept. The points in between are
+    split into n_out - 2 equal buckets, and from each bucket the point that
+    makes the largest triangle with the point kept from the previous bucket
+    and the average of the next bucket is kept. The result keeps the visual
+    shape, peaks included, of a series far longer than the screen is wide.
+    Bucket averages are computed for all buckets at once; only the choice
+    of each point depends on the previous one.
+
+    Series longer than preselect * n_out points are first cut down to the
+    min and max of preselect * n_out / 2 buckets (MinMaxLTTB), which keeps
+    every candidate LTTB could pick for a peak while making the sequential
+    part short, so a million points take a few milliseconds.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    if preselect and n > preselect * n_out:
+        candidates = minmax_indices(y, preselect * n_out // 2)
+        candidates = np.union1d(candidates, [0, n - 1])
+        return candidates[lttb_indices(x[candidates], y[candidates], n_out, preselect=0)]
+
+    # Bucket edges over the points between the first and the last
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    # Average of the bucket after each bucket; the last bucket looks at the last point
+    next_x = np.append(sums_x[1:] / counts[1:], x[-1])
+    next_y = np.append(sums_y[1:] / counts[1:], y[-1])
+
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    if n < 16 * n_out:
+        # Small buckets: plain Python beats the per-call overhead of NumPy on a handful of points
+        indices[1:-1] = _lttb_small_buckets(x.tolist(), y.tolist(), edges.tolist(), next_x.tolist(), next_y.tolist())
+        return indices
+
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        ax, ay = x[previous], y[previous]
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs((ax - next_x[bucket]) * (y[start:stop] - ay) - (ax - x[start:stop]) * (next_y[bucket] - ay))
+        previous = start + int(area.argmax())
+        indices[bucket + 1] = previous
+    return indices
+
+
+def _lttb_small_buckets(x, y, edges, next_x, next_y):
+    """The sequential LTTB choice on Python lists; returns the index kept from each bucket"""
+    chosen = []
+    previous = 0
+    for bucket in range(len(edges) - 1):
+        ax, ay = x[previous], y[previous]
+        dx, dy = next_x[bucket] - ax, next_y[bucket] - ay
+        best_area = -1.0
+        for i in range(edges[bucket], edges[bucket + 1]):
+            area = abs(dx * (y[i] - ay) - (x[i] - ax) * dy)
+            if area > best_area:
+                best_area, previous = area, i
+        chosen.append(previous)
+    return chosen
+
+
+def minmax_indices(y, n_buckets):
+    """Indices of the minimum and maximum of each of n_buckets equal buckets, in order.
+
+    At most 2 * n_buckets points are kept, and every local extreme that
+    would decide the look of a bucket on screen survives, so spikes are
+    never lost. Fully vectorized.
+    """
+    y = np.asarray(y)
+    n = len(y)
+    if 2 * n_buckets >= n or n_buckets < 1:
+        return np.arange(n)
+
+    size = -(-n // n_buckets)
+    # Pad the last bucket with its own last value so every bucket has the same length
+    padded = np.concatenate((y, np.full(size * n_buckets - n, y[-1])))
+    buckets = padded.reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    lows = offsets + buckets.argmin(axis=1)
+    highs = offsets + buckets.argmax(axis=1)
+    indices = np.minimum(np.concatenate((lows, highs)), n - 1)
+    return np.unique(indices)  # Sorted, with a bucket's min and max merged if they are the same point
+
+
+def decimate(x, y, n_out, method='lttb'):
+    """(x, y) reduced to about n_out points with 'lttb' or 'minmax'"""
+    if method == 'lttb':
+        indices = lttb_indices(x, y, n_out)
+    elif method == 'minmax':
+        indices = minmax_indices(y, n_out // 2)
+    else:
+        raise ValueError(f"Unknown decimation method: {method}")
+    return np.asarray(x)[indices], np.asarray(y)[indices]
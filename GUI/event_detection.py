@@ -0,0 +1,151 @@
+import numpy as np
+
+
+class StreamingEventDetector:
+    """Falling threshold crossings and peaks for many channels, fed one batch at a time.
+
+    Only the new samples are examined: the last value, the direction of the
+    last change and the start of the current rise are carried over between
+    batches, so the cost of update() depends on the batch size and not on
+    how much history has been seen. Crossings match the old per-sample loop
+    (previous >= threshold > current). Peaks are the ones find_peaks(height=
+    peak_height, distance=peak_distance) returns for the whole signal as long
+    as no two peaks within peak_distance are equally high. Of such tied
+    peaks the later one is always kept. find_peaks breaks those ties with
+    NumPy's unstable argsort, so on integer ADC data with tied heights its
+    choice can differ from this one. A peak is emitted once no higher or
+    equal later peak within peak_distance samples can still appear or be
+    dropped, which is usually peak_distance samples after it.
+    """
+
+    def __init__(self, num_channels=32, threshold=500, peak_height=700, peak_distance=20):
+        self.num_channels = num_channels
+        self.threshold = np.full(num_channels, threshold, dtype=float)
+        self.peak_height = peak_height
+        self.peak_distance = peak_distance
+        self.reset()
+
+    def reset(self):
+        """Forget all carried state, e.g. before reprocessing the history"""
+        n = self.num_channels
+        self.samples_seen = 0
+        self._last_value = np.full(n, np.nan)
+        self._last_time = 0.0
+        self._last_direction = np.zeros(n, dtype=np.int8)  # Sign of the last non-zero change
+        self._rise_start = np.zeros(n, dtype=np.int64)  # Sample index where the current top began
+        self._rise_time = np.zeros(n)
+        # Peaks that may still be dropped by a higher one nearby: [(index, time, value)] per channel
+        self._candidates = [[] for _ in range(n)]
+
+    def update(self, times, values):
+        """Process (N,) times and (N, num_channels) values.
+
+        Returns (crossings, peaks): crossings is a list of (channel, time) and
+        peaks a list of (channel, time, value), in the order they were found.
+        """
+        values = np.asarray(values, dtype=float)
+        times = np.asarray(times, dtype=float)
+        count = len(values)
+        if not count:
+            return [], []
+        base = self.samples_seen  # Sample index of values[0]
+
+        # Previous sample of every channel in front of the batch
+        extended = np.concatenate((self._last_value[None, :], values))
+        previous, current = extended[:-1], extended[1:]
+
+        # Falling-edge threshold crossings, vectorized over samples and channels
+        falling = (previous >= self.threshold) & (current < self.threshold)
+        rows, channels = np.nonzero(falling)
+        crossings = list(zip(channels.tolist(), times[rows].tolist()))
+
+        # Direction of each change (NaN in front of the very first sample counts as no change)
+        direction = np.sign(np.nan_to_num(current - previous)).astype(np.int8)
+        direction[np.isnan(previous)] = 0
+
+        # For each sample, the row of the last non-zero change strictly before it (-1: none in this batch)
+        changed_rows = np.where(direction != 0, np.arange(count)[:, None], -1)
+        last_change = np.maximum.accumulate(changed_rows, axis=0)
+        prior = np.vstack((np.full((1, self.num_channels), -1), last_change[:-1]))
+        has_prior = prior >= 0
+        prior_row = np.maximum(prior, 0)
+        column = np.arange(self.num_channels)
+        prior_direction = np.where(has_prior, direction[prior_row, column], self._last_direction)
+
+        # A fall right after a rise (with maybe a flat top in between) ends a peak at the previous sample
+        is_peak = (direction < 0) & (prior_direction > 0) & (previous >= self.peak_height)
+        peaks = []
+        if is_peak.any():
+            rows, channels = np.nonzero(is_peak)
+            start_rows = prior[rows, channels]
+            start_index = np.where(start_rows >= 0, base + start_rows, self._rise_start[channels])
+            start_time = np.where(start_rows >= 0, times[np.maximum(start_rows, 0)], self._rise_time[channels])
+            end_index = base + rows - 1
+            end_time = np.where(rows > 0, times[np.maximum(rows - 1, 0)], self._last_time)
+            peak_index = (start_index + end_index) // 2
+            # Time of the middle of the flat top; interpolated when it lies in an earlier batch
+            peak_row = peak_index - base
+            peak_time = np.where(peak_row >= 0, times[np.maximum(peak_row, 0)],
+                                 np.where(start_index == end_index, end_time, (start_time + end_time) / 2))
+            peak_value = previous[rows, channels]
+            for channel, index, timestamp, value in zip(channels.tolist(), peak_index.tolist(),
+                                                        peak_time.tolist(), peak_value.tolist()):
+                self._candidates[channel].append((index, timestamp, value))
+
+        # Carry the state over to the next batch
+        last_row = last_change[-1]
+        changed = last_row >= 0
+        changed_direction = direction[np.maximum(last_row, 0), column]
+        self._last_direction = np.where(changed, changed_direction, self._last_direction).astype(np.int8)
+        rising = changed & (changed_direction > 0)
+        self._rise_start[rising] = base + last_row[rising]
+        self._rise_time[rising] = times[last_row[rising]]
+        self._last_value = values[-1].copy()
+        self._last_time = times[-1]
+        self.samples_seen += count
+
+        # Emit the peaks that nothing still unknown can drop any more
+        for channel in range(self.num_channels):
+            if self._candidates[channel]:
+                peaks.extend(self.resolve_peaks(channel))
+        return crossings, peaks
+
+    def flush(self):
+        """Treat the stream as finished and return every peak still held back"""
+        peaks = []
+        for channel in range(self.num_channels):
+            if self._candidates[channel]:
+                peaks.extend(self.resolve_peaks(channel, final=True))
+        return peaks
+
+    def resolve_peaks(self, channel, final=False):
+        """Apply find_peaks' distance rule to the channel's candidates; returns the peaks now certain"""
+        candidates = self._candidates[channel]
+        distance = self.peak_distance
+        settled = []  # Kept peaks
+        dropped = set()
+        unresolved = []  # Higher candidates whose fate is not known yet
+        # Lowest index a peak not found yet can get; a rise still going on may end in a wide flat top
+        next_peak = self.samples_seen
+        if final:
+            next_peak = np.inf
+        elif self._last_direction[channel] > 0:
+            next_peak = (self._rise_start[channel] + self.samples_seen - 1) // 2
+        # Highest first, like find_peaks: a kept peak drops every lower peak closer than distance;
+        # of equal heights the later peak goes first, so ties are broken the same way for any batching
+        for candidate in sorted(candidates, key=lambda peak: (-peak[2], -peak[0])):
+            if candidate in dropped:
+                continue
+            index = candidate[0]
+            if any(abs(index - other[0]) < distance for other in unresolved):
+                unresolved.append(candidate)  # Depends on a higher peak that may still be dropped
+            elif index + distance <= next_peak:
+                settled.append(candidate)  # No peak that is still to come can be close enough to drop it
+                dropped.update(other for other in candidates if abs(other[0] - index) < distance
+                               and other is not candidate)
+            else:
+                unresolved.append(candidate)
+
+        self._candidates[channel] = [peak for peak in candidates if peak not in dropped and peak not in settled]
+        settled.sort()
+        return [(channel, timestamp, value) for _, timestamp, value in settled]
@@ -0,0 +1,147 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import signal
+
+from smoothing import RunningMean
+
+
+class IIRFilter:
+    """Butterworth low-pass or high-pass filter for every channel at once.
+
+    lfilter runs along the sample axis of each batch with its delay-line
+    state (zi) carried over to the next batch, so filtering batch by batch
+    gives the same output as filtering the whole stream in one go. cutoff
+    is a fraction of the Nyquist frequency (0 < cutoff < 1), so the design
+    does not depend on the sample rate of the board.
+    """
+
+    def __init__(self, num_channels=32, btype='lowpass', cutoff=0.1, order=2):
+        self.num_channels = num_channels
+        self.b, self.a = signal.butter(order, cutoff, btype=btype)
+        self._zi_step = signal.lfilter_zi(self.b, self.a)  # State for a unit step input
+        self.reset()
+
+    def reset(self):
+        """Forget the filter state; it is primed from the next sample"""
+        self._zi = None
+
+    def update_batch(self, frames):
+        """Filter (N, num_channels) frames and return the (N, num_channels) output"""
+        frames = np.asarray(frames, dtype=float)
+        if not len(frames):
+            return frames
+        if self._zi is None:
+            # Start as if the first value had always been there, so a low-pass does not ramp up from 0
+            self._zi = self._zi_step[:, None] * frames[0]
+        filtered, self._zi = signal.lfilter(self.b, self.a, frames, axis=0, zi=self._zi)
+        return filtered
+
+
+class SlidingWindowFilter:
+    """Base for filters computed over the last `window` samples of every channel.
+
+    The last window - 1 samples are kept in front of each batch, so every
+    output sample sees a full window no matter how the stream is split into
+    batches. Until the window has filled, the samples seen so far are padded
+    with the first one.
+    """
+
+    def __init__(self, num_channels=32, window=5):
+        self.num_channels = num_channels
+        self.window = max(1, int(window))
+        self.reset()
+
+    def reset(self):
+        """Forget all samples"""
+        self._history = None  # Last window - 1 samples, oldest first
+
+    def update_batch(self, frames):
+        """Filter (N, num_channels) frames and return the (N, num_channels) output"""
+        frames = np.asarray(frames, dtype=float)
+        if not len(frames):
+            return frames
+        if self._history is None:
+            self._history = np.repeat(frames[:1], self.window - 1, axis=0)
+        samples = np.concatenate((self._history, frames))
+        self._history = samples[len(samples) - (self.window - 1):]
+
+        # (N, num_channels, window) view: one window ending at every new sample
+        windows = sliding_window_view(samples, self.window, axis=0)
+        return self.apply(windows)
+
+    def apply(self, windows):
+        raise NotImplementedError
+
+
+class RunningMedian(SlidingWindowFilter):
+    """Median of the last `window` samples; removes single-sample spikes without blurring steps"""
+
+    def apply(self, windows):
+        return np.median(windows, axis=2)
+
+
+class SavitzkyGolay(SlidingWindowFilter):
+    """Causal Savitzky-Golay filter: a polynomial fitted to the last `window` samples, read at the newest.
+
+    Smooths noise while keeping the height of peaks better than a moving
+    average of the same length. The fit is a fixed set of weights, so each
+    batch costs one weighted sum over its windows.
+    """
+
+    def __init__(self, num_channels=32, window=11, polyorder=2):
+        window = max(int(window), polyorder + 1)
+        # Weights that evaluate the fitted polynomial at the last point of the window
+        self.coefficients = signal.savgol_coeffs(window, polyorder, pos=window - 1, use='dot')
+        super().__init__(num_channels, window)
+
+    def apply(self, windows):
+        return windows @ self.coefficients
+
+
+class MovingAverage(RunningMean):
+    """RunningMean as a filter-chain stage"""
+
+    def __init__(self, num_channels=32, window=10, min_samples=3):
+        super().__init__(num_channels, window, min_samples)
+
+
+FILTER_TYPES = {
+    'mean': MovingAverage,
+    'median': RunningMedian,
+    'savgol': SavitzkyGolay,
+    'lowpass': lambda num_channels, **kwargs: IIRFilter(num_channels, 'lowpass', **kwargs),
+    'highpass': lambda num_channels, **kwargs: IIRFilter(num_channels, 'highpass', **kwargs),
+}
+
+
+class FilterChain:
+    """Filters applied one after another to every batch of sensor frames.
+
+    Built from a config list of (type, settings) pairs, e.g.
+    [('median', {'window': 5}), ('lowpass', {'cutoff': 0.2, 'order': 2})],
+    where type is one of FILTER_TYPES. An empty config passes frames through.
+    """
+
+    def __init__(self, config, num_channels=32):
+        self.config = [(name, dict(settings)) for name, settings in config]
+        self.num_channels = num_channels
+        self.stages = [FILTER_TYPES[name](num_channels, **settings) for name, settings in self.config]
+
+    def reset(self):
+        """Forget the state of every stage"""
+        for stage in self.stages:
+            stage.reset()
+
+    def update_batch(self, frames):
+        """Filter (N, num_channels) frames through every stage"""
+        filtered = np.asarray(frames, dtype=float)
+        for stage in self.stages:
+            filtered = stage.update_batch(filtered)
+        return filtered
+
+    def describe(self):
+        """Short text form of the chain for logs and recording headers"""
+        if not self.config:
+            return "none"
+        return " -> ".join(f"{name}({', '.join(f'{k}={v}' for k, v in settings.items())})"
+                           for name, settings in self.config)
@@ -0,0 +1,436 @@
+import binascii
+
+import numpy as np
+
+NUM_SENSORS = 32
+FRAME_FIELDS = NUM_SENSORS + 1  # millis timestamp + 32 sensor values
+# Protocol 2 (PROTOCOL,2) adds a 32-bit frame counter and the micros() at which the scan started and ended.
+# Parsers still return [millis, S1..S32] frames and keep these per frame in frame_info.
+FRAME_INFO_FIELDS = ['sequence', 'scan_start_us', 'scan_end_us']
+
+# Bytes a block of clean integer frames may contain
+_FAST_PATH_CHARS = b'0123456789,$\r\n'
+# Bytes a single frame body may contain once the '$' is removed
+_FRAME_CHARS = b'0123456789,.-'
+
+_DIGIT_0 = ord('0')
+_COMMA = ord(',')
+_DOLLAR = ord('$')
+_CARRIAGE_RETURN = ord('\r')
+_NEWLINE = ord('\n')
+_POWERS_OF_TEN = 10.0 ** np.arange(20)
+# Blocks with fewer lines than this are parsed line by line: NumPy's fixed cost per call only pays off
+# for larger blocks, and a worker keeping up reads about one frame at a time
+BULK_MIN_LINES = 16
+
+# Lookup table of the bytes a line of clean integer frames may contain
+_FAST_PATH_BYTES = np.zeros(256, dtype=bool)
+_FAST_PATH_BYTES[np.frombuffer(_FAST_PATH_CHARS, dtype=np.uint8)] = True
+
+
+class FrameParser:
+    """Incremental parser that turns raw serial bytes into (N, 33) frame arrays.
+
+    Frames look like '$millis,v1,...,v32\\n'. Bytes are accumulated in one
+    bytearray; a trailing partial frame is carried over to the next feed() and
+    a corrupt frame is dropped by resynchronising at the next '$'. Well-formed
+    lines are validated and converted for the whole block at once with NumPy,
+    only the odd broken line goes through Python. Blocks of a few lines, as
+    read while keeping up with the device, go through the per-line path,
+    which is cheaper at that size.
+    """
+
+    long_fields = 1  # Leading fields that may have many digits (the timestamp)
+
+    def __init__(self, num_fields=FRAME_FIELDS):
+        self.num_fields = num_fields
+        self.buffer = bytearray()
+        self.frames_parsed = 0
+        self.corrupt_frames = 0
+        self.last_frame = b''  # Most recent valid frame, kept for debug logging
+        self.frame_info = None  # Protocol 2 only: (N, 3) FRAME_INFO_FIELDS of the frames last returned
+
+    def reset(self):
+        """Drop any buffered partial frame and clear counters"""
+        self.buffer = bytearray()
+        self.frames_parsed = 0
+        self.corrupt_frames = 0
+        self.last_frame = b''
+
+    def feed(self, data):
+        """Add raw bytes and return every complete frame as an (N, num_fields) float array"""
+        if data:
+            self.buffer += data
+
+        end = self.buffer.rfind(b'\n')
+        if end < 0:
+            return np.empty((0, self.num_fields))
+
+        # Split off the complete lines; the tail is a partial frame for next time
+        view = memoryview(self.buffer)
+        block = view[:end + 1].tobytes()
+        view.release()
+        del self.buffer[:end + 1]
+
+        values = self.convert_block(block)
+        if len(values):
+            self.frames_parsed += len(values)
+            start = block.rfind(b'$', 0, len(block) - 1)
+            self.last_frame = block[start:].rstrip()
+        return values
+
+    def convert_block(self, block):
+        """Convert a block of complete lines, resyncing only the lines that are not clean frames"""
+        if block.count(b'\n') < BULK_MIN_LINES:
+            rows = [self.resync_line(line) for line in block.split(b'\n')[:-1]]
+            rows = [row for row in rows if row is not None]
+            return np.array(rows) if rows else np.empty((0, self.num_fields))
+
+        buf = np.frombuffer(block, dtype=np.uint8)
+        newlines = np.flatnonzero(buf == _NEWLINE)
+        line_starts = np.empty(len(newlines), dtype=np.intp)
+        line_starts[0] = 0
+        line_starts[1:] = newlines[:-1] + 1
+
+        # Digit runs start where edges is +1 and end (exclusive) where it is -1
+        is_digit = np.zeros(len(buf) + 2, dtype=np.int8)
+        np.less_equal(buf - _DIGIT_0, 9, out=is_digit[1:-1], casting='unsafe')
+        edges = np.diff(is_digit)
+        run_bounds = np.flatnonzero(edges)
+        starts = run_bounds[0::2]
+        ends = run_bounds[1::2]
+
+        if self.is_clean_block(block, buf, newlines, line_starts, starts):
+            return self.runs_to_frames(buf, starts, ends)
+
+        # Runs never cross a newline, so each belongs to exactly one line
+        clean = self.find_clean_lines(buf, newlines, line_starts, edges)
+        in_clean_line = clean[np.searchsorted(newlines, starts)]
+        values = np.empty((len(newlines), self.num_fields))
+        values[clean] = self.runs_to_frames(buf, starts[in_clean_line], ends[in_clean_line])
+
+        keep = clean.copy()
+        for index in np.flatnonzero(~clean):
+            row = self.resync_line(block[line_starts[index]:newlines[index]])
+            if row is not None:
+                values[index] = row
+                keep[index] = True
+        return values[keep]
+
+    def is_clean_block(self, block, buf, newlines, line_starts, starts):
+        """Cheap whole-block check that every line is '$' + num_fields integers + line ending"""
+        num_lines = len(newlines)
+        if block.translate(None, _FAST_PATH_CHARS):
+            return False
+        if block.count(b',') != num_lines * (self.num_fields - 1) or block.count(b'$') != num_lines:
+            return False
+        if len(starts) != num_lines * self.num_fields or not np.all(buf[line_starts] == _DOLLAR):
+            return False
+
+        # '\r' may only appear as part of a '\r\n' line ending
+        carriage_returns = block.count(b'\r')
+        if carriage_returns and np.count_nonzero(buf[newlines - 1] == _CARRIAGE_RETURN) != carriage_returns:
+            return False
+
+        # Each line holds exactly num_fields numbers, the first straight after the '$'.
+        # Together with the comma total this rules out empty or split fields.
+        return np.array_equal(starts[::self.num_fields], line_starts + 1)
+
+    def find_clean_lines(self, buf, newlines, line_starts, edges):
+        """Flag lines that are exactly '$' + num_fields comma-separated integers + optional '\\r'"""
+        clean = buf[line_starts] == _DOLLAR
+
+        # Count commas and digit runs per line
+        commas = np.add.reduceat(buf == _COMMA, line_starts, dtype=np.int32)
+        runs = np.add.reduceat(edges[:-1] == 1, line_starts, dtype=np.int32)
+        clean &= commas == self.num_fields - 1
+        clean &= runs == self.num_fields
+
+        # Anything else (stray '$', '\r' mid-line, signs, noise) only taints its own line
+        odd = ~_FAST_PATH_BYTES[buf]
+        odd[buf == _DOLLAR] = True
+        odd[line_starts] = False
+        carriage_returns = np.flatnonzero(buf == _CARRIAGE_RETURN)
+        odd[carriage_returns] = buf[carriage_returns + 1] != _NEWLINE
+        odd_positions = np.flatnonzero(odd)
+        if len(odd_positions):
+            clean[np.searchsorted(newlines, odd_positions)] = False
+
+        # With only digits and commas between '$' and the line end, num_fields runs and
+        # num_fields - 1 commas mean every field holds exactly one number
+        return clean
+
+    def runs_to_frames(self, buf, starts, ends):
+        """Convert the digit runs of whole frames into an (N, num_fields) array"""
+        starts = starts.reshape(-1, self.num_fields)
+        ends = ends.reshape(-1, self.num_fields)
+        values = np.empty(starts.shape)
+        if not len(values):
+            return values
+
+        # Timestamps are long but there are few per frame; ADC readings are short but many
+        long_fields = self.long_fields
+        values[:, :long_fields] = self.long_runs_to_values(
+            buf, starts[:, :long_fields].ravel(), ends[:, :long_fields].ravel()).reshape(len(values), long_fields)
+        values[:, long_fields:] = self.short_runs_to_values(
+            buf, starts[:, long_fields:].ravel(), ends[:, long_fields:].ravel()).reshape(
+            len(values), self.num_fields - long_fields)
+        return values
+
+    @staticmethod
+    def long_runs_to_values(buf, starts, ends):
+        """Convert digit runs buf[starts:ends] to numbers with one right-aligned digit matrix"""
+        lengths = ends - starts
+        width = int(lengths.max())
+        columns = np.arange(-width, 0)
+        digits = buf[ends[:, None] + columns].astype(np.float64)
+        digits -= _DIGIT_0
+        digits[columns < -lengths[:, None]] = 0  # Bytes before the run are not part of the number
+        return digits @ _POWERS_OF_TEN[width - 1::-1]
+
+    @staticmethod
+    def short_runs_to_values(buf, starts, ends):
+        """Convert digit runs buf[starts:ends] to numbers, one digit position per step"""
+        lengths = ends - starts
+        values = np.zeros(len(starts))
+        for position in range(int(lengths.max())):
+            digits = buf[np.minimum(starts + position, len(buf) - 1)] - _DIGIT_0
+            values = np.where(lengths > position, values * 10 + digits, values)
+        return values
+
+    def resync_line(self, line):
+        """Slow path for one broken line: keep the frame after its last '$' if that one is valid"""
+        start = line.rfind(b'$')
+        if start < 0:
+            if line.strip():
+                self.corrupt_frames += 1  # Noise with no frame marker
+            return None
+        if start > 0 and line[:start].strip():
+            self.corrupt_frames += 1  # Truncated frame before the resync point
+
+        body = line[start + 1:].rstrip(b'\r')
+        if not self.is_valid_body(body):
+            self.corrupt_frames += 1
+            return None
+        try:
+            return list(map(float, body.split(b',')))
+        except ValueError:
+            self.corrupt_frames += 1  # e.g. a lone '-' or '1.2.3'
+            return None
+
+    def is_valid_body(self, body):
+        """Check a frame body has exactly num_fields non-empty numeric fields"""
+        return (body.count(b',') == self.num_fields - 1
+                and not body.translate(None, _FRAME_CHARS)
+                and b',,' not in body
+                and not body.startswith(b',')
+                and not body.endswith(b','))
+
+
+# Binary frames: sync word, sequence number, millis timestamp, 32 raw ADC samples and a
+# CRC-16/CCITT over everything after the sync word. All fields are little-endian like the AVR.
+BINARY_SYNC = b'\xa5\x5a'
+BINARY_FRAME_DTYPE = np.dtype([
+    ('sync', '<u2'),
+    ('sequence', '<u2'),
+    ('millis', '<u4'),
+    ('samples', '<u2', (NUM_SENSORS,)),
+    ('crc', '<u2'),
+])
+BINARY_FRAME_SIZE = BINARY_FRAME_DTYPE.itemsize
+# Larger jumps in a sequence number are device restarts, not loss (a minute of frames at the fastest rates)
+MAX_SEQUENCE_GAP = 4096
+
+# Protocol 2 binary frames have their own sync word, a 32-bit sequence and the scan's micros() start and end
+BINARY_SYNC_V2 = b'\xa5\x5b'
+BINARY_FRAME_DTYPE_V2 = np.dtype([
+    ('sync', '<u2'),
+    ('sequence', '<u4'),
+    ('millis', '<u4'),
+    ('scan_start_us', '<u4'),
+    ('scan_end_us', '<u4'),
+    ('samples', '<u2', (NUM_SENSORS,)),
+    ('crc', '<u2'),
+])
+
+
+class BinaryFrameDecoder:
+    """Incremental decoder for the Mega's binary frame mode (FORMAT,BIN).
+
+    Runs of back-to-back frames are viewed in place with np.frombuffer and
+    checked with one C-level CRC call per frame. A bad sync word or CRC drops
+    that frame only and decoding resumes at the next sync word.
+    """
+
+    sync = BINARY_SYNC
+    frame_dtype = BINARY_FRAME_DTYPE
+    sequence_modulus = 65536  # 16-bit sequence numbers
+
+    def __init__(self):
+        self.frame_size = self.frame_dtype.itemsize
+        self._sync_word = int.from_bytes(self.sync, 'little')
+        # The CRC covers everything between the sync word and the CRC itself
+        self._crc_start = self.frame_dtype.fields['sequence'][1]
+        self._crc_end = self.frame_dtype.fields['crc'][1]
+        self.buffer = bytearray()
+        self.frames_parsed = 0
+        self.corrupt_frames = 0
+        self.dropped_frames = 0  # Gaps in the sequence numbers
+        self.last_sequence = None
+        self.frame_info = None
+        self._last_row = None
+
+    def reset(self):
+        """Drop any buffered partial frame and clear counters"""
+        self.__init__()
+
+    @property
+    def last_frame(self):
+        """Most recent valid frame rendered like a text frame, for debug logging"""
+        if self._last_row is None:
+            return b''
+        return ('$' + ','.join(str(int(v)) for v in self._last_row)).encode()
+
+    def feed(self, data):
+        """Add raw bytes and return every complete, valid frame as an (N, 33) float array"""
+        if data:
+            self.buffer += data
+        block = bytes(self.buffer)
+
+        records = []
+        position = 0
+        while True:
+            start = block.find(self.sync, position)
+            if start < 0:
+                # Keep a trailing first sync byte in case the second one is still in flight
+                position = max(position, len(block) - 1)
+                break
+            count = (len(block) - start) // self.frame_size
+            if count == 0:
+                position = start
+                break
+
+            frames = np.frombuffer(block, dtype=self.frame_dtype, count=count, offset=start)
+            good = self.count_valid_frames(block, start, frames)
+            if good:
+                records.append(frames[:good])
+            position = start + good * self.frame_size
+            if good < count:
+                self.corrupt_frames += 1
+                position += 1  # Resync at the next sync word after the bad frame's start
+
+        self.buffer = bytearray(block[position:])
+        if not records:
+            return np.empty((0, FRAME_FIELDS))
+
+        frames = records[0] if len(records) == 1 else np.concatenate(records)
+        self.track_sequence(frames['sequence'])
+
+        values = np.empty((len(frames), FRAME_FIELDS))
+        values[:, 0] = frames['millis']
+        values[:, 1:] = frames['samples']
+        self.frames_parsed += len(values)
+        self._last_row = values[-1]
+        self.store_frame_info(frames)
+        return values
+
+    def store_frame_info(self, frames):
+        """Keep the protocol 2 fields of the decoded frames; protocol 1 frames have none"""
+
+    def count_valid_frames(self, block, start, frames):
+        """Number of leading frames with a good sync word and CRC"""
+        bad_sync = np.flatnonzero(frames['sync'] != self._sync_word)
+        limit = bad_sync[0] if len(bad_sync) else len(frames)
+
+        view = memoryview(block)
+        for index in range(limit):
+            offset = start + index * self.frame_size
+            crc = binascii.crc_hqx(view[offset + self._crc_start:offset + self._crc_end], 0xFFFF)
+            if crc != frames['crc'][index]:
+                return index
+        return limit
+
+    def track_sequence(self, sequence):
+        """Count frames the device sent that never arrived, using the sequence numbers"""
+        self.dropped_frames, self.last_sequence = count_sequence_gaps(
+            sequence, self.last_sequence, self.sequence_modulus, self.dropped_frames)
+
+
+def count_sequence_gaps(sequence, last_sequence, modulus, dropped=0, max_gap=MAX_SEQUENCE_GAP):
+    """(dropped + frames missing from sequence, its last number), continuing from last_sequence.
+
+    Numbers wrap around at modulus. A jump of more than max_gap frames,
+    which is what a counter going backwards looks like after the wrap, means
+    the device restarted: the count starts over from there and nothing is
+    counted as lost.
+    """
+    sequence = np.asarray(sequence).astype(np.int64)
+    if last_sequence is not None:
+        sequence = np.concatenate(([last_sequence], sequence))
+    gaps = (np.diff(sequence) - 1) % modulus
+    gaps[gaps > max_gap] = 0
+    return dropped + int(gaps.sum()), int(sequence[-1])
+
+
+class TextFrameParserV2(FrameParser):
+    """FrameParser for protocol 2 text frames: '$millis,sequence,scan_start_us,scan_end_us,v1,...,v32\\n'.
+
+    Returns the same (N, 33) [millis, S1..S32] frames as protocol 1; the
+    other three fields of those frames are left in frame_info, and gaps in
+    the 32-bit frame counter are counted in dropped_frames.
+    """
+
+    long_fields = 4
+
+    def __init__(self):
+        super().__init__(FRAME_FIELDS + len(FRAME_INFO_FIELDS))
+        self.dropped_frames = 0
+        self.last_sequence = None
+
+    def reset(self):
+        super().reset()
+        self.dropped_frames = 0
+        self.last_sequence = None
+
+    def feed(self, data):
+        values = super().feed(data)
+        self.frame_info = values[:, 1:4]
+        if len(values):
+            self.dropped_frames, self.last_sequence = count_sequence_gaps(
+                self.frame_info[:, 0], self.last_sequence, 2 ** 32, self.dropped_frames)
+        return np.delete(values, [1, 2, 3], axis=1)
+
+
+class BinaryFrameDecoderV2(BinaryFrameDecoder):
+    """BinaryFrameDecoder for protocol 2 frames (sync A5 5B): 32-bit sequence and micros() scan start/end.
+
+    Returns [millis, S1..S32] frames like protocol 1 and leaves the sequence
+    and scan times in frame_info.
+    """
+
+    sync = BINARY_SYNC_V2
+    frame_dtype = BINARY_FRAME_DTYPE_V2
+    sequence_modulus = 2 ** 32
+
+    def store_frame_info(self, frames):
+        info = np.empty((len(frames), len(FRAME_INFO_FIELDS)))
+        for column, field in enumerate(FRAME_INFO_FIELDS):
+            info[:, column] = frames[field]
+        self.frame_info = info
+
+
+FRAME_FORMATS = {
+    'text': FrameParser,
+    'binary': BinaryFrameDecoder,
+}
+
+PROTOCOL_2_FORMATS = {
+    'text': TextFrameParserV2,
+    'binary': BinaryFrameDecoderV2,
+}
+
+
+def create_parser(frame_format, protocol_version=1):
+    """Return a fresh parser for 'text' ('$' lines) or 'binary' frames of firmware protocol 1 or 2"""
+    formats = PROTOCOL_2_FORMATS if protocol_version == 2 else FRAME_FORMATS
+    return formats[frame_format]()
@@ -0,0 +1,236 @@
+import time
+from collections import deque
+
+import numpy as np
+
+MILLIS_WRAP = 2 ** 32  # The Mega's millis() is an unsigned long
+MICROS_WRAP = 2 ** 32  # So is micros(), which wraps every 71.6 minutes
+
+
+class LinkMonitor:
+    """Health of one serial connection, from the device timestamps of the frames that arrive.
+
+    The expected frame interval is the median of the last 256 millis()
+    steps, so it follows whatever rate the firmware runs at. A step longer
+    than gap_factor times that interval is a gap, and the frames that should
+    have filled it are counted as lost. Binary frames carry sequence numbers,
+    which give the exact loss as well. Corrupt frames come from the parser,
+    and the bytes waiting in the port show whether the host is keeping up:
+    a growing backlog means the GUI reads slower than the device sends.
+    Protocol 2 frames also give the time each scan took and, through
+    ClockDrift, how fast the device clock runs against the host's.
+
+    update() returns warnings, at most one per kind every warning_interval
+    seconds so a bad link cannot flood the log. Only the acquisition thread
+    calls update(); snapshot() may be read from any thread.
+    """
+
+    def __init__(self, gap_factor=1.5, backlog_warning_bytes=4096, warning_interval=10.0, rate_interval=1.0):
+        self.gap_factor = gap_factor
+        self.backlog_warning_bytes = backlog_warning_bytes
+        self.warning_interval = warning_interval
+        self.rate_interval = rate_interval
+        self.reset()
+
+    def reset(self):
+        """Forget everything seen so far, e.g. after reconnecting"""
+        self.frames = 0
+        self.lost_frames = 0  # Estimated from gaps in the device timestamps
+        self.gaps = 0
+        self.longest_gap_ms = 0.0
+        self.sequence_lost = 0  # Exact, from binary frame sequence numbers
+        self.corrupt_frames = 0
+        self.device_resets = 0  # millis() went backwards: the Mega restarted
+        self.backlog_bytes = 0
+        self.max_backlog_bytes = 0
+        self.expected_interval_ms = None
+        self.frame_rate = 0.0  # Frames per host second over the last rate_interval
+        self.scan_us_last = None  # Protocol 2: micros() from the first to the last reading of a frame
+        self.scan_us_max = 0.0
+        self._scan_us_total = 0.0
+        self._scan_frames = 0
+        self.clock = ClockDrift()
+        self._last_millis = None
+        self._recent_steps = np.empty(0)
+        self._rate_start = None
+        self._rate_frames = 0
+        self._unreported = {'gaps': 0, 'lost': 0, 'corrupt': 0}
+        self._last_warning = {}
+
+    def update(self, millis, waiting_bytes, corrupt=0, sequence_lost=None, frame_info=None, now=None):
+        """Add one read: device millis of the frames parsed, bytes waiting, new corrupt and sequence-lost frames.
+
+        sequence_lost is None for frames without sequence numbers, and
+        frame_info the (N, 3) [sequence, scan start us, scan end us] of
+        protocol 2 frames or None. Returns a list of warning messages,
+        usually empty.
+        """
+        now = time.monotonic() if now is None else now
+        millis = np.asarray(millis, dtype=float)
+        self.frames += len(millis)
+        self.corrupt_frames += corrupt
+        self.backlog_bytes = waiting_bytes
+        self.max_backlog_bytes = max(self.max_backlog_bytes, waiting_bytes)
+        self._unreported['corrupt'] += corrupt
+        if sequence_lost is not None:
+            self.sequence_lost += sequence_lost
+            self._unreported['lost'] += sequence_lost
+
+        if len(millis):
+            resets = self.device_resets
+            self.track_steps(millis, exact_loss=sequence_lost is not None)
+            if self.device_resets != resets:
+                self.clock.reset()  # A restarted device starts a new clock
+            if frame_info is not None:
+                self.track_scans(frame_info, now)
+        self.track_rate(len(millis), now)
+        return self.warnings(now)
+
+    def track_steps(self, millis, exact_loss=False):
+        """Find gaps between consecutive device timestamps"""
+        if self._last_millis is not None:
+            millis = np.concatenate(([self._last_millis], millis))
+        self._last_millis = float(millis[-1])
+        steps = np.diff(millis)
+        if not len(steps):
+            return
+
+        # A wrap of millis() after 49.7 days is not a reset; anything else going backwards is
+        wrapped = (steps < 0) & (millis[:-1] > MILLIS_WRAP - 60000)
+        steps[wrapped] += MILLIS_WRAP
+        backwards = steps < 0
+        if backwards.any():
+            self.device_resets += int(backwards.sum())
+            steps = steps[~backwards]
+
+        self._recent_steps = np.concatenate((self._recent_steps, steps[steps > 0]))[-256:]
+        if not len(self._recent_steps):
+            return
+        expected = float(np.median(self._recent_steps))
+        self.expected_interval_ms = expected
+
+        gaps = steps[steps > self.gap_factor * expected]
+        if len(gaps):
+            lost = int((np.rint(gaps / expected) - 1).sum())
+            self.gaps += len(gaps)
+            self.lost_frames += lost
+            self.longest_gap_ms = max(self.longest_gap_ms, float(gaps.max()))
+            self._unreported['gaps'] += len(gaps)
+            if not exact_loss:  # Sequence numbers, when there are any, count the loss exactly
+                self._unreported['lost'] += lost
+
+    def track_scans(self, frame_info, now):
+        """Scan durations and clock drift from the micros() capture times of protocol 2 frames"""
+        scan_us = (frame_info[:, 2] - frame_info[:, 1]) % MICROS_WRAP
+        self.scan_us_last = float(scan_us[-1])
+        self.scan_us_max = max(self.scan_us_max, float(scan_us.max()))
+        self._scan_us_total += float(scan_us.sum())
+        self._scan_frames += len(scan_us)
+        self.clock.update(frame_info[-1, 2], now)  # The newest frame was captured just before this read
+
+    @property
+    def scan_us_mean(self):
+        return self._scan_us_total / self._scan_frames if self._scan_frames else None
+
+    def track_rate(self, count, now):
+        """Frames per second actually received, over rate_interval"""
+        if self._rate_start is None:
+            self._rate_start = now
+        self._rate_frames += count
+        elapsed = now - self._rate_start
+        if elapsed >= self.rate_interval:
+            self.frame_rate = self._rate_frames / elapsed
+            self._rate_start = now
+            self._rate_frames = 0
+
+    def warnings(self, now):
+        """Messages for problems not reported in the last warning_interval seconds"""
+        messages = []
+        if (self._unreported['gaps'] or self._unreported['lost']) and self.may_warn('gaps', now):
+            messages.append(f"Frame gaps: {self._unreported['gaps']} gap(s), about {self._unreported['lost']} "
+                            f"frame(s) lost (expected one every {self.expected_interval_ms:.1f} ms)")
+            self._unreported['gaps'] = self._unreported['lost'] = 0
+        if self._unreported['corrupt'] and self.may_warn('corrupt', now):
+            messages.append(f"{self._unreported['corrupt']} corrupt frame(s) since the last report")
+            self._unreported['corrupt'] = 0
+        if self.backlog_bytes >= self.backlog_warning_bytes and self.may_warn('backlog', now):
+            messages.append(f"Serial backlog of {self.backlog_bytes} bytes: the GUI is falling behind the device")
+        return messages
+
+    def may_warn(self, kind, now):
+        if now - self._last_warning.get(kind, -np.inf) < self.warning_interval:
+            return False
+        self._last_warning[kind] = now
+        return True
+
+    @property
+    def device_rate(self):
+        """Frames per second the device sends, from its own timestamps"""
+        return 1000.0 / self.expected_interval_ms if self.expected_interval_ms else 0.0
+
+    def snapshot(self):
+        """All counters as a dict"""
+        return {
+            'frames': self.frames,
+            'frame_rate': self.frame_rate,
+            'device_rate': self.device_rate,
+            'expected_interval_ms': self.expected_interval_ms,
+            'gaps': self.gaps,
+            'lost_frames': self.lost_frames,
+            'longest_gap_ms': self.longest_gap_ms,
+            'sequence_lost': self.sequence_lost,
+            'corrupt_frames': self.corrupt_frames,
+            'device_resets': self.device_resets,
+            'backlog_bytes': self.backlog_bytes,
+            'max_backlog_bytes': self.max_backlog_bytes,
+            'scan_us_last': self.scan_us_last,
+            'scan_us_mean': self.scan_us_mean,
+            'scan_us_max': self.scan_us_max,
+            'clock_drift_ppm': self.clock.drift_ppm,
+        }
+
+
+class ClockDrift:
+    """Rate of the device's micros() clock against the host's time.monotonic().
+
+    Each read pairs the capture time of the newest frame with the host time
+    of the read. Their difference is the clock offset plus a transport delay
+    that is never negative, so the smallest difference in each window of
+    `window` host seconds is the best estimate of the offset. The slope of a
+    line through the last `history` of those minima is the drift: positive
+    when the device clock runs slow. It needs three windows before it gives
+    an estimate.
+    """
+
+    def __init__(self, window=10.0, history=60):
+        self.window = window
+        self.minima = deque(maxlen=history)  # (host time, smallest host - device offset) per window
+        self.reset()
+
+    def reset(self):
+        """Start over, e.g. after the device restarted"""
+        self.minima.clear()
+        self.drift_ppm = None
+        self._wraps = 0
+        self._last_us = None
+        self._window_start = None
+        self._window_min = np.inf
+
+    def update(self, device_us, host_time):
+        """Add the device micros() of a frame and the host time it was read at"""
+        device_us = float(device_us)
+        if self._last_us is not None and device_us < self._last_us - MICROS_WRAP / 2:
+            self._wraps += 1
+        self._last_us = device_us
+        offset = host_time - (device_us + self._wraps * MICROS_WRAP) / 1e6
+
+        if self._window_start is None:
+            self._window_start = host_time
+        self._window_min = min(self._window_min, offset)
+        if host_time - self._window_start >= self.window:
+            self.minima.append((host_time, self._window_min))
+            self._window_start = host_time
+            self._window_min = np.inf
+            if len(self.minima) >= 3:
+                times, offsets = np.array(self.minima).T
+                self.drift_ppm = float(np.polyfit(times - times[0], offsets, 1)[0]) * 1e6
@@ -0,0 +1,160 @@
+import numpy as np
+
+from downsampling import decimate, minmax_indices
+from ring_buffer import SensorRingBuffer
+
+LTTB_MAX_RATIO = 4  # Raw spans up to this many times max_points are thinned with LTTB, longer ones by min/max
+
+
+class LODSensorHistory(SensorRingBuffer):
+    """SensorRingBuffer plus coarser min/max levels, for zooming from hours of history down to samples.
+
+    Level 0 is the ring buffer itself, holding the newest `capacity` raw
+    samples. Level k keeps the min and max of every block of factor**k
+    samples, with the block's first timestamp, in a ring of level_capacity
+    blocks, so with the defaults level 3 spans 4096 * 4096 samples in a few
+    MB. Blocks are completed as frames are ingested: each level only
+    reduces the finished blocks of the level below, so a batch costs O(N)
+    and nothing is ever recomputed. lod_window() draws a time span from
+    the finest level that covers it and thins that to max_points points.
+    """
+
+    def __init__(self, num_channels=32, capacity=32768, dtype=np.float32, factor=16, levels=3,
+                 level_capacity=4096):
+        super().__init__(num_channels, capacity, dtype)
+        self.factor = factor
+        # Each level stores [min of every channel, max of every channel] per block
+        self.levels = [SensorRingBuffer(2 * num_channels, level_capacity, dtype) for _ in range(levels)]
+        self._reset_pending()
+
+    def _reset_pending(self):
+        # Per level, the blocks of the level below that do not fill a block of this level yet
+        n = self.num_channels
+        self._pending = [(np.empty(0), np.empty((0, n)), np.empty((0, n))) for _ in self.levels]
+
+    def clear(self):
+        """Forget all samples at every level"""
+        super().clear()
+        for level in self.levels:
+            level.clear()
+        self._reset_pending()
+
+    def append(self, timestamp, values):
+        """Add one frame: a timestamp and one value per channel"""
+        self.extend(np.array([timestamp]), np.asarray(values)[None, :])
+
+    def extend(self, timestamps, values):
+        """Add a batch of frames to the ring and fold them into the coarser levels"""
+        super().extend(timestamps, values)
+        timestamps = np.asarray(timestamps, dtype=float)
+        values = np.asarray(values, dtype=float)
+        self._fold(0, timestamps, values, values)
+
+    def _fold(self, level, times, mins, maxs):
+        """Group (times, mins, maxs) of the level below into blocks of `factor` for this level and up"""
+        if level == len(self.levels) or not len(times):
+            return
+        pending_times, pending_mins, pending_maxs = self._pending[level]
+        times = np.concatenate((pending_times, times))
+        mins = np.concatenate((pending_mins, mins))
+        maxs = np.concatenate((pending_maxs, maxs))
+
+        complete = len(times) // self.factor * self.factor
+        self._pending[level] = (times[complete:], mins[complete:], maxs[complete:])
+        if not complete:
+            return
+        shape = (complete // self.factor, self.factor, self.num_channels)
+        block_times = times[:complete:self.factor]
+        block_mins = mins[:complete].reshape(shape).min(axis=1)
+        block_maxs = maxs[:complete].reshape(shape).max(axis=1)
+        self.levels[level].extend(block_times, np.hstack((block_mins, block_maxs)))
+        self._fold(level + 1, block_times, block_mins, block_maxs)
+
+    def start_time(self):
+        """Timestamp of the oldest sample still held at any level, or None when empty"""
+        for level in reversed(self.levels):
+            if len(level):
+                return level.times(len(level))[0]
+        return self.times()[0] if len(self) else None
+
+    def lod_window(self, start_time, end_time, index, max_points=2000):
+        """(times, values) of one channel over [start_time, end_time] in at most about max_points points.
+
+        Raw samples are returned as views when they fit. Otherwise the finest
+        level with at most factor * max_points points in the span is used,
+        a level being drawn as its min/max envelope (two points per block),
+        and thinned to max_points by keeping the min and max of each of
+        max_points / 2 buckets. So a view gets about as many points as it
+        asks for at every zoom level, instead of up to 16 times fewer, and
+        narrow spikes stay visible. Raw spans only a little longer than
+        max_points are thinned with LTTB instead, which keeps their shape
+        better than min/max pairs and is still cheap at that size.
+        """
+        if not len(self):
+            return np.empty(0), np.empty(0)
+
+        # Raw samples, if the ring still reaches back to start_time
+        times = self.times()
+        first = int(np.searchsorted(times, start_time, side='left'))
+        last = int(np.searchsorted(times, end_time, side='right'))
+        covers = len(self) < self.capacity or times[0] <= start_time
+        if covers and last - first <= self.factor * max_points:
+            span = self._span()
+            window_times = times[first:last]
+            window_values = self._values[index, span.start + first:span.start + last]
+            if last - first <= max_points:
+                return window_times, window_values
+            if last - first <= LTTB_MAX_RATIO * max_points:
+                return decimate(window_times, window_values, max_points)
+            keep = minmax_indices(window_values, max_points // 2)
+            return window_times[keep], window_values[keep]
+
+        for depth, level in enumerate(self.levels):
+            if not len(level):
+                break
+            block_times = level.times()
+            covers = len(level) < level.capacity or block_times[0] <= start_time
+            if not covers and depth < len(self.levels) - 1:
+                continue
+            # Start one block early so the block holding start_time is drawn too
+            first = max(int(np.searchsorted(block_times, start_time, side='right')) - 1, 0)
+            last = int(np.searchsorted(block_times, end_time, side='right'))
+            if 2 * (last - first) > self.factor * max_points and depth < len(self.levels) - 1:
+                continue
+            blocks = level.values()[:, first:last]
+            mins, maxs = blocks[index], blocks[self.num_channels + index]
+
+            # Data newer than the last finished block of this level, coarsest first
+            tail_times, tail_mins, tail_maxs = [block_times[first:last]], [mins], [maxs]
+            for pending_times, pending_mins, pending_maxs in reversed(self._pending[:depth + 1]):
+                tail_times.append(pending_times)
+                tail_mins.append(pending_mins[:, index])
+                tail_maxs.append(pending_maxs[:, index])
+            # The newest data only counts if it falls in the view; again keep the block holding start_time
+            tail_times = np.concatenate(tail_times)
+            first = max(int(np.searchsorted(tail_times, start_time, side='right')) - 1, 0)
+            last = int(np.searchsorted(tail_times, end_time, side='right'))
+            envelope_times = np.repeat(tail_times[first:last], 2)
+            envelope = np.column_stack((np.concatenate(tail_mins)[first:last],
+                                        np.concatenate(tail_maxs)[first:last])).ravel()
+            if len(envelope) > max_points:
+                keep = minmax_indices(envelope, max_points // 2)
+                envelope_times, envelope = envelope_times[keep], envelope[keep]
+            return envelope_times, envelope
+        # Not reached: the coarsest level always returns, and is only empty while the raw samples fit
+
+
+def connect_gaps(times, max_gap_factor=10):
+    """Connect array for a curve that breaks the line across pauses in the data.
+
+    A step longer than max_gap_factor times the typical (median non-zero)
+    step, e.g. while the board was disconnected, leaves a gap, so one curve
+    item draws the trace as several segments. Envelopes repeat each time
+    twice, which is why zero steps are left out of the median.
+    """
+    steps = np.diff(times)
+    positive = steps[steps > 0]
+    connect = np.ones(len(times), dtype=bool)
+    if len(positive):
+        connect[:-1] = steps <= max_gap_factor * np.median(positive)
+    return connect
@@ -0,0 +1,85 @@
+import logging
+import logging.handlers
+import os
+import time
+from collections import deque
+from datetime import datetime
+
+
+class LogBuffer:
+    """Holds log messages until the GUI shows them, collapsing repeats and mirroring them to a file.
+
+    append() is cheap: it only stores the message in a bounded deque, so a
+    burst of messages can never grow memory or slow the GUI. A message that
+    repeats the previous one is only counted; the count is logged once the
+    message changes, or every repeat_interval seconds while it keeps
+    repeating. take() hands over everything collected since the last call
+    and writes the same lines, with timestamps, to a rotating log file.
+    Only the GUI thread may use it; worker threads queue their messages.
+    """
+
+    def __init__(self, capacity=5000, repeat_interval=5.0, log_path=None, max_bytes=1 << 20, backup_count=3):
+        self.repeat_interval = repeat_interval
+        self._pending = deque(maxlen=capacity)  # (time, text), oldest dropped when full
+        self.dropped = 0  # Messages lost to a full buffer since the last take()
+        self._last_message = None
+        self._repeats = 0  # Repeats of _last_message not reported yet
+        self._repeats_reported = 0.0  # When the repeat count was last reported
+        self._file_log = None
+        if log_path:
+            self._file_log = open_rotating_log(log_path, max_bytes, backup_count)
+
+    def append(self, message):
+        """Add one message"""
+        now = time.time()
+        if message == self._last_message:
+            self._repeats += 1
+            if now - self._repeats_reported >= self.repeat_interval:
+                self.report_repeats(now)
+            return
+        if self._repeats:
+            self.report_repeats(now)
+        self._last_message = message
+        self._repeats_reported = now
+        self.push(now, message)
+
+    def report_repeats(self, now):
+        self.push(now, f"(last message repeated {self._repeats} more time{'s' if self._repeats > 1 else ''})")
+        self._repeats = 0
+        self._repeats_reported = now
+
+    def push(self, now, text):
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+        self._pending.append((now, text))
+
+    def take(self):
+        """Return the lines collected since the last call and write them to the log file"""
+        if not self._pending and not self.dropped:
+            return []
+        entries = list(self._pending)
+        self._pending.clear()
+        if self.dropped:
+            entries.insert(0, (time.time(), f"({self.dropped} log messages dropped)"))
+            self.dropped = 0
+
+        if self._file_log:
+            self._file_log.info('\n'.join(
+                f"{datetime.fromtimestamp(timestamp):%Y-%m-%d %H:%M:%S.%f}"[:-3] + f" {text}"
+                for timestamp, text in entries))
+        return [text for _, text in entries]
+
+
+def open_rotating_log(path, max_bytes=1 << 20, backup_count=3):
+    """Logger writing bare lines to path, moved to path.1, path.2, ... once it reaches max_bytes"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    logger = logging.getLogger(f"sensor_gui.{os.path.abspath(path)}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False  # Keep these lines out of the console
+    if not logger.handlers:
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+    return logger
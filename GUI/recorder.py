@@ -0,0 +1,317 @@
+import csv
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from stage_timing import PipelineTimers
+
+NUM_SENSORS = 32
+TIME_COLUMNS = ['Device_Time_ms', 'Host_Time_s']
+SENSOR_COLUMNS = [f"S{i + 1}" for i in range(NUM_SENSORS)]
+BINARY_MAGIC = b'SNSRREC1'  # File signature, then a uint32 header length and the JSON header
+BINARY_ALIGNMENT = 64  # Records start on a multiple of this so the memmap is aligned
+
+
+class FrameRecorder(threading.Thread):
+    """Background thread that writes every raw sensor frame to a CSV file.
+
+    One row per frame: the Arduino millis() timestamp, the host time.monotonic()
+    at which the frame was read, any extra columns (e.g. Repetition) and S1..S32.
+    The GUI hands over frame batches with write(), which only queues them.
+    This thread formats whole batches at once and writes them through a
+    large file buffer, flushing every flush_interval seconds or once
+    flush_bytes have been written, so recording never waits on the disk.
+    With float_samples the readings are written with decimals, for filtered
+    streams, instead of as integer ADC counts.
+    """
+
+    def __init__(self, path, extra_columns=(), flush_interval=1.0, flush_bytes=1 << 20, metadata=None,
+                 float_samples=False, timers=None):
+        super().__init__(daemon=True)
+        self.path = path
+        self.extra_columns = list(extra_columns)
+        self.float_samples = float_samples
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.frame_queue = queue.Queue()  # (frames, host_times, extra values) batches
+        self.message_queue = queue.Queue()  # Log messages for the GUI thread
+        self.frames_written = 0
+        self.timers = timers or PipelineTimers()  # Times the 'record' stage when enabled
+        self._stop_event = threading.Event()
+        self.open_file(metadata)
+
+    def open_file(self, metadata):
+        """Create the output file and write its header; CSV files have no room for metadata"""
+        # Row format: integer millis, microsecond host time, extras, integer ADC readings (or filtered values)
+        sample_format = '%.3f' if self.float_samples else '%d'
+        self._row_format = ','.join(['%d', '%.6f'] + ['%s'] * len(self.extra_columns) + [sample_format] * NUM_SENSORS)
+
+        self.data_file = open(self.path, "w", newline='', buffering=self.flush_bytes)
+        csv.writer(self.data_file).writerow(TIME_COLUMNS + self.extra_columns + SENSOR_COLUMNS)
+
+    def flush(self):
+        """Push written rows to the OS"""
+        self.data_file.flush()
+
+    def close(self):
+        self.data_file.close()
+
+    def write(self, frames, host_times=None, extra=()):
+        """Queue a batch of raw frames for writing; never blocks"""
+        if len(frames) and not self._stop_event.is_set():
+            if host_times is None:
+                host_times = np.full(len(frames), time.monotonic())
+            self.frame_queue.put((frames, host_times, tuple(extra)))
+
+    def stop(self, timeout=5.0):
+        """Write whatever is still queued, close the file and wait for the thread"""
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    def get_messages(self):
+        """Return every queued log message without blocking"""
+        messages = []
+        while True:
+            try:
+                messages.append(self.message_queue.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def run(self):
+        last_flush = time.monotonic()
+        unflushed = 0
+        try:
+            while not (self._stop_event.is_set() and self.frame_queue.empty()):
+                try:
+                    batch = self.frame_queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    batch = None
+
+                if batch is not None:
+                    started = self.timers.start()
+                    unflushed += self.write_frames(*batch)
+                    self.timers.stop('record', started)
+
+                now = time.monotonic()
+                if unflushed and (now - last_flush >= self.flush_interval or unflushed >= self.flush_bytes):
+                    self.flush()
+                    last_flush = now
+                    unflushed = 0
+        except Exception as e:
+            self.message_queue.put(f"Recording error: {str(e)}")
+        finally:
+            self.close()
+
+    def write_frames(self, frames, host_times, extra):
+        """Write one batch as one row per frame; returns bytes written"""
+        samples = frames[:, 1:] if self.float_samples else frames[:, 1:].astype(np.int64)
+        table = [(millis, host_time) + extra + tuple(values)
+                 for millis, host_time, values in zip(frames[:, 0].tolist(), host_times.tolist(), samples.tolist())]
+        row_format = self._row_format
+        text = ''.join(row_format % row + '\r\n' for row in table)  # Same line ending as the header row
+        self.data_file.write(text)
+
+        self.frames_written += len(frames)
+        return len(text)
+
+
+class BinaryFrameRecorder(FrameRecorder):
+    """FrameRecorder that appends fixed-size records to a binary file instead of CSV.
+
+    The file starts with BINARY_MAGIC, a uint32 header length and a JSON
+    header (record dtype, sensor map, thresholds, fan state, spray pattern),
+    padded so the records are aligned. Frames are collected in a chunk of
+    chunk_frames records that goes to disk in one write when it fills up or
+    the recorder flushes. Read it back with BinaryRecording.
+    """
+
+    def __init__(self, path, extra_columns=(), flush_interval=1.0, flush_bytes=1 << 20, metadata=None,
+                 float_samples=False, timers=None, chunk_frames=1024):
+        self.chunk_frames = chunk_frames
+        super().__init__(path, extra_columns, flush_interval, flush_bytes, metadata, float_samples, timers)
+
+    def open_file(self, metadata):
+        self.record_dtype = recording_dtype(self.extra_columns, self.float_samples)
+        self._chunk = np.zeros(self.chunk_frames, dtype=self.record_dtype)
+        self._chunk_fill = 0
+
+        header = dict(metadata or {})
+        header.update({
+            'version': 1,
+            'created': datetime.now().isoformat(),
+            'extra_columns': self.extra_columns,
+            'dtype': [list(field) for field in self.record_dtype.descr],
+        })
+        header_bytes = json.dumps(header).encode()
+        # Pad with spaces so the first record starts on an aligned offset
+        used = len(BINARY_MAGIC) + 4 + len(header_bytes)
+        header_bytes += b' ' * (-used % BINARY_ALIGNMENT)
+
+        self.data_file = open(self.path, "wb", buffering=self.flush_bytes)
+        self.data_file.write(BINARY_MAGIC)
+        self.data_file.write(np.uint32(len(header_bytes)).tobytes())
+        self.data_file.write(header_bytes)
+
+    def write_frames(self, frames, host_times, extra):
+        """Copy one batch into the current chunk, writing full chunks out; returns bytes recorded"""
+        start = 0
+        while start < len(frames):
+            count = min(len(frames) - start, self.chunk_frames - self._chunk_fill)
+            rows = self._chunk[self._chunk_fill:self._chunk_fill + count]
+            rows['device_time_ms'] = frames[start:start + count, 0]
+            rows['host_time_s'] = host_times[start:start + count]
+            for name, value in zip(self.extra_columns, extra):
+                rows[name] = value
+            rows['samples'] = frames[start:start + count, 1:]
+            self._chunk_fill += count
+            start += count
+            if self._chunk_fill == self.chunk_frames:
+                self.write_chunk()
+
+        self.frames_written += len(frames)
+        return len(frames) * self.record_dtype.itemsize
+
+    def write_chunk(self):
+        """Write the filled part of the chunk to the file and start a new one"""
+        self.data_file.write(self._chunk[:self._chunk_fill].tobytes())
+        self._chunk_fill = 0
+
+    def flush(self):
+        """Write the partial chunk too, so at most flush_interval of data is only in memory"""
+        if self._chunk_fill:
+            self.write_chunk()
+        self.data_file.flush()
+
+    def close(self):
+        if self._chunk_fill:
+            self.write_chunk()
+        self.data_file.close()
+
+
+def recording_dtype(extra_columns=(), float_samples=False):
+    """Record layout of a binary recording: times, extra columns (int32) and the 32 uint16 (or float32) readings"""
+    fields = [('device_time_ms', '<u4'), ('host_time_s', '<f8')]
+    fields += [(name, '<i4') for name in extra_columns]
+    fields.append(('samples', '<f4' if float_samples else '<u2', (NUM_SENSORS,)))
+    return np.dtype(fields)
+
+
+class BinaryRecording:
+    """Read-only view of a binary recording backed by np.memmap; slices never copy"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+                raise ValueError(f"{path} is not a binary sensor recording")
+            header_length = int(np.frombuffer(f.read(4), dtype='<u4')[0])
+            self.header = json.loads(f.read(header_length))
+        self.dtype = np.dtype([tuple(field) if len(field) == 2 else (field[0], field[1], tuple(field[2]))
+                               for field in self.header['dtype']])
+
+        # Records written so far; a partial record at the end of a recording in progress is ignored
+        offset = len(BINARY_MAGIC) + 4 + header_length
+        count = (os.path.getsize(path) - offset) // self.dtype.itemsize
+        if count:
+            self.records = np.memmap(path, dtype=self.dtype, mode='r', offset=offset, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=self.dtype)  # mmap cannot map an empty range
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def device_time(self):
+        """Arduino timestamps in seconds"""
+        return self.records['device_time_ms'] / 1000.0
+
+    @property
+    def samples(self):
+        """(N, 32) view of the raw readings"""
+        return self.records['samples']
+
+    def time_slice(self, start=None, end=None):
+        """Records with device time in [start, end) seconds, as a view into the file"""
+        millis = self.records['device_time_ms']
+        first = 0 if start is None else int(np.searchsorted(millis, start * 1000.0, side='left'))
+        last = len(millis) if end is None else int(np.searchsorted(millis, end * 1000.0, side='left'))
+        return self.records[first:last]
+
+
+RECORDING_FORMATS = {'csv': (FrameRecorder, '.csv'), 'binary': (BinaryFrameRecorder, '.bin')}
+
+
+def create_recorder(recording_format, base_path, **kwargs):
+    """Create the recorder for 'csv' or 'binary' output; the file extension is added to base_path"""
+    recorder_class, extension = RECORDING_FORMATS[recording_format]
+    return recorder_class(base_path + extension, **kwargs)
+
+
+def load_recording(path):
+    """Load a wide-format recording as (column names, float array with one row per frame)"""
+    with open(path, newline='') as f:
+        header = next(csv.reader(f))
+        data = np.loadtxt(f, delimiter=',', ndmin=2)
+    return header, data
+
+
+def convert_long_to_wide(source, destination):
+    """Rewrite an old long-format recording (one row per sensor) as one row per frame.
+
+    Handles both the Record Data layout (Timestamp, Elapsed_Time, Sensor_ID, Value)
+    and the experiment layout (Timestamp, Repetition, Sensor_ID, Value). The file
+    is streamed, so its size does not matter. Old files carry no Arduino time, so
+    Device_Time_ms is written as nan and Host_Time_s is the wall-clock Timestamp
+    as POSIX seconds. The second column is kept as an extra column. Returns the
+    number of frames written.
+    """
+    frames = 0
+    with open(source, newline='') as src, open(destination, 'w', newline='') as dst:
+        reader = csv.reader(src)
+        writer = csv.writer(dst)
+        header = next(reader)
+        extra_column = header[1]
+        writer.writerow(TIME_COLUMNS + [extra_column] + SENSOR_COLUMNS)
+
+        key = None
+        values = None
+        for row in reader:
+            if len(row) < 4:
+                continue
+            # All sensors read at one instant share the first two columns
+            if (row[0], row[1]) != key:
+                if key is not None:
+                    writer.writerow(wide_row(key, values))
+                    frames += 1
+                key = (row[0], row[1])
+                values = ['nan'] * NUM_SENSORS
+            sensor_id = int(row[2])
+            if 1 <= sensor_id <= NUM_SENSORS:
+                values[sensor_id - 1] = row[3]
+
+        if key is not None:
+            writer.writerow(wide_row(key, values))
+            frames += 1
+    return frames
+
+
+def wide_row(key, values):
+    """Build one converted row from a (timestamp string, extra value) key and the sensor values"""
+    timestamp, extra = key
+    host_time = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S.%f").timestamp()
+    return ['nan', f"{host_time:.6f}", extra] + values
+
+
+if __name__ == '__main__':
+    # Usage: python recorder.py old_long.csv [more.csv ...]  ->  writes old_long_wide.csv next to each
+    for path in sys.argv[1:]:
+        output = os.path.splitext(path)[0] + '_wide.csv'
+        count = convert_long_to_wide(path, output)
+        print(f"{path}: {count} frames -> {output}")
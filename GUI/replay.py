@@ -0,0 +1,139 @@
+import csv
+import os
+import queue
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from recorder import BINARY_MAGIC, SENSOR_COLUMNS, BinaryRecording, convert_long_to_wide, load_recording
+
+REPLAY_SPEEDS = {'1x': 1.0, '10x': 10.0, 'Max': None}  # None plays back as fast as the GUI takes frames
+
+
+def load_replay_frames(path):
+    """Read any recording (binary, wide CSV or old long-format CSV) as an (N, 33) [millis, S1..S32] array"""
+    with open(path, 'rb') as f:
+        is_binary = f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+    if is_binary:
+        recording = BinaryRecording(path)
+        return np.column_stack((recording.records['device_time_ms'], recording.samples)).astype(float)
+
+    with open(path, newline='') as f:
+        header = next(csv.reader(f))
+    if 'Sensor_ID' in header:
+        # Old one-row-per-sensor file: convert it to the wide layout first
+        with tempfile.TemporaryDirectory() as directory:
+            wide_path = os.path.join(directory, 'wide.csv')
+            convert_long_to_wide(path, wide_path)
+            header, data = load_recording(wide_path)
+    else:
+        header, data = load_recording(path)
+
+    millis = data[:, header.index('Device_Time_ms')]
+    if np.isnan(millis).any():
+        # Converted files have no Arduino clock; fall back to the host clock
+        host_time = data[:, header.index('Host_Time_s')]
+        millis = (host_time - host_time[0]) * 1000.0
+    sensors = data[:, [header.index(name) for name in SENSOR_COLUMNS]]
+    return np.column_stack((millis, sensors))
+
+
+class RecordingReplayWorker(threading.Thread):
+    """Plays a recording back through the same interface as SerialAcquisitionWorker.
+
+    Frames are released according to their recorded timestamps scaled by
+    `speed` (None releases them as fast as the GUI drains them), so
+    update_sensor_data, smoothing, detection, plotting and recording all
+    see them exactly like live frames.
+    """
+
+    def __init__(self, path, speed=1.0, batch_frames=1024, max_queued_batches=8):
+        super().__init__(daemon=True)
+        self.path = path
+        self.speed = speed
+        self.batch_frames = batch_frames
+        self.frame_queue = queue.Queue(maxsize=max_queued_batches)  # (host time, (N, 33) array) batches
+        self.message_queue = queue.Queue()
+        self.frames_replayed = 0
+        self._stop_event = threading.Event()
+
+    def stop(self, timeout=1.0):
+        """Ask the thread to finish and wait for it"""
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    def log(self, message):
+        """Queue a message for the GUI log terminal"""
+        self.message_queue.put(message)
+
+    def get_batches(self):
+        """Return every frame that is waiting as one (N, 33) array plus the host time each was released"""
+        batches = []
+        host_times = []
+        while True:
+            try:
+                host_time, batch = self.frame_queue.get_nowait()
+            except queue.Empty:
+                break
+            batches.append(batch)
+            host_times.append(np.full(len(batch), host_time))
+
+        if not batches:
+            return np.empty((0, len(SENSOR_COLUMNS) + 1)), np.empty(0)
+        return np.vstack(batches), np.concatenate(host_times)
+
+    def get_messages(self):
+        """Return every queued log message without blocking"""
+        messages = []
+        while True:
+            try:
+                messages.append(self.message_queue.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def put_batch(self, batch):
+        """Queue a batch, waiting while the GUI catches up; returns False if stopped meanwhile"""
+        while not self._stop_event.is_set():
+            try:
+                self.frame_queue.put((time.monotonic(), batch), timeout=0.1)
+                self.frames_replayed += len(batch)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def run(self):
+        try:
+            frames = load_replay_frames(self.path)
+        except Exception as e:
+            self.log(f"Replay load error: {str(e)}")
+            return
+
+        speed_text = f"{self.speed:g}x" if self.speed else "max speed"
+        self.log(f"Replaying {len(frames)} frames from {os.path.basename(self.path)} at {speed_text}")
+        if not len(frames):
+            return
+
+        seconds = (frames[:, 0] - frames[0, 0]) / 1000.0  # Recorded time since the first frame
+        start = time.monotonic()
+        position = 0
+        while position < len(frames) and not self._stop_event.is_set():
+            if self.speed:
+                # Everything recorded up to the scaled time since playback started is due
+                due = int(np.searchsorted(seconds, (time.monotonic() - start) * self.speed, side='right'))
+                due = min(due, position + self.batch_frames)
+                if due == position:
+                    time.sleep(0.005)
+                    continue
+            else:
+                due = position + self.batch_frames
+
+            if not self.put_batch(frames[position:due]):
+                return
+            position = min(due, len(frames))
+
+        if position >= len(frames):
+            self.log(f"Replay finished ({self.frames_replayed} frames)")
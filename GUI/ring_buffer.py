@@ -0,0 +1,120 @@
+import numpy as np
+
+
+class SensorRingBuffer:
+    """Fixed-capacity sample history for all channels with a shared timestamp column.
+
+    Every sample is written twice, at i and i + capacity, so the newest n
+    samples (n <= capacity) are always one contiguous slice. That makes
+    appends O(1) and lets times()/channel()/window() hand out views that can
+    go straight to curve.setData without copying. Memory stays fixed at
+    2 * capacity rows no matter how long the run is.
+    """
+
+    def __init__(self, num_channels=32, capacity=32768, dtype=np.float32):
+        self.num_channels = num_channels
+        self.capacity = capacity
+        self._times = np.zeros(2 * capacity)
+        self._values = np.zeros((num_channels, 2 * capacity), dtype=dtype)
+        self._head = 0  # Next write position in [0, capacity)
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        """Forget all samples without releasing memory"""
+        self._head = 0
+        self._count = 0
+
+    def append(self, timestamp, values):
+        """Add one frame: a timestamp and one value per channel"""
+        head = self._head
+        self._times[head] = self._times[head + self.capacity] = timestamp
+        self._values[:, head] = self._values[:, head + self.capacity] = values
+        self._head = (head + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def extend(self, timestamps, values):
+        """Add a batch of frames: (N,) timestamps and (N, num_channels) values"""
+        timestamps = np.asarray(timestamps)
+        values = np.asarray(values)
+        if len(timestamps) > self.capacity:
+            timestamps = timestamps[-self.capacity:]
+            values = values[-self.capacity:]
+
+        count = len(timestamps)
+        first = min(count, self.capacity - self._head)  # Up to the end of the first copy
+        for offset in (0, self.capacity):
+            start = self._head + offset
+            self._times[start:start + first] = timestamps[:first]
+            self._values[:, start:start + first] = values[:first].T
+        if count > first:
+            # Wrap around: the rest goes to the start of the first copy and after the first copy
+            rest = count - first
+            for offset in (0, self.capacity):
+                self._times[offset:offset + rest] = timestamps[first:]
+                self._values[:, offset:offset + rest] = values[first:].T
+
+        self._head = (self._head + count) % self.capacity
+        self._count = min(self._count + count, self.capacity)
+
+    def _span(self, count=None):
+        """Slice covering the newest count samples in the doubled storage"""
+        count = self._count if count is None else min(count, self._count)
+        end = self._head + self.capacity  # Both copies are current, so this is always contiguous
+        return slice(end - count, end)
+
+    def times(self, count=None):
+        """Timestamps of the newest count samples (all by default), oldest first"""
+        return self._times[self._span(count)]
+
+    def channel(self, index, count=None):
+        """Values of one channel for the newest count samples, oldest first"""
+        return self._values[index, self._span(count)]
+
+    def values(self, count=None):
+        """(num_channels, count) view of every channel"""
+        return self._values[:, self._span(count)]
+
+    def latest_time(self):
+        """Timestamp of the newest sample, or None when empty"""
+        return self._times[self._span(1)][0] if self._count else None
+
+    def latest(self):
+        """Values of the newest frame, one per channel, or None when empty"""
+        return self._values[:, self._span(1)][:, 0] if self._count else None
+
+    def count_since(self, seconds):
+        """Number of newest samples that fall within the last `seconds`"""
+        if not self._count:
+            return 0
+        times = self.times()
+        return self._count - int(np.searchsorted(times, times[-1] - seconds, side='left'))
+
+    def value_range(self, count=None, index=None):
+        """(min, max) of the newest count samples (all by default) of one channel, or arrays for every
+        channel; None when empty. The samples are one contiguous slice, so this is a single reduction."""
+        count = self._count if count is None else min(count, self._count)
+        if count <= 0:
+            return None
+        values = self.values(count) if index is None else self.channel(index, count)
+        return values.min(axis=-1), values.max(axis=-1)
+
+    def value_range_between(self, start_time, end_time, index=None):
+        """(min, max) of the samples with start_time <= time <= end_time, like value_range"""
+        times = self.times()
+        first = int(np.searchsorted(times, start_time, side='left'))
+        last = int(np.searchsorted(times, end_time, side='right'))
+        if last <= first:
+            return None
+        span = self._span()
+        span = slice(span.start + first, span.start + last)
+        values = self._values[:, span] if index is None else self._values[index, span]
+        return values.min(axis=-1), values.max(axis=-1)
+
+    def window(self, seconds=None, index=None):
+        """(times, values) views of the last `seconds` (everything if None) for one channel or all"""
+        count = None if seconds is None else self.count_since(seconds)
+        values = self.values(count) if index is None else self.channel(index, count)
+        return self.times(count), values
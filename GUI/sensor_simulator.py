@@ -43,6 +43,10 @@ class MockSerial:
             self._data_generator = self._generate_sensor_data()
             return next(self._data_generator)
 
+    def read(self, size=1) -> bytes:
+        """Mock bulk read used by the acquisition worker; returns one generated line"""
+        return self.readline()
+
     def write(self, data: bytes) -> int:
         """Mock write method"""
         return len(data)
@@ -0,0 +1,85 @@
+import numpy as np
+
+
+class RunningMean:
+    """Moving average over the last `window` samples of every channel at once.
+
+    Keeps the last `window` frames in a small ring plus a running sum per
+    channel, so each new frame costs O(1) per channel whatever the window.
+    A batch of frames is handled with one cumulative sum instead of a Python
+    loop. The running sum is rebuilt from the ring once per lap so float
+    error cannot build up over long runs.
+    """
+
+    def __init__(self, num_channels=32, window=10, min_samples=1):
+        self.num_channels = num_channels
+        self.min_samples = min_samples  # Below this many samples the raw value is passed through
+        self.resize(window)
+
+    def resize(self, window):
+        """Change the window length; this forgets the samples seen so far"""
+        self.window = max(1, int(window))
+        self._ring = np.zeros((self.window, self.num_channels))
+        self.reset()
+
+    def reset(self):
+        """Forget all samples"""
+        self._ring[:] = 0
+        self._sum = np.zeros(self.num_channels)
+        self._pos = 0  # Next slot to overwrite in _ring
+        self.count = 0  # Samples currently in the window, at most window
+
+    @property
+    def mean(self):
+        """Current average of every channel, or None before the first sample"""
+        return self._sum / self.count if self.count else None
+
+    def update(self, values):
+        """Add one frame of values and return the smoothed frame"""
+        values = np.asarray(values, dtype=float)
+        if self.count == self.window:
+            self._sum -= self._ring[self._pos]
+        else:
+            self.count += 1
+        self._ring[self._pos] = values
+        self._sum += values
+        self._pos += 1
+        if self._pos == self.window:
+            self._pos = 0
+            self._sum = self._ring[:self.count].sum(axis=0)  # Drop accumulated rounding error
+
+        if self.count < self.min_samples:
+            return values
+        return self._sum / self.count
+
+    def update_batch(self, frames):
+        """Add (N, num_channels) frames and return the (N, num_channels) smoothed frames"""
+        frames = np.asarray(frames, dtype=float)
+        n = len(frames)
+        if not n:
+            return frames
+        window = self.window
+
+        # Samples still in the window, oldest first, followed by the batch
+        history = np.roll(self._ring, -self._pos, axis=0)[window - self.count:]
+        samples = np.concatenate((history, frames))
+
+        # Sum of each window from a cumulative sum: csum[end] - csum[start]
+        csum = np.zeros((len(samples) + 1, self.num_channels))
+        np.cumsum(samples, axis=0, out=csum[1:])
+        ends = np.arange(self.count + 1, self.count + n + 1)
+        starts = np.maximum(ends - window, 0)
+        counts = (ends - starts)[:, None]
+        smoothed = (csum[ends] - csum[starts]) / counts
+
+        # Pass raw values through until min_samples have been seen, like update()
+        warming = counts[:, 0] < self.min_samples
+        smoothed[warming] = frames[warming]
+
+        # Keep the newest samples as the ring state
+        tail = samples[-window:]
+        self.count = len(tail)
+        self._ring[:self.count] = tail
+        self._pos = self.count % window
+        self._sum = tail.sum(axis=0)
+        return smoothed
@@ -0,0 +1,124 @@
+import threading
+import time
+
+# Pipeline stages in display order; each is timed from one thread, but read and reset from the GUI thread
+PIPELINE_STAGES = [
+    'read',  # Serial port read (acquisition thread)
+    'parse',  # Frame parsing (acquisition thread)
+    'ingest',  # Whole update_sensor_data call (GUI thread)
+    'filter',  # Filter chain and drift removal
+    'history',  # Plot history ring buffers
+    'detect',  # Peak and threshold crossing detection
+    'bits',  # Live bit detectors
+    'stats',  # Running channel statistics
+    'plot',  # One update_plot call
+    'render',  # Whole render_plots call
+    'record',  # Writing one batch to disk (recorder thread)
+    'loop_lag',  # How late the GUI event loop runs a timer
+]
+
+
+class LatencyHistogram:
+    """Histogram of durations in nanoseconds with four bins per power of two (~19% wide).
+
+    record() is a few integer operations and a list increment, cheap enough
+    for the hot path, and percentiles are read from the bins, so memory is
+    fixed however many samples are recorded.
+    """
+
+    NUM_BINS = 4 * 40  # Up to 2**40 ns, about 18 minutes
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * self.NUM_BINS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, ns):
+        """Add one duration"""
+        ns = max(ns, 4)
+        bits = ns.bit_length()
+        # The two bits after the leading one pick a quarter of the octave
+        self.counts[min((bits - 3) * 4 + ((ns >> (bits - 3)) & 3), self.NUM_BINS - 1)] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    @staticmethod
+    def bin_value(index):
+        """Middle of a bin in nanoseconds"""
+        octave, quarter = divmod(index, 4)
+        low = (4 + quarter) << octave
+        return low + (1 << octave) / 2
+
+    def percentile(self, q):
+        """Approximate q-th percentile (0-100) in nanoseconds, or None when empty"""
+        if not self.count:
+            return None
+        target = q / 100.0 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return min(self.bin_value(index), self.max_ns)
+        return self.max_ns
+
+
+class PipelineTimers:
+    """Per-stage latency histograms for the acquisition, processing, plotting and recording pipeline.
+
+    Time a stage with
+        started = timers.start()
+        ...
+        timers.stop('parse', started)
+    While disabled, start() returns 0 without reading the clock and stop()
+    returns at once, so the calls can stay in the hot path permanently.
+    The acquisition and recorder threads record while the GUI thread reads
+    and resets, so every histogram access holds a lock; it is only taken
+    while timing is enabled.
+    """
+
+    def __init__(self, enabled=False, stages=PIPELINE_STAGES):
+        self.enabled = enabled
+        self.histograms = {stage: LatencyHistogram() for stage in stages}
+        self._lock = threading.Lock()
+
+    def start(self):
+        return time.perf_counter_ns() if self.enabled else 0
+
+    def stop(self, stage, started):
+        if started:
+            elapsed = time.perf_counter_ns() - started
+            with self._lock:
+                self.histograms[stage].record(elapsed)
+
+    def record(self, stage, ns):
+        """Add a duration measured some other way"""
+        if self.enabled:
+            with self._lock:
+                self.histograms[stage].record(ns)
+
+    def reset(self):
+        with self._lock:
+            for histogram in self.histograms.values():
+                histogram.reset()
+
+    def summary(self, reset=False):
+        """[(stage, count, p50 us, p99 us, max us)] for every stage timed since the last reset.
+
+        With reset, the histograms are cleared in the same step, so no sample
+        is lost or counted twice between reading and clearing.
+        """
+        rows = []
+        with self._lock:
+            for stage, histogram in self.histograms.items():
+                if histogram.count:
+                    rows.append((stage, histogram.count, histogram.percentile(50) / 1000.0,
+                                 histogram.percentile(99) / 1000.0, histogram.max_ns / 1000.0))
+                    if reset:
+                        histogram.reset()
+        return rows
@@ -1,3 +1,5 @@
+import os
+import sys
 import serial
 import time
 import pandas as pd
@@ -5,10 +7,14 @@ import matplotlib.pyplot as plt
 from datetime import datetime
 import threading
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'GUI'))
+from downsampling import lttb_indices  # noqa: E402
+
 # Configure these variables!!!!
 SERIAL_PORT = '/dev/ttyACM0'  # Change this to match your Arduino's serial port
 BAUD_RATE = 115200
 DATA_COLLECTION_TIME = 60  # How long the program runs in seconds
+MAX_PLOT_POINTS = 2000  # Points drawn per sensor plot; LTTB keeps the shape and peaks of longer runs
 
 # Global variables
 data = []
@@ -43,8 +49,13 @@ def process_data_and_generate_report():
         for sensor in df['Sensor'].unique():
             sensor_data = df[df['Sensor'] == sensor]
 
+            # Statistics below still use every sample; only the plot is downsampled
+            plot_rows = lttb_indices(sensor_data['Timestamp'].values.astype('int64'),
+                                     sensor_data['Value'].values, MAX_PLOT_POINTS)
+            plot_data = sensor_data.iloc[plot_rows]
+
             plt.figure(figsize=(10, 5))
-            plt.plot(sensor_data['Timestamp'], sensor_data['Value'])
+            plt.plot(plot_data['Timestamp'], plot_data['Value'])
             plt.title(f'{sensor} Data')
             plt.xlabel('Time')
             plt.ylabel('Sensor Value')
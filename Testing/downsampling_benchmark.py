@@ -0,0 +1,42 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'GUI'))
+from downsampling import lttb_indices, minmax_indices  # noqa: E402
+
+NUM_POINTS = 1000000
+OUTPUT_POINTS = [500, 2000, 8000]
+REPEATS = 5
+
+
+def generate_series(num_points):
+    """A drifting sensor trace with a few single-sample spikes that must survive downsampling"""
+    times = np.arange(num_points) * 0.004
+    values = 500 + np.random.randn(num_points).cumsum() * 0.5
+    spikes = np.random.choice(num_points, 10, replace=False)
+    values[spikes] += 300
+    return times, values, spikes
+
+
+def best_time(function, *args):
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    times, values, spikes = generate_series(NUM_POINTS)
+    print(f"Downsampling {NUM_POINTS} points (best of {REPEATS})")
+    for points in OUTPUT_POINTS:
+        elapsed, kept = best_time(lttb_indices, times, values, points)
+        print(f"lttb    -> {len(kept):5d} points  {elapsed * 1000:7.2f} ms  "
+              f"spikes kept {np.isin(spikes, kept).sum()}/{len(spikes)}")
+        elapsed, kept = best_time(minmax_indices, values, points // 2)
+        print(f"minmax  -> {len(kept):5d} points  {elapsed * 1000:7.2f} ms  "
+              f"spikes kept {np.isin(spikes, kept).sum()}/{len(spikes)}")
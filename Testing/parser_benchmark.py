@@ -0,0 +1,104 @@
+import binascii
+import io
+import os
+import random
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'GUI'))
+from frame_parser import BinaryFrameDecoder, FrameParser  # noqa: E402
+
+NUM_FRAMES = 20000
+CHUNK_SIZES = [150, 1024, 4096, 65536]  # in_waiting: one frame while keeping up, up to a backlog being drained
+
+
+def generate_stream(num_frames, corrupt_every=500):
+    """Build a byte stream of '$' frames like Mega.ino sends, with occasional corruption"""
+    lines = []
+    for n in range(num_frames):
+        values = ','.join(str(random.randint(0, 1023)) for _ in range(32))
+        line = f"${n * 40},{values}\r\n"
+        if corrupt_every and n % corrupt_every == corrupt_every - 1:
+            line = line[:len(line) // 2]  # Truncated frame, next '$' must resync
+        lines.append(line)
+    return ''.join(lines).encode()
+
+
+def generate_binary_stream(num_frames):
+    """Build the same data as FORMAT,BIN frames"""
+    frames = []
+    for n in range(num_frames):
+        body = struct.pack('<HI32H', n & 0xFFFF, n * 40, *(random.randint(0, 1023) for _ in range(32)))
+        frames.append(b'\xa5\x5a' + body + struct.pack('<H', binascii.crc_hqx(body, 0xFFFF)))
+    return b''.join(frames)
+
+
+def legacy_parse(stream):
+    """The original per-line path from update_sensor_data"""
+    source = io.BytesIO(stream)
+    frames = 0
+    while True:
+        raw = source.readline()
+        if not raw:
+            break
+        line = raw.decode(errors='ignore').strip()
+        if line.startswith('$'):
+            data_parts = line[1:].split(',')
+            if len(data_parts) < 33:
+                continue
+            timestamp = float(data_parts[0]) / 1000.0
+            for i in range(32):
+                try:
+                    value = float(data_parts[i + 1])
+                except ValueError:
+                    pass
+                except IndexError:
+                    pass
+            frames += 1
+    return frames
+
+
+def bulk_parser(chunk_size):
+    """FrameParser fed in in_waiting-sized chunks"""
+    def bulk_parse(stream):
+        parser = FrameParser()
+        frames = 0
+        for start in range(0, len(stream), chunk_size):
+            frames += len(parser.feed(stream[start:start + chunk_size]))
+        return frames
+    return bulk_parse
+
+
+def binary_parse(stream):
+    """BinaryFrameDecoder fed in 4 KiB chunks"""
+    decoder = BinaryFrameDecoder()
+    frames = 0
+    for start in range(0, len(stream), 4096):
+        frames += len(decoder.feed(stream[start:start + 4096]))
+    return frames
+
+
+def benchmark(name, func, stream, repeats=5):
+    best = float('inf')
+    frames = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        frames = func(stream)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<12} {frames:>7} frames  {best * 1000:8.1f} ms  {frames / best:>12,.0f} frames/s")
+    return frames / best
+
+
+if __name__ == "__main__":
+    stream = generate_stream(NUM_FRAMES)
+    print(f"Parsing {NUM_FRAMES} frames ({len(stream) / 1024:.0f} KiB)")
+    legacy_rate = benchmark("legacy", legacy_parse, stream)
+    for chunk_size in CHUNK_SIZES:
+        bulk_rate = benchmark(f"bulk {chunk_size} B", bulk_parser(chunk_size), stream)
+        print(f"{'':<12} speedup {bulk_rate / legacy_rate:.1f}x")
+
+    binary_stream = generate_binary_stream(NUM_FRAMES)
+    print(f"Binary frames: {len(binary_stream) / 1024:.0f} KiB for the same data")
+    binary_rate = benchmark("binary 4K", binary_parse, binary_stream)
+    print(f"{'':<12} speedup {binary_rate / legacy_rate:.1f}x")
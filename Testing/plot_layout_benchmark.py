@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+GUI_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'GUI')
+LAYOUTS = ['grid', 'compact']
+HISTORY_FRAMES = 32768
+BATCH_FRAMES = 16  # New frames per redraw, about what arrives between 30 FPS renders
+NUM_REDRAWS = 100
+
+
+def run_layout(layout):
+    """Build the main window with one plot layout and time startup and redraws of the visible tab"""
+    sys.path.insert(0, GUI_DIR)
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv)
+    import GUI
+
+    GUI.PLOT_LAYOUT = layout
+    start = time.perf_counter()
+    window = GUI.SensorArrayGUI()
+    window.show()
+    app.processEvents()
+    startup = time.perf_counter() - start
+
+    # A full plot history, so every redraw has real work to do
+    times = np.arange(HISTORY_FRAMES + NUM_REDRAWS * BATCH_FRAMES) * 0.004
+    values = 400 + np.random.rand(len(times), 32) * 200
+    window.sensor_history.extend(times[:HISTORY_FRAMES], values[:HISTORY_FRAMES])
+    window.set_window_size_mux(0, 60)
+    panel = window.tab_widget.currentWidget()
+
+    frame_times = []
+    for redraw in range(NUM_REDRAWS):
+        batch = slice(HISTORY_FRAMES + redraw * BATCH_FRAMES, HISTORY_FRAMES + (redraw + 1) * BATCH_FRAMES)
+        window.sensor_history.extend(times[batch], values[batch])
+        start = time.perf_counter()
+        window.dirty_plots.update(range(32))
+        window.render_plots()
+        panel.grab()  # Paint the tab now rather than whenever Qt gets round to it
+        frame_times.append(time.perf_counter() - start)
+
+    frame_times = np.array(frame_times) * 1000
+    print(f"{layout:8s} startup {startup * 1000:7.1f} ms   redraw of 16 plots: "
+          f"median {np.median(frame_times):6.1f} ms, 95th percentile {np.percentile(frame_times, 95):6.1f} ms")
+    window.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        run_layout(sys.argv[1])
+    else:
+        # Each layout in a fresh process so neither benefits from the other's warm caches
+        print(f"{HISTORY_FRAMES} frames of history, {NUM_REDRAWS} redraws of {BATCH_FRAMES} new frames each")
+        for layout in LAYOUTS:
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), layout],
+                                    capture_output=True, text=True).stdout
+            print(output.strip().splitlines()[-1] if output.strip() else f"{layout}: failed")
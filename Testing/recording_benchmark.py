@@ -0,0 +1,53 @@
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'GUI'))
+from recorder import BinaryRecording, create_recorder, load_recording  # noqa: E402
+
+NUM_FRAMES = 200000
+BATCH_SIZE = 64  # Roughly what one 50 ms GUI tick hands over during a backlog
+
+
+def generate_frames(num_frames):
+    """[millis, S1..S32] frames like the acquisition worker produces"""
+    frames = np.empty((num_frames, 33))
+    frames[:, 0] = np.arange(num_frames) * 4
+    frames[:, 1:] = np.random.randint(0, 1024, (num_frames, 32))
+    return frames
+
+
+def record(recording_format, base_path, frames):
+    recorder = create_recorder(recording_format, base_path)
+    recorder.start()
+    start = time.perf_counter()
+    for offset in range(0, len(frames), BATCH_SIZE):
+        batch = frames[offset:offset + BATCH_SIZE]
+        recorder.write(batch, np.full(len(batch), time.monotonic()))
+    recorder.stop(timeout=None)
+    return time.perf_counter() - start, recorder.path
+
+
+if __name__ == "__main__":
+    frames = generate_frames(NUM_FRAMES)
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Recording {NUM_FRAMES} frames")
+
+        elapsed, csv_path = record('csv', os.path.join(directory, 'run'), frames)
+        print(f"csv     write {elapsed:6.2f} s  {os.path.getsize(csv_path) / 2**20:7.1f} MiB")
+        start = time.perf_counter()
+        _, data = load_recording(csv_path)
+        print(f"csv     read  {time.perf_counter() - start:6.2f} s  ({len(data)} frames)")
+
+        elapsed, bin_path = record('binary', os.path.join(directory, 'run'), frames)
+        print(f"binary  write {elapsed:6.2f} s  {os.path.getsize(bin_path) / 2**20:7.1f} MiB")
+        start = time.perf_counter()
+        recording = BinaryRecording(bin_path)
+        window = recording.time_slice(100.0, 160.0)['samples']
+        total = int(window.sum())  # Touch the data so the pages are really read
+        print(f"binary  read  {time.perf_counter() - start:6.2f} s  ({len(recording)} frames, "
+              f"{len(window)} in a 60 s slice, checksum {total})")
+        del recording, window  # Release the memmap before the directory is removed
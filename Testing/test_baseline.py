@@ -0,0 +1,56 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'GUI'))
+from baseline import create_baseline_tracker  # noqa: E402
+
+
+def drifting_frames(num_frames=2000, num_channels=4, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = 400 + np.linspace(0, 150, num_frames)[:, None] + rng.normal(0, 10, size=(num_frames, num_channels))
+    frames[700:760] += 300  # A gas response
+    return frames
+
+
+def track_in_batches(tracker, frames, rng):
+    baselines, start = [], 0
+    while start < len(frames):
+        count = int(rng.integers(1, 150))
+        baselines.append(tracker.update_batch(frames[start:start + count]))
+        start += count
+    return np.vstack(baselines)
+
+
+def test_rolling_min_matches_brute_force():
+    frames = drifting_frames()
+    rng = np.random.default_rng(1)
+    for window in (1, 7, 100, 333):
+        expected = np.array([frames[max(0, row + 1 - window):row + 1].min(axis=0) for row in range(len(frames))])
+        tracker = create_baseline_tracker('min', num_channels=4, window=window)
+        assert np.array_equal(track_in_batches(tracker, frames, rng), expected)
+        assert np.array_equal(tracker.baseline, expected[-1])
+
+
+def test_batches_match_whole_stream():
+    frames = drifting_frames()
+    rng = np.random.default_rng(2)
+    for method, settings in (('ema', {'rise_half_life': 200, 'fall_half_life': 5}), ('min', {'window': 50})):
+        whole = create_baseline_tracker(method, num_channels=4, **settings).update_batch(frames)
+        batched = track_in_batches(create_baseline_tracker(method, num_channels=4, **settings), frames, rng)
+        assert np.array_equal(batched, whole), method
+
+
+def test_ema_ignores_a_short_response():
+    frames = drifting_frames()
+    baselines = create_baseline_tracker('ema', num_channels=4).update_batch(frames)
+    # The response lifts the baseline by a few counts at most, far less than its 300
+    assert np.all(baselines[760] - baselines[699] < 20)
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"{name}: ok")
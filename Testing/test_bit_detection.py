@@ -0,0 +1,53 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+pytest.importorskip('PyQt5')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'GUI'))
+from GUI import BitDetector, BitDetectorBank  # noqa: E402
+
+
+def spray_data(num_frames, num_channels, seed=0):
+    """Noisy baselines with on/off spray steps of random period and size per channel"""
+    rng = np.random.default_rng(seed)
+    samples = np.arange(num_frames)
+    data = np.empty((num_frames, num_channels))
+    for channel in range(num_channels):
+        period = rng.integers(50, 400)
+        steps = ((samples + rng.integers(0, 400)) // period) % 3 == 0
+        data[:, channel] = (rng.uniform(0, 700) + rng.normal(0, rng.uniform(1, 40), num_frames)
+                            + rng.uniform(0, 400) * steps)
+    data[:, 0] = 0  # A zero baseline never triggers
+    data[:, 1] = np.round(data[:, 1])  # Integer ADC readings
+    return data
+
+
+def test_bank_matches_scalar_detectors():
+    num_frames, num_channels = 3000, 8
+    data = spray_data(num_frames, num_channels)
+    times = np.arange(num_frames) * 0.01
+
+    detectors = [BitDetector() for _ in range(num_channels)]
+    expected = np.array([[detector.update(value, timestamp)[0] for detector, value in zip(detectors, row)]
+                         for row, timestamp in zip(data, times)])
+    assert expected.any()
+
+    bank = BitDetectorBank(num_channels)
+    rng = np.random.default_rng(1)
+    detections, start = [], 0
+    while start < num_frames:
+        count = int(rng.integers(1, 300))
+        detections.append(bank.update(data[start:start + count], times[start:start + count]))
+        start += count
+    assert np.array_equal(np.vstack(detections), expected)
+    assert bank.detection_count.tolist() == [detector.detection_count for detector in detectors]
+    assert bank.timestamps == [detector.timestamps for detector in detectors]
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"{name}: ok")
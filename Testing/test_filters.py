@@ -0,0 +1,69 @@
+import os
+import sys
+
+import numpy as np
+from scipy import signal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'GUI'))
+from filters import FilterChain  # noqa: E402
+
+STAGES = [
+    ('mean', {'window': 10}),
+    ('median', {'window': 5}),
+    ('savgol', {'window': 11, 'polyorder': 2}),
+    ('lowpass', {'cutoff': 0.2, 'order': 2}),
+    ('highpass', {'cutoff': 0.05, 'order': 3}),
+]
+
+
+def sensor_frames(num_frames=600, num_channels=4, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = 300 + rng.normal(0, 5, size=(num_frames, num_channels)).cumsum(axis=0)
+    frames[::53] += 400  # Single-sample spikes
+    return frames
+
+
+def filter_in_batches(config, frames, seed=1):
+    chain = FilterChain(config, num_channels=frames.shape[1])
+    rng = np.random.default_rng(seed)
+    batches, start = [], 0
+    while start < len(frames):
+        count = int(rng.integers(1, 50))
+        batches.append(chain.update_batch(frames[start:start + count]))
+        start += count
+    return np.vstack(batches)
+
+
+def test_split_batches_match_whole_stream():
+    frames = sensor_frames()
+    chains = [[stage] for stage in STAGES] + [[STAGES[1], STAGES[3], STAGES[2]]]
+    for config in chains:
+        whole = FilterChain(config, num_channels=frames.shape[1]).update_batch(frames)
+        assert np.allclose(filter_in_batches(config, frames), whole, rtol=0, atol=1e-9), config
+
+
+def test_stages_match_scipy():
+    frames = sensor_frames()
+    # Windowed stages see the first sample repeated in front of the stream
+    padded = np.concatenate((np.repeat(frames[:1], 10, axis=0), frames))
+    median = FilterChain([('median', {'window': 5})], 4).update_batch(frames)
+    assert np.array_equal(median, np.median(np.lib.stride_tricks.sliding_window_view(padded, 5, axis=0),
+                                            axis=2)[-len(frames):])
+
+    # The IIR filters start from the steady state of the first sample
+    b, a = signal.butter(2, 0.2)
+    expected, _ = signal.lfilter(b, a, frames, axis=0, zi=signal.lfilter_zi(b, a)[:, None] * frames[0])
+    lowpass = FilterChain([('lowpass', {'cutoff': 0.2, 'order': 2})], 4).update_batch(frames)
+    assert np.allclose(lowpass, expected)
+
+
+def test_empty_chain_passes_frames_through():
+    frames = sensor_frames()
+    assert np.array_equal(FilterChain([], 4).update_batch(frames), frames)
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"{name}: ok")
@@ -0,0 +1,56 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'GUI'))
+from frame_parser import BULK_MIN_LINES, FrameParser  # noqa: E402
+
+
+def text_stream(num_frames, seed=0):
+    """'$' frames like Mega.ino sends, with the values they should parse to"""
+    rng = np.random.default_rng(seed)
+    values = np.column_stack((np.arange(num_frames) * 40, rng.integers(0, 1024, size=(num_frames, 32))))
+    lines = [('$' + ','.join(str(v) for v in row) + '\r\n').encode() for row in values]
+    return lines, values.astype(float)
+
+
+def feed_in_chunks(stream, chunk_size):
+    parser = FrameParser()
+    batches = [parser.feed(stream[start:start + chunk_size]) for start in range(0, len(stream), chunk_size)]
+    return np.vstack(batches), parser
+
+
+def test_clean_frames_any_chunking():
+    lines, expected = text_stream(200)
+    stream = b''.join(lines)
+    # From single bytes over the per-line path to whole blocks on the NumPy path
+    for chunk_size in (1, 7, 150, len(lines[0]) * BULK_MIN_LINES, 4096, len(stream)):
+        frames, parser = feed_in_chunks(stream, chunk_size)
+        assert np.array_equal(frames, expected)
+        assert parser.corrupt_frames == 0
+        assert parser.last_frame == lines[-1].rstrip()
+
+
+def test_corrupt_frames_are_resynced():
+    lines, expected = text_stream(200, seed=1)
+    keep = np.ones(len(lines), dtype=bool)
+    lines[10] = lines[10][:40]  # Truncated: the next '$' starts a good frame on the same line
+    keep[10] = False
+    lines[50] = b'noise\r\n' + lines[50]  # Noise line between frames
+    lines[90] = lines[90].replace(b',', b',,', 1)  # Empty field
+    keep[90] = False
+    lines[120] = lines[120].replace(b'\r\n', b'\r')  # Two frames run together, the first one is dropped
+    keep[120] = False
+    stream = b''.join(lines)
+    for chunk_size in (1, 150, 4096, len(stream)):
+        frames, parser = feed_in_chunks(stream, chunk_size)
+        assert np.array_equal(frames, expected[keep])
+        assert parser.corrupt_frames == 4
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"{name}: ok")
@@ -0,0 +1,123 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'GUI'))
+from lod_history import LTTB_MAX_RATIO, LODSensorHistory  # noqa: E402
+from ring_buffer import SensorRingBuffer  # noqa: E402
+
+
+def test_ring_buffer_windows_match_brute_force():
+    rng = np.random.default_rng(0)
+    capacity, num_channels = 100, 3
+    ring = SensorRingBuffer(num_channels, capacity)
+    times, values = np.empty(0), np.empty((0, num_channels))
+    # Single appends, batches that wrap, and a batch longer than the ring
+    for count in (1, 5, 60, 1, 90, 250, 7, 33):
+        new_times = (times[-1] if len(times) else 0) + 0.01 * np.arange(1, count + 1)
+        new_values = rng.normal(size=(count, num_channels))
+        if count == 1:
+            ring.append(new_times[0], new_values[0])
+        else:
+            ring.extend(new_times, new_values)
+        times = np.concatenate((times, new_times))[-capacity:]
+        values = np.concatenate((values, new_values))[-capacity:]
+
+        assert len(ring) == len(times)
+        assert np.array_equal(ring.times(), times)
+        assert np.array_equal(ring.values(), values.T.astype(np.float32))
+        assert ring.latest_time() == times[-1]
+
+        for recent in (1, 10, len(times)):
+            low, high = ring.value_range(recent)
+            assert np.array_equal(low, values[-recent:].min(axis=0).astype(np.float32))
+            assert np.array_equal(high, values[-recent:].max(axis=0).astype(np.float32))
+
+        start_time, end_time = times[len(times) // 3], times[max(len(times) // 3, len(times) - 5)]
+        inside = (times >= start_time) & (times <= end_time)
+        low, high = ring.value_range_between(start_time, end_time, index=1)
+        assert low == np.float32(values[inside, 1].min()) and high == np.float32(values[inside, 1].max())
+
+        window_times, window_values = ring.window(0.2, index=2)
+        recent = times >= times[-1] - 0.2
+        assert np.array_equal(window_times, times[recent])
+        assert np.array_equal(window_values, values[recent, 2].astype(np.float32))
+
+    assert ring.value_range_between(times[-1] + 1, times[-1] + 2) is None
+
+
+def lod_history_of(frames, times, batch_sizes):
+    """Small LODSensorHistory (raw ring of 256, levels of 64 blocks at 4x, 16x and 64x) fed in batches"""
+    history = LODSensorHistory(frames.shape[1], capacity=256, factor=4, levels=3, level_capacity=64)
+    start = 0
+    for count in batch_sizes:
+        history.extend(times[start:start + count], frames[start:start + count])
+        start += count
+    return history
+
+
+def test_lod_levels_and_windows():
+    rng = np.random.default_rng(0)
+    num_frames = 3000
+    times = np.arange(num_frames) * 0.01
+    frames = rng.normal(size=(num_frames, 2)).cumsum(axis=0)
+    frames[1234, 1] += 100  # A single-sample spike
+    history = lod_history_of(frames, times, rng.integers(1, 100, size=num_frames))
+    whole = lod_history_of(frames, times, [num_frames])
+
+    # Each level holds the min and max of its blocks, however the frames were batched
+    for depth, level in enumerate(history.levels):
+        size = 4 ** (depth + 1)
+        blocks = frames[:num_frames // size * size].reshape(-1, size, 2)[-len(level):]
+        assert np.array_equal(level.times(), times[:num_frames // size * size:size][-len(level):])
+        assert np.allclose(level.values()[:2].T, blocks.min(axis=1))
+        assert np.allclose(level.values()[2:].T, blocks.max(axis=1))
+
+    for start_time, end_time in ((29.0, 29.99), (25.0, 29.99), (10.0, 14.0), (12.3, 12.4), (0.0, 29.99)):
+        for max_points in (20, 100, 1000):
+            window_times, window_values = history.lod_window(start_time, end_time, 1, max_points)
+            assert np.array_equal(window_times, whole.lod_window(start_time, end_time, 1, max_points)[0])
+            assert len(window_times) <= max_points
+            assert np.all(np.diff(window_times) >= 0)
+
+            # Nothing from outside the view but the blocks holding its ends (64 samples at most)
+            assert window_times[0] >= start_time - 0.64 and window_times[-1] <= end_time
+            around = (times >= window_times[0]) & (times < end_time + 0.64)
+            assert window_values.max() <= frames[around, 1].max() + 1e-4  # Levels are float32
+            assert window_values.min() >= frames[around, 1].min() - 1e-4
+
+            # Min/max thinning keeps the true extremes, single-sample spikes included; LTTB need not
+            inside = (times >= start_time) & (times <= end_time)
+            count = np.count_nonzero(inside)
+            if start_time >= times[-256] and max_points < count <= LTTB_MAX_RATIO * max_points:
+                continue
+            assert window_values.max() >= frames[inside, 1].max() - 1e-4
+            assert window_values.min() <= frames[inside, 1].min() + 1e-4
+
+    # A view the raw ring covers and that fits is returned sample for sample
+    window_times, window_values = history.lod_window(29.0, 29.5, 0, 100)
+    inside = (times >= 29.0) & (times <= 29.5)
+    assert np.array_equal(window_times, times[inside])
+    assert np.allclose(window_values, frames[inside, 0])
+
+
+
+def test_lod_window_fills_max_points():
+    # A finer level that overflows is thinned to max_points rather than drawn from one 16x coarser
+    num_frames = 50000
+    times = np.arange(num_frames) * 0.01
+    frames = np.random.default_rng(1).normal(size=(num_frames, 1)).cumsum(axis=0)
+    history = LODSensorHistory(1, capacity=1024, factor=16, levels=2, level_capacity=256)
+    history.extend(times, frames)
+    for start_time in (times[-3000], 0.0):
+        for max_points in (100, 200, 300):
+            window_times, _ = history.lod_window(start_time, times[-1], 0, max_points)
+            assert max_points // 2 <= len(window_times) <= max_points
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"{name}: ok")
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'GUI'))
+from smoothing import RunningMean  # noqa: E402
+
+
+def random_batches(frames, rng, largest=40):
+    """Split frames into consecutive batches of random size, single frames included"""
+    start = 0
+    while start < len(frames):
+        count = int(rng.integers(1, largest))
+        yield frames[start:start + count]
+        start += count
+
+
+def brute_force_mean(frames, window, min_samples):
+    expected = np.empty_like(frames)
+    for row in range(len(frames)):
+        samples = frames[max(0, row + 1 - window):row + 1]
+        expected[row] = samples.mean(axis=0) if len(samples) >= min_samples else frames[row]
+    return expected
+
+
+def test_batch_matches_step_and_brute_force():
+    rng = np.random.default_rng(0)
+    frames = rng.integers(0, 1024, size=(500, 4)).astype(float)
+    for window, min_samples in ((1, 1), (10, 1), (10, 3), (64, 5)):
+        expected = brute_force_mean(frames, window, min_samples)
+
+        stepped = RunningMean(4, window, min_samples)
+        assert np.allclose([stepped.update(values) for values in frames], expected)
+
+        batched = RunningMean(4, window, min_samples)
+        result = np.vstack([batched.update_batch(batch) for batch in random_batches(frames, rng)])
+        assert np.allclose(result, expected)
+        assert np.allclose(batched.mean, stepped.mean)
+
+        # Both kinds of update can follow each other
+        mixed = RunningMean(4, window, min_samples)
+        result = [mixed.update_batch(frames[:37]), [mixed.update(values) for values in frames[37:90]],
+                  mixed.update_batch(frames[90:])]
+        assert np.allclose(np.vstack(result), expected)
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"{name}: ok")
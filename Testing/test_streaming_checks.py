@@ -0,0 +1,87 @@
+import binascii
+import os
+import struct
+import sys
+
+import numpy as np
+from scipy.signal import find_peaks
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'GUI'))
+from event_detection import StreamingEventDetector  # noqa: E402
+from frame_parser import create_parser  # noqa: E402
+
+
+def text_v2_stream(sequence):
+    """Protocol 2 text frames with the given frame counters"""
+    samples = ','.join(['500'] * 32)
+    return ''.join(f"${n * 40},{n},{n * 40000},{n * 40000 + 3000},{samples}\r\n" for n in sequence).encode()
+
+
+def binary_v1_stream(sequence):
+    """Protocol 1 binary frames with the given 16-bit sequence numbers"""
+    frames = []
+    for n in sequence:
+        body = struct.pack('<HI32H', n & 0xFFFF, n * 40, *([500] * 32))
+        frames.append(b'\xa5\x5a' + body + struct.pack('<H', binascii.crc_hqx(body, 0xFFFF)))
+    return b''.join(frames)
+
+
+def test_sequence_reset_is_not_loss():
+    parser = create_parser('text', 2)
+    parser.feed(text_v2_stream([0, 1, 2, 3, 4, 99, 6, 7]))  # 99 is a real gap of 94, then the counter goes back
+    assert parser.dropped_frames == 94
+    parser.feed(text_v2_stream([0, 1, 3]))  # Device restarted: start over, then one lost frame
+    assert parser.dropped_frames == 95
+
+
+def test_binary_sequence_wraps_and_resets():
+    parser = create_parser('binary')
+    parser.feed(binary_v1_stream([65534, 65535, 65536, 65538]))  # Wraps to 0, then 1 is lost
+    assert parser.dropped_frames == 1
+    parser.feed(binary_v1_stream([0, 1, 2]))  # Restart from 2 back to 0
+    assert parser.dropped_frames == 1
+
+
+def detect_peaks(values, batch, peak_height=700, peak_distance=4):
+    """Sample indices of the peaks StreamingEventDetector finds feeding values batch samples at a time"""
+    times = np.arange(len(values), dtype=float)
+    detector = StreamingEventDetector(num_channels=1, peak_height=peak_height, peak_distance=peak_distance)
+    found = []
+    for start in range(0, len(values), batch):
+        found += detector.update(times[start:start + batch], values[start:start + batch, None])[1]
+    found += detector.flush()
+    return [int(timestamp) for _, timestamp, _ in found]
+
+
+def test_peaks_match_find_peaks():
+    # Without tied heights the peaks are exactly find_peaks' for any batching
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        values = 700 + rng.normal(size=500).cumsum()
+        expected, _ = find_peaks(values, height=700, distance=27)
+        for batch in (1, 7, 64, len(values)):
+            assert detect_peaks(values, batch, peak_distance=27) == expected.tolist()
+
+
+def test_tied_peaks_keep_the_later_one():
+    # Equal peaks at 2 and 5, and at 14 and 16, are closer than the distance: the later one of each is kept
+    values = np.array([698, 699, 701, 699, 698, 701, 699, 698, 698, 699,
+                       698, 700, 699, 698, 701, 698, 701, 698, 698, 698], dtype=float)
+    for batch in (1, 3, len(values)):
+        assert detect_peaks(values, batch) == [5, 11, 16]
+
+    # Integer random walks have many ties; the choice still does not depend on the batching
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        values = 700 + rng.integers(-2, 3, size=500).cumsum().astype(float)
+        peaks = detect_peaks(values, len(values), peak_distance=27)
+        assert all(later - earlier >= 27 for earlier, later in zip(peaks, peaks[1:]))
+        for batch in (1, 7, 64):
+            assert detect_peaks(values, batch, peak_distance=27) == peaks
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"{name}: ok")